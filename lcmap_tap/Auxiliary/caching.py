@@ -0,0 +1,32 @@
+"""Locations of the on-disk caches that the tool builds alongside the source data"""
+
+import hashlib
+import os
+
+# <str> Root directory for all locally generated caches, can be overridden with the LCMAP_TAP_CACHE env. variable
+CACHE_ROOT = os.environ.get("LCMAP_TAP_CACHE", os.path.join(os.path.expanduser("~"), ".lcmap_tap"))
+
+
+def get_cache_dir(source: str, name: str) -> str:
+    """
+    Return the local cache directory used for a particular source directory, creating it if necessary.  The
+    directory name combines the source folder name with a short hash of its full path so that tiles with the same
+    folder name on different drives or shares don't collide.
+
+    Args:
+        source: Full path to the source data directory (e.g. a tile's JSON or ARD directory)
+        name: The type of cache (e.g. "pixel_store")
+
+    Returns:
+        Full path to the cache directory
+
+    """
+    source = os.path.abspath(source)
+
+    key = hashlib.md5(source.encode("utf-8")).hexdigest()[:12]
+
+    out_dir = os.path.join(CACHE_ROOT, name, "{}_{}".format(os.path.basename(source.rstrip(os.sep)), key))
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    return out_dir
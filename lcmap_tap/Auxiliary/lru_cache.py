@@ -0,0 +1,190 @@
+"""A thread-safe least-recently-used cache bounded by the memory size of its values"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def estimate_nbytes(value, _seen=None) -> int:
+    """
+    Estimate the memory used by a value.  Arrays report their buffer size, containers and plain objects are summed
+    over their (attribute) values.  Only the large items matter for the cache budget, so this is a rough estimate.
+
+    Args:
+        value: Any object
+
+    Returns:
+        <int> Approximate size in bytes
+
+    """
+    if _seen is None:
+        _seen = set()
+
+    # Count shared objects once and don't follow reference cycles
+    if id(value) in _seen:
+        return 0
+
+    _seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in value)
+
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in value.values())
+
+    # Functions, methods and classes aren't data
+    if callable(value):
+        return sys.getsizeof(value)
+
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in vars(value).values())
+
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    def __init__(self, max_bytes: int, sizeof=estimate_nbytes):
+        """
+        Args:
+            max_bytes: The memory budget, least recently used items are evicted to stay below it
+            sizeof: Function returning the size of a value in bytes
+
+        """
+        self.max_bytes = max_bytes
+
+        self.sizeof = sizeof
+
+        self.nbytes = 0
+
+        self.hits = 0
+
+        self.misses = 0
+
+        self._items = OrderedDict()
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Return the value for key and mark it as most recently used, or default if it isn't cached
+
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+
+                self.hits += 1
+
+                return self._items[key][0]
+
+            self.misses += 1
+
+            return default
+
+    def put(self, key, value, nbytes: int = None):
+        """
+        Add a value to the cache, evicting the least recently used items if the budget is exceeded.  A value larger
+        than the whole budget isn't cached.
+
+        Args:
+            key: Hashable key
+            value: The value to cache
+            nbytes: Size of the value in bytes, estimated with sizeof if not given
+
+        Returns:
+            None
+
+        """
+        if nbytes is None:
+            nbytes = self.sizeof(value)
+
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= self._items.pop(key)[1]
+
+            if nbytes > self.max_bytes:
+                return None
+
+            self._items[key] = (value, nbytes)
+
+            self.nbytes += nbytes
+
+            self._evict()
+
+    def update(self, key, nbytes: int = None):
+        """
+        Change the size of a cached value that has grown, e.g. by memoizing results on itself, evicting the least
+        recently used items if the budget is exceeded.  Does nothing if the key isn't cached.
+
+        Args:
+            key: Hashable key
+            nbytes: New size of the value in bytes, estimated with sizeof if not given
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            if key not in self._items:
+                return None
+
+            value, old = self._items[key]
+
+            if nbytes is None:
+                nbytes = self.sizeof(value)
+
+            self._items[key] = (value, nbytes)
+
+            self.nbytes += nbytes - old
+
+            self._evict()
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and self._items:
+            _, (_, nbytes) = self._items.popitem(last=False)
+
+            self.nbytes -= nbytes
+
+    def resize(self, max_bytes: int):
+        """
+        Change the memory budget
+
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+
+            self._evict()
+
+    def clear(self):
+        """
+        Remove all items and reset the counters
+
+        """
+        with self._lock:
+            self._items.clear()
+
+            self.nbytes = 0
+
+            self.hits = 0
+
+            self.misses = 0
+
+    def stats(self) -> str:
+        """
+        Return a short summary of the cache usage
+
+        """
+        return "{} hits, {} misses, {} items, {:.1f} of {:.1f} MB".format(self.hits, self.misses, len(self._items),
+                                                                         self.nbytes / 2 ** 20,
+                                                                         self.max_bytes / 2 ** 20)
@@ -38,7 +38,7 @@ from PyQt5.QtWidgets import QMainWindow, QFileDialog
 from lcmap_tap.UserInterface import ui_main
 
 # Import the CCDReader class which retrieves json and cache data
-from lcmap_tap.RetrieveData.retrieve_data import CCDReader, GeoInfo
+from lcmap_tap.RetrieveData.retrieve_data import CCDReader, GeoInfo, PIXEL_CACHE
 
 # Import the PlotWindow class defined in the plotwindow.py module
 from lcmap_tap.PlotFrame.plotwindow import PlotWindow
@@ -46,6 +46,9 @@ from lcmap_tap.PlotFrame.plotwindow import PlotWindow
 from lcmap_tap.Plotting import make_plots
 
 from lcmap_tap.RetrieveData.ard_info import ARDInfo
+from lcmap_tap.RetrieveData.overview_cache import OverviewCache
+from lcmap_tap.Visualization.scene_prefetch import ScenePrefetcher
+from lcmap_tap.Visualization.stretch_stats import StretchStats
 
 from lcmap_tap.Auxiliary import projections
 
@@ -70,6 +73,9 @@ class MainControls(QMainWindow):
         self.plot_window = None
         self.maps_window = None
         self.ard_specs = None
+        self.overviews = None
+        self.prefetcher = None
+        self.stretch_stats = None
         self.ard = None
         self.fig = None
         self.current_view = None
@@ -384,6 +390,8 @@ class MainControls(QMainWindow):
 
             self.ui.plainTextEdit_results.appendPlainText("Change prob: {}\n".format(result["change_probability"]))
 
+        self.ui.plainTextEdit_results.appendPlainText("Pixel cache: {}".format(PIXEL_CACHE.stats()))
+
         return None
 
     def plot(self):
@@ -406,11 +414,12 @@ class MainControls(QMainWindow):
         # If there is a problem with any of the parameters, the first erroneous parameter
         # will cause an exception to occur which will be displayed in the GUI for the user, and the tool won't close.
         try:
-            self.extracted_data = CCDReader(x=self.ui.x1line.text(),
-                                            y=self.ui.y1line.text(),
-                                            units=self.units[self.selected_units]["unit"],
-                                            cache_dir=str(self.ui.browsecacheline.text()),
-                                            json_dir=str(self.ui.browsejsonline.text()))
+            self.extracted_data = CCDReader.get(x=self.ui.x1line.text(),
+                                                y=self.ui.y1line.text(),
+                                                units=self.units[self.selected_units]["unit"],
+                                                cache_dir=str(self.ui.browsecacheline.text()),
+                                                json_dir=str(self.ui.browsejsonline.text()),
+                                                ard_dir=self.ard_directory)
 
         except (IndexError, AttributeError, TypeError, ValueError):
             # Clear the results window
@@ -433,6 +442,21 @@ class MainControls(QMainWindow):
                                  self.extracted_data.geo_info.H,
                                  self.extracted_data.geo_info.V)
 
+        # Build reduced resolution copies of the tile's scenes in the background for the ARD viewer, with
+        # OVERVIEW_WORKERS processes
+        self.overviews = OverviewCache.get(self.ard_specs)
+
+        self.overviews.start()
+
+        # Scene-wide stretch statistics of the ARD viewer, kept next to the overviews
+        self.stretch_stats = StretchStats.get(self.ard_specs, overviews=self.overviews)
+
+        # Read the scenes around the one displayed in the ARD viewer in the background
+        if self.prefetcher:
+            self.prefetcher.stop()
+
+        self.prefetcher = ScenePrefetcher(self.ard_specs, overviews=self.overviews)
+
         # Display change model information for the entered coordinates
         self.show_model_params(data=self.extracted_data)
 
@@ -549,10 +573,21 @@ class MainControls(QMainWindow):
 
             sensor = self.ard_specs.get_sensor(sceneID)
 
+            # The reduced resolution copies of the scene's bands, None if they haven't been built yet
+            overview_files = self.overviews.get_paths(sceneID)
+
+            if overview_files:
+                overview_files = overview_files[0:7]
+
             if not self.ard:
                 self.ard = ARDViewerX(ard_file=scene_files[0:7],
                                       ccd=self.extracted_data,
                                       sensor=sensor,
+                                      overview_files=overview_files,
+                                      scene=sceneID,
+                                      prefetcher=self.prefetcher,
+                                      stretch_stats=self.stretch_stats,
+                                      ard_info=self.ard_specs,
                                       gui=self, # Provide backwards interactions with the main GUI
                                       # current_view=self.current_view # Send the previous view rectangle to the new image
                                       )
@@ -560,13 +595,19 @@ class MainControls(QMainWindow):
             else:
                 self.ard.ard_file = scene_files[0:7]
 
-                self.ard.sensor = sensor
+                self.ard.overview_files = overview_files
+
+                self.ard.scene = sceneID
 
-                self.ard.read_data()
+                self.ard.prefetcher = self.prefetcher
 
-                self.ard.get_rgb()
+                self.ard.stretch_stats = self.stretch_stats
 
-                self.ard.display_img()
+                self.ard.ard_info = self.ard_specs
+
+                self.ard.sensor = sensor
+
+                self.ard.render()
 
 
         # TODO Enable logging
@@ -592,6 +633,12 @@ class MainControls(QMainWindow):
         Returns:
             None
         """
+        if self.overviews:
+            self.overviews.stop()
+
+        if self.prefetcher:
+            self.prefetcher.stop()
+
         self.close()
 
         sys.exit(0)
@@ -14,6 +14,8 @@ from matplotlib.collections import PathCollection
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex
+
 
 class MplCanvas(FigureCanvas):
     """
@@ -79,6 +81,9 @@ class PlotWindow(QtWidgets.QMainWindow):
         # <dict> For containing the information pulled by the point_pick method defined below
         self.value_holder = dict()
 
+        # <SceneDateIndex> Resolves a clicked observation date to its scene ID with a binary search
+        self.scene_index = SceneDateIndex.get(scenes)
+
         def point_pick(event):
             """
             Define a picker method to grab data off of the plot wherever the mouse cursor is when clicked
@@ -125,25 +130,23 @@ class PlotWindow(QtWidgets.QMainWindow):
 
                     self.value_holder["temp"] = [point_clicked, artist_data]
 
-                    test_str = "{:%Y%m%d}".format(self.value_holder["temp"][1][0])
-
                     print("point clicked: {}\n\
                           nearest artist: {}\n\
                           artist data: {}\n\
                           subplot: {}".format(point_clicked, self.value_holder, artist_data, b))
 
-                    # Look through the scene IDs to find which one corresponds to the selected obs. date
-                    for scene in scenes:
-                        if test_str in scene:
-                            self.value_holder["temp"].append(scene)
-
-                            gui.ui.clicked_listWidget.addItem("Scene ID: {}\n"
-                                                              "Obs. Date: {:%Y-%b-%d}\n"
-                                                              "{}-Value: {}".format(scene,
-                                                                                    self.value_holder['temp'][1][0],
-                                                                                    b,
-                                                                                    self.value_holder['temp'][1][1][0]))
-                            break
+                    # Find the scene ID that corresponds to the selected obs. date
+                    scene = self.scene_index.find(self.value_holder["temp"][1][0])
+
+                    if scene is not None:
+                        self.value_holder["temp"].append(scene)
+
+                        gui.ui.clicked_listWidget.addItem("Scene ID: {}\n"
+                                                          "Obs. Date: {:%Y-%b-%d}\n"
+                                                          "{}-Value: {}".format(scene,
+                                                                                self.value_holder['temp'][1][0],
+                                                                                b,
+                                                                                self.value_holder['temp'][1][1][0]))
 
                 # I think the TypeError might occur when more than a single data point is returned with one click,
                 # but need to investigate further.
@@ -196,13 +196,13 @@ def draw_figure(data, items):
         # ---- Draw the predicted curves ----
         for c in range(0, len(data.results["change_models"])):
             if c == 0:
-                lines5, = axes[num, 0].plot(data.prediction_dates[c * len(data.bands)], plot_data[b][1][c], "orange",
+                lines5, = axes[num, 0].plot(data.prediction_dates[c], plot_data[b][1][c], "orange",
                                             linewidth=3, alpha=0.8, label="Model Fit")
 
                 model_lines.append(lines5)
 
             else:
-                lines5, = axes[num, 0].plot(data.prediction_dates[c * len(data.bands)], plot_data[b][1][c], "orange",
+                lines5, = axes[num, 0].plot(data.prediction_dates[c], plot_data[b][1][c], "orange",
                                             alpha=0.8, linewidth=3)
 
                 model_lines.append(lines5)
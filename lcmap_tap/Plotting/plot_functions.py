@@ -3,6 +3,8 @@
 import numpy as np
 from numpy import ndarray
 from collections import OrderedDict
+from collections.abc import Mapping
+from functools import partial
 
 
 def merge_dicts(*dict_args) -> OrderedDict:
@@ -24,6 +26,58 @@ def merge_dicts(*dict_args) -> OrderedDict:
     return result
 
 
+class LazyLookup(Mapping):
+    """
+    An ordered, read-only mapping whose values are calculated by a function the first time they are requested and
+    memoized afterwards.  Membership tests and iteration over the keys never trigger a calculation.
+    """
+
+    def __init__(self, items):
+        """
+        Args:
+            items: Iterable of (key, function) pairs, each function takes no arguments and returns the value
+
+        """
+        self._funcs = OrderedDict(items)
+
+        self._values = dict()
+
+        # Optional function called with (key, value) each time a value is calculated, e.g. to resize a cache entry
+        self.on_memoize = None
+
+    @classmethod
+    def chain(cls, *lookups):
+        """
+        Combine lookups into a new LazyLookup that reads through to, and memoizes in, the originals
+
+        Args:
+            *lookups: The LazyLookups to combine, in order
+
+        Returns:
+            result: The combined lookup
+
+        """
+        return cls((key, partial(lookup.__getitem__, key)) for lookup in lookups for key in lookup)
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._values[key] = self._funcs[key]()
+
+            if self.on_memoize is not None:
+                self.on_memoize(key, self._values[key])
+
+        return self._values[key]
+
+    def __contains__(self, key):
+        return key in self._funcs
+
+    def __iter__(self):
+        return iter(self._funcs)
+
+    def __len__(self):
+        return len(self._funcs)
+
+
 def test_for_zero(num: ndarray) -> ndarray:
     """
     Return a mask to avoid division by zero
@@ -0,0 +1,231 @@
+"""Extract a pixel's time series directly from the ARD tarballs, for tiles that don't have a YATSM cache yet.  Every
+band of every scene is read with a small window through the tar offset index, with the reads fanned out across a
+thread pool.  The window is a BLOCK x BLOCK block around the pixel rather than the single pixel, and the block is
+memoized on disk, so a later request for any pixel in the same block, or after new scenes arrive, only reads what
+isn't already known."""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from osgeo import gdal
+
+from lcmap_tap.Auxiliary import caching
+from lcmap_tap.RetrieveData.ard_info import ARDInfo
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex
+
+# <int> Rows and columns of the memoized blocks
+BLOCK = 16
+
+# <list> Index in ARDInfo.vsipaths of the bands in YATSM cache order: blue, green, red, nir, swir1, swir2, thermal, qa
+BAND_ORDER = [0, 1, 2, 3, 4, 5, 7, 6]
+
+# <list> Value used for each band when a scene can't be read, the QA fill value keeps it out of the fill mask
+FILL = [-9999, -9999, -9999, -9999, -9999, -9999, -9999, 1]
+
+# <int> Number of datasets each reader thread keeps open
+MAX_OPEN = 64
+
+# Datasets opened by each reader thread, GDAL datasets must not be shared between threads
+_local = threading.local()
+
+# <dict> ARDExtractor instances keyed by ARD directory
+_extractors = dict()
+
+
+def open_dataset(path: str):
+    """
+    Return an open GDAL dataset for a path, reusing the ones the current thread opened before
+
+    Args:
+        path: Path or GDAL virtual file path of the raster
+
+    Returns:
+        <gdal.Dataset> or None if it can't be opened
+
+    """
+    if not hasattr(_local, "datasets"):
+        _local.datasets = OrderedDict()
+
+    datasets = _local.datasets
+
+    if path in datasets:
+        datasets.move_to_end(path)
+
+        return datasets[path]
+
+    ds = gdal.Open(path)
+
+    if ds is not None:
+        datasets[path] = ds
+
+        while len(datasets) > MAX_OPEN:
+            datasets.popitem(last=False)
+
+    return ds
+
+
+class ARDExtractor:
+    def __init__(self, ard_info, memo_dir: str = None, workers: int = 16):
+        """
+        Args:
+            ard_info: <ARDInfo> The tile's ARD scenes
+            memo_dir: Directory to keep the memoized blocks in, defaults to the tool's local cache directory
+            workers: Number of reader threads
+
+        """
+        self.ard_info = ard_info
+
+        self.memo_dir = memo_dir if memo_dir is not None else caching.get_cache_dir(ard_info.root, "ard_extract")
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    @classmethod
+    def get(cls, ard_dir: str):
+        """
+        Return the extractor of an ARD directory, created once per directory and re-listing its tarballs if the
+        directory changed since
+
+        Args:
+            ard_dir: Full path to the directory containing the tile's ARD tarballs
+
+        Returns:
+            <ARDExtractor>
+
+        """
+        key = os.path.abspath(ard_dir)
+
+        mtime = os.path.getmtime(key)
+
+        if key not in _extractors or _extractors[key][0] != mtime:
+            if key in _extractors:
+                # Release the reader threads of the extractor being replaced, running reads still finish
+                _extractors[key][1].executor.shutdown(wait=False)
+
+            _extractors[key] = (mtime, cls(ARDInfo(ard_dir, "", "")))
+
+        return _extractors[key][1]
+
+    def memo_file(self, block_row: int, block_col: int) -> str:
+        """
+        Full path to the memo of a block
+
+        """
+        return os.path.join(self.memo_dir, "r{}_c{}.npz".format(block_row, block_col))
+
+    def load_memo(self, block_row: int, block_col: int):
+        """
+        Return the memoized scenes of a block
+
+        Returns:
+            Tuple of (list of scene IDs, array of shape (scenes, bands, BLOCK, BLOCK))
+
+        """
+        try:
+            with np.load(self.memo_file(block_row, block_col)) as memo:
+                return list(memo["scene_ids"]), memo["data"]
+
+        except (IOError, KeyError, ValueError):
+            return list(), np.zeros((0, len(BAND_ORDER), BLOCK, BLOCK), dtype=np.int16)
+
+    def save_memo(self, block_row: int, block_col: int, scene_ids: list, data):
+        """
+        Write the memo of a block, replacing the previous one in one step
+
+        """
+        out_file = self.memo_file(block_row, block_col)
+
+        temp = out_file + ".tmp.npz"
+
+        np.savez(temp, scene_ids=np.array(scene_ids, dtype=np.str_), data=data)
+
+        os.replace(temp, out_file)
+
+    def read_scene(self, scene: str, xoff: int, yoff: int):
+        """
+        Read the block of every band of one scene, run in a reader thread
+
+        Args:
+            scene: The scene ID
+            xoff: Column of the block's upper left pixel
+            yoff: Row of the block's upper left pixel
+
+        Returns:
+            Array of shape (bands, BLOCK, BLOCK), the fill value where a band can't be read
+
+        """
+        paths = self.ard_info.vsipaths[scene]
+
+        out = np.empty((len(BAND_ORDER), BLOCK, BLOCK), dtype=np.int16)
+
+        for num, band in enumerate(BAND_ORDER):
+            out[num] = FILL[num]
+
+            try:
+                ds = open_dataset(paths[band])
+
+                xsize = min(BLOCK, ds.RasterXSize - xoff)
+                ysize = min(BLOCK, ds.RasterYSize - yoff)
+
+                out[num, :ysize, :xsize] = ds.GetRasterBand(1).ReadAsArray(xoff, yoff, xsize, ysize)
+
+            except (AttributeError, IndexError, RuntimeError):
+                print("Couldn't read {} band {}: {}".format(scene, band, sys.exc_info()[1]))
+
+        return out
+
+    def read_block(self, block_row: int, block_col: int):
+        """
+        Return every scene of a block, reading only the scenes the memo doesn't have yet
+
+        Returns:
+            Tuple of (list of scene IDs, array of shape (scenes, bands, BLOCK, BLOCK))
+
+        """
+        scene_ids, data = self.load_memo(block_row, block_col)
+
+        known = set(scene_ids)
+
+        missing = [scene for scene in self.ard_info.scene_ids if scene not in known]
+
+        if missing:
+            futures = [self.executor.submit(self.read_scene, scene, block_col * BLOCK, block_row * BLOCK)
+                       for scene in missing]
+
+            data = np.concatenate([data, np.stack([future.result() for future in futures])])
+
+            scene_ids = scene_ids + missing
+
+            self.save_memo(block_row, block_col, scene_ids, data)
+
+        return scene_ids, data
+
+    def extract(self, row: int, col: int):
+        """
+        Extract the time series of one pixel, in the layout of CCDReader.extract_cachepoint
+
+        Args:
+            row: Pixel row within the tile
+            col: Pixel column within the tile
+
+        Returns:
+            Tuple of (array of shape (bands, scenes), ordinal dates, scene IDs), in date order
+
+        """
+        scene_ids, data = self.read_block(row // BLOCK, col // BLOCK)
+
+        # Only the tile's current scenes, in acquisition date order
+        current = set(self.ard_info.scene_ids)
+
+        keep = np.array([scene in current for scene in scene_ids], dtype=bool)
+
+        image_ids = np.array(scene_ids, dtype=np.str_)[keep]
+
+        values = data[keep][:, :, row % BLOCK, col % BLOCK].T.astype(np.int32)
+
+        index = SceneDateIndex.get(image_ids)
+
+        return values[:, index.order], np.copy(index.sorted_dates), image_ids[index.order]
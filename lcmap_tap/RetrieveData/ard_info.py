@@ -3,7 +3,14 @@
 import os
 import re
 import datetime
+from functools import partial
 
+from lcmap_tap.Plotting.plot_functions import LazyLookup
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex
+from lcmap_tap.RetrieveData.tar_index import TarIndex
+
+# <int> Index of PIXELQA in ARDInfo.vsipaths, the surface reflectance bands come before it and the thermal bands after
+QA_NUM = 6
 
 band_specs = {
     "LC08": {
@@ -78,8 +85,14 @@ class ARDInfo:
 
         self.num_scenes = len(self.scene_ids)
 
+        # <SceneDateIndex> Look up the tile's scenes by acquisition date
+        self.date_index = SceneDateIndex.get(self.scene_ids)
+
         self.lookup = self.tarfile_lookup()
 
+        # <TarIndex> Persisted byte offsets of the tarball members so rasters open without a tar walk
+        self.tar_index = TarIndex(self.root)
+
         self.vsipaths = self.get_vsipath_list()
 
     def get_subdir(self) -> str:
@@ -156,32 +169,45 @@ class ARDInfo:
         """
         return band_specs[sensor]
 
-    @staticmethod
-    def get_vsipath(in_tar: str, band: str) -> str:
+    def get_vsipath(self, in_tar: str, band: str) -> str:
         """
-        Return the virtual file paths for the current tarball
+        Return the virtual file path for a band of the current tarball, opening the member directly at its byte offset
+        when the tarball is indexed
         :param in_tar: The full path to the scene tarball
         :param band: The sensor specific bands
         :return:
         """
-        return "/vsitar/{}".format(in_tar) + os.sep + os.path.basename(in_tar)[:40] + "_{}.tif".format(band)
+        return self.tar_index.vsipath(in_tar, os.path.basename(in_tar)[:40] + "_{}.tif".format(band))
 
-    def get_vsipath_list(self) -> dict:
+    def get_scene_vsipaths(self, scene: str) -> list:
         """
-        Return a dict containing all of the vsi paths, ready to open when needed
+        Return the virtual file paths of all bands of a scene
+        :param scene: The scene ID
         :return:
         """
-        paths = dict()
+        prods = self.get_bands(self.get_sensor(scene))
 
-        for scene in self.scene_ids:
-            prods = self.get_bands(self.get_sensor(scene))
+        paths = list()
 
-            paths[scene] = list()
+        for prod in prods:
+            tarfile = self.lookup[scene][prod]
 
-            for prod in prods:
-                tarfile = self.lookup[scene][prod]
-
-                for band in prods[prod]:
-                    paths[scene].append(self.get_vsipath(tarfile, prods[prod][band]))
+            for band in prods[prod]:
+                paths.append(self.get_vsipath(tarfile, prods[prod][band]))
 
         return paths
+
+    def get_vsipath_list(self) -> LazyLookup:
+        """
+        Return a mapping of scene ID: vsi paths.  A scene's paths are resolved the first time it is requested, which
+        indexes its tarballs if they aren't indexed yet
+        :return:
+        """
+        return LazyLookup((scene, partial(self.get_scene_vsipaths, scene)) for scene in self.scene_ids)
+
+    def build_tar_index(self):
+        """
+        Index the members of every tarball of the tile up front
+        :return:
+        """
+        self.tar_index.build(tar for scene in self.scene_ids for tar in self.lookup[scene].values())
@@ -0,0 +1,364 @@
+"""Headless extraction of many points without the GUI.  Points are read from a CSV or a point shapefile, grouped by
+the cache row they fall in, and extracted with BatchReader across a pool of processes.  The observations, masks,
+segment attributes and model predictions are written to columnar .npz files, one set per group of points so memory
+use doesn't grow with the number of points, e.g.
+
+    lcmap_tap_extract points.csv /data/cache/h05v02 /data/json/h05v02 -o /data/out -w 16
+
+Each part holds flat arrays keyed by column name and a "point" column referring back to the input order."""
+
+import argparse
+import csv
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from lcmap_tap.RetrieveData.batch_reader import BatchReader
+from lcmap_tap.RetrieveData.pixel_store import PixelStore
+from lcmap_tap.RetrieveData.retrieve_data import CONUS_EXTENT, GeoInfo
+from lcmap_tap.RetrieveData.tile_inventory import TileInventory
+
+# <tuple> Band names as stored in the PyCCD change models
+BANDS = ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal')
+
+# <tuple> Per-segment attributes copied from each change model
+SEGMENT_ATTRS = ("start_day", "end_day", "break_day", "observation_count", "change_probability", "curve_qa")
+
+# <tuple> Per-band attributes copied from each change model
+BAND_ATTRS = ("magnitude", "rmse", "intercept")
+
+
+def read_csv(in_file: str, x_field: str = "x", y_field: str = "y") -> np.ndarray:
+    """
+    Read point coordinates from a CSV file with a header row
+
+    Args:
+        in_file: Full path to the CSV
+        x_field: Name of the X-coordinate column
+        y_field: Name of the Y-coordinate column
+
+    Returns:
+        Array of shape (points, 2)
+
+    """
+    with open(in_file, "r", newline="") as f:
+        reader = csv.DictReader(f)
+
+        coords = [(float(row[x_field]), float(row[y_field])) for row in reader]
+
+    return np.array(coords, dtype=np.float64).reshape(-1, 2)
+
+
+def read_shapefile(in_file: str, units: str = "meters") -> np.ndarray:
+    """
+    Read point coordinates from a point shapefile, reprojected to the given units if the layer has a spatial reference
+
+    Args:
+        in_file: Full path to the shapefile
+        units: The units the coordinates are returned in ("meters", "lat/long")
+
+    Returns:
+        Array of shape (points, 2)
+
+    """
+    from osgeo import ogr, osr
+    from lcmap_tap.RetrieveData.retrieve_data import UNITS_WKT
+
+    source = ogr.Open(in_file)
+
+    if source is None:
+        raise IOError("Couldn't open {}".format(in_file))
+
+    layer = source.GetLayer()
+
+    transform = None
+
+    layer_srs = layer.GetSpatialRef()
+
+    if layer_srs is not None:
+        out_srs = osr.SpatialReference()
+        out_srs.ImportFromWkt(UNITS_WKT[units])
+
+        transform = osr.CoordinateTransformation(layer_srs, out_srs)
+
+    coords = list()
+
+    for feature in layer:
+        point = feature.GetGeometryRef().Clone()
+
+        if transform is not None:
+            point.Transform(transform)
+
+        coords.append((point.GetX(), point.GetY()))
+
+    return np.array(coords, dtype=np.float64).reshape(-1, 2)
+
+
+def make_groups(coords: np.ndarray, units: str, chunk_size: int) -> list:
+    """
+    Split the points into groups for the workers.  Points in the same tile and cache row are kept together so each
+    row file is read by one worker only, and small rows are combined up to chunk_size points.
+
+    Args:
+        coords: Array of shape (points, 2)
+        units: How to interpret the coordinates ("meters", "lat/long")
+        chunk_size: Target number of points per group
+
+    Returns:
+        list of arrays of point numbers
+
+    """
+    loc = GeoInfo.locate(coords[:, 0], coords[:, 1], units=units)
+
+    rows = OrderedDict()
+
+    for num, key in enumerate(zip(loc.h.tolist(), loc.v.tolist(), loc.pixel_rowcol.row.tolist())):
+        rows.setdefault(key, list()).append(num)
+
+    groups, current = list(), list()
+
+    for nums in rows.values():
+        current.extend(nums)
+
+        if len(current) >= chunk_size:
+            groups.append(np.array(current))
+
+            current = list()
+
+    if current:
+        groups.append(np.array(current))
+
+    return groups
+
+
+def update_stores(coords: np.ndarray, units: str, cache_dir: str, json_dir: str):
+    """
+    Ingest every chip the points fall in into the PixelStores before the workers start.  The stores aren't safe to
+    write from several processes at once, this way the workers only ever read them.
+
+    Args:
+        coords: Array of shape (points, 2)
+        units: How to interpret the coordinates ("meters", "lat/long")
+        cache_dir: Full path to the tile-specific ARD cache
+        json_dir: Full path to the tile and version specific PyCCD results
+
+    """
+    inventory = TileInventory.get(cache_dir=cache_dir, json_dir=json_dir)
+
+    loc = GeoInfo.locate(coords[:, 0], coords[:, 1], units=units)
+
+    chips = set(zip(loc.h.tolist(), loc.v.tolist(), loc.chip_coord.x.tolist(), loc.chip_coord.y.tolist()))
+
+    stores = dict()
+
+    for h, v, chip_x, chip_y in sorted(chips):
+        if (h, v) not in stores:
+            _, affine = GeoInfo.geospatial_hv(loc=CONUS_EXTENT, h=h, v=v)
+
+            stores[(h, v)] = PixelStore.get_store(json_dir=json_dir, tile="H{:02d}V{:02d}".format(h, v),
+                                                  affine=affine)
+
+        chip_file = inventory.json_file(chip_x, chip_y)
+
+        if chip_file is not None and not stores[(h, v)].is_current(chip_file):
+            stores[(h, v)].add_chip(chip_file)
+
+
+def reader_columns(num: int, reader, step: int = 1) -> dict:
+    """
+    Flatten the data of one CCDReader into columns
+
+    Args:
+        num: The point number
+        reader: <CCDReader>
+        step: Spacing in days of the model predictions
+
+    Returns:
+        dict of table name: dict of column name: array
+
+    """
+    n_obs = reader.dates.size
+
+    obs = OrderedDict([("point", np.full(n_obs, num, dtype=np.int64)),
+                       ("date", reader.dates.astype(np.int64)),
+                       ("image_id", np.asarray(reader.image_ids, dtype=np.str_))])
+
+    for b, band in enumerate(BANDS):
+        obs[band] = reader.data[b]
+
+    obs["qa"] = reader.qa
+
+    # Align the masks of the observations inside the PyCCD date range with the full observation list
+    processing_mask = np.zeros(n_obs, dtype=bool)
+    processing_mask[reader.date_mask] = reader.ccd_mask
+
+    obs["in_date_range"] = reader.date_mask
+    obs["fill_mask"] = reader.fill_mask
+    obs["processing_mask"] = processing_mask
+
+    models = reader.results["change_models"]
+
+    seg = OrderedDict([("point", np.full(len(models), num, dtype=np.int64)),
+                       ("segment", np.arange(len(models), dtype=np.int32))])
+
+    for attr in SEGMENT_ATTRS:
+        seg[attr] = np.array([model.get(attr, np.nan) for model in models], dtype=np.float64)
+
+    for band in BANDS:
+        for attr in BAND_ATTRS:
+            seg["{}_{}".format(band, attr)] = np.array([model[band].get(attr, np.nan) for model in models],
+                                                      dtype=np.float64)
+
+    predictions = reader.predictions
+
+    if step > 1:
+        # Keep every step-th day of each segment
+        starts = np.array([model["start_day"] for model in models], dtype=np.int64)
+
+        predictions = predictions[(predictions["date"] - starts[predictions["segment"]]) % step == 0]
+
+    pred = OrderedDict([("point", np.full(predictions.size, num, dtype=np.int64)),
+                        ("segment", predictions["segment"]),
+                        ("date", predictions["date"])])
+
+    for band in BANDS:
+        pred[band] = predictions[band]
+
+    return {"observations": obs, "segments": seg, "predictions": pred}
+
+
+def extract_group(nums, coords, units, cache_dir, json_dir, step=1) -> tuple:
+    """
+    Extract one group of points, run in a worker process.  Only plain arrays are returned because CCDReader
+    instances can't be pickled.
+
+    Args:
+        nums: Array of point numbers
+        coords: Array of shape (len(nums), 2)
+        units: How to interpret the coordinates
+        cache_dir: Full path to the tile-specific ARD cache
+        json_dir: Full path to the tile and version specific PyCCD results
+        step: Spacing in days of the model predictions
+
+    Returns:
+        Tuple of (dict of table name: dict of column name: array, dict of point number: error message)
+
+    """
+    batch = BatchReader(coords, units, cache_dir, json_dir)
+
+    readers = batch.read()
+
+    tables = OrderedDict()
+
+    for i, reader in enumerate(readers):
+        if reader is None:
+            continue
+
+        for name, columns in reader_columns(int(nums[i]), reader, step=step).items():
+            table = tables.setdefault(name, OrderedDict())
+
+            for key, values in columns.items():
+                table.setdefault(key, list()).append(values)
+
+    tables = {name: {key: np.concatenate(values) for key, values in columns.items()}
+              for name, columns in tables.items()}
+
+    errors = {int(nums[i]): message for i, message in batch.errors.items()}
+
+    return tables, errors
+
+
+def write_part(out_dir: str, part: int, tables: dict):
+    """
+    Write the tables of one group as {table}_{part}.npz files
+
+    Args:
+        out_dir: Output directory
+        part: The group number
+        tables: dict of table name: dict of column name: array
+
+    """
+    for name, columns in tables.items():
+        np.savez(os.path.join(out_dir, "{}_{:05d}.npz".format(name, part)), **columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the ARD observations and PyCCD results of many points "
+                                                 "without the GUI")
+
+    parser.add_argument("points", help="CSV file with a header row, or a point shapefile")
+
+    parser.add_argument("cache_dir", help="Full path to the tile-specific ARD cache")
+
+    parser.add_argument("json_dir", help="Full path to the tile and version specific PyCCD results")
+
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="Output directory, default is the current one")
+
+    parser.add_argument("-u", "--units", default="meters", choices=["meters", "lat/long"],
+                        help="Units of the CSV coordinates and of the shapefile reprojection")
+
+    parser.add_argument("--xfield", default="x", help="CSV column holding the X-coordinate")
+
+    parser.add_argument("--yfield", default="y", help="CSV column holding the Y-coordinate")
+
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+
+    parser.add_argument("--chunk-size", type=int, default=500, help="Target number of points per worker task")
+
+    parser.add_argument("--step", type=int, default=1, help="Spacing in days of the model predictions")
+
+    args = parser.parse_args()
+
+    if args.points.lower().endswith(".shp"):
+        coords = read_shapefile(args.points, units=args.units)
+
+    else:
+        coords = read_csv(args.points, x_field=args.xfield, y_field=args.yfield)
+
+    os.makedirs(args.output, exist_ok=True)
+
+    update_stores(coords, args.units, args.cache_dir, args.json_dir)
+
+    groups = make_groups(coords, args.units, args.chunk_size)
+
+    errors = dict()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(extract_group, nums, coords[nums], args.units, args.cache_dir, args.json_dir,
+                                   args.step): part
+                   for part, nums in enumerate(groups)}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            part = futures[future]
+
+            try:
+                tables, group_errors = future.result()
+
+            except Exception:
+                group_errors = {int(num): str(sys.exc_info()[1]) for num in groups[part]}
+
+                tables = dict()
+
+            write_part(args.output, part, tables)
+
+            errors.update(group_errors)
+
+            print("Finished group {} of {}".format(done, len(groups)))
+
+    # Record the input coordinates and the outcome of every point
+    status = np.array([errors.get(num, "") for num in range(len(coords))], dtype=np.str_)
+
+    np.savez(os.path.join(args.output, "points.npz"),
+             point=np.arange(len(coords), dtype=np.int64),
+             x=coords[:, 0],
+             y=coords[:, 1],
+             error=status)
+
+    print("Extracted {} of {} points".format(len(coords) - len(errors), len(coords)))
+
+
+if __name__ == "__main__":
+    main()
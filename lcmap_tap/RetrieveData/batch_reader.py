@@ -0,0 +1,192 @@
+"""Extract many points of a tile at once.  Points are grouped by the cache row and the JSON chip they fall in, so
+every file is read once no matter how many points it serves."""
+
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from lcmap_tap.RetrieveData.retrieve_data import CCDReader, GeoCoordinate, GeoInfo
+from lcmap_tap.RetrieveData.mmap_cache import MmapCache
+from lcmap_tap.RetrieveData.pixel_store import PixelStore
+from lcmap_tap.RetrieveData.tile_inventory import TileInventory
+
+
+class BatchReader:
+    def __init__(self, coords, units, cache_dir, json_dir):
+        """
+        Args:
+            coords: Sequence or (N, 2) array of (x, y) coordinates in the given units
+            units: <str> How to interpret the coordinates ("meters", "lat/long")
+            cache_dir: <str> Full path to the tile-specific ARD cache
+            json_dir: <str> Full path to the tile and version specific PyCCD results
+
+        """
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+
+        self.units = units
+
+        self.cache_dir = cache_dir
+
+        self.json_dir = json_dir
+
+        self.inventory = TileInventory.get(cache_dir=self.cache_dir, json_dir=self.json_dir)
+
+        self.mmap_cache = MmapCache(self.cache_dir)
+
+        # <dict> Point number: error message for the points that couldn't be extracted
+        self.errors = dict()
+
+        self.geo_infos = self.locate()
+
+    def locate(self) -> list:
+        """
+        Locate every point on the ARD grid with one coordinate transformation and one GeoInfo.locate call
+
+        Returns:
+            list with one GeoInfo per input coordinate
+
+        """
+        given = GeoCoordinate(x=self.coords[:, 0], y=self.coords[:, 1])
+
+        if self.units == "meters":
+            coord, geo_coord = given, GeoInfo.unit_conversion(coord=given)
+
+        else:
+            coord, geo_coord = GeoInfo.unit_conversion(coord=given, src=self.units, dest="meters"), given
+
+        location = GeoInfo.locate(coord.x, coord.y)
+
+        return [GeoInfo.from_location(location, num, coord, geo_coord, units=self.units)
+                for num in range(len(self.coords))]
+
+    def group(self, key):
+        """
+        Group the point numbers by a key computed from each point's GeoInfo
+
+        Args:
+            key: Function of a GeoInfo returning a hashable key
+
+        Returns:
+            OrderedDict of key: list of point numbers
+
+        """
+        groups = OrderedDict()
+
+        for num, geo_info in enumerate(self.geo_infos):
+            groups.setdefault(key(geo_info), list()).append(num)
+
+        return groups
+
+    def read_results(self) -> dict:
+        """
+        Read the PyCCD results of every point, parsing each chip JSON file at most once
+
+        Returns:
+            dict of point number: decoded results
+
+        """
+        results = dict()
+
+        stores = dict()
+
+        for (h, v, chip_x, chip_y), nums in self.group(lambda g: (g.H, g.V, g.chip_coord.x, g.chip_coord.y)).items():
+            try:
+                if (h, v) not in stores:
+                    stores[(h, v)] = PixelStore.get_store(json_dir=self.json_dir,
+                                                          tile="H{:02d}V{:02d}".format(h, v),
+                                                          affine=self.geo_infos[nums[0]].PIXEL_AFFINE)
+
+                store = stores[(h, v)]
+
+                chip_file = self.inventory.json_file(chip_x, chip_y)
+
+                if chip_file is None:
+                    raise ValueError("No PyCCD results for the chip at ({}, {})".format(chip_x, chip_y))
+
+                if not store.is_current(chip_file):
+                    store.add_chip(chip_file)
+
+                for num in nums:
+                    results[num] = store.get(self.geo_infos[num].pixel_rowcol)
+
+            except (IOError, TypeError, ValueError):
+                for num in nums:
+                    self.errors[num] = str(sys.exc_info()[1])
+
+        return results
+
+    def read_cachepoints(self) -> dict:
+        """
+        Read the spectral values of every point, loading each cache row at most once
+
+        Returns:
+            dict of point number: (data, dates, image_ids)
+
+        """
+        points = dict()
+
+        for row, nums in self.group(lambda g: g.rowcol.row).items():
+            try:
+                cache_file = self.inventory.cache_file(row)
+
+                if self.mmap_cache.is_current(row, cache_file):
+                    values = np.load(self.mmap_cache.data_file(row), mmap_mode="r")
+
+                    image_ids = np.load(self.mmap_cache.ids_file(row))
+
+                    def column(col):
+                        return np.array(values[col])
+
+                else:
+                    values, image_ids = CCDReader.load_cache(cache_file)
+
+                    def column(col):
+                        return np.array(values[:, :, col])
+
+                dates = CCDReader.imageid_date(image_ids)
+
+                for num in nums:
+                    # Each point gets its own copies, CCDReader modifies its arrays in place
+                    points[num] = (column(self.geo_infos[num].rowcol.column), np.copy(dates), np.copy(image_ids))
+
+            except (IOError, IndexError, TypeError, ValueError, AttributeError):
+                for num in nums:
+                    self.errors[num] = str(sys.exc_info()[1])
+
+        return points
+
+    def read(self) -> list:
+        """
+        Extract every point
+
+        Returns:
+            list with one CCDReader per input coordinate, None for points that couldn't be extracted (see self.errors)
+
+        """
+        results = self.read_results()
+
+        points = self.read_cachepoints()
+
+        readers = list()
+
+        for num, (x, y) in enumerate(self.coords):
+            if num in self.errors or results.get(num) is None:
+                self.errors.setdefault(num, "No PyCCD results for this point")
+
+                readers.append(None)
+
+                continue
+
+            try:
+                readers.append(CCDReader(x=str(x), y=str(y), units=self.units,
+                                         cache_dir=self.cache_dir, json_dir=self.json_dir,
+                                         results=results[num], cachepoint=points[num],
+                                         geo_info=self.geo_infos[num]))
+
+            except (IndexError, KeyError, TypeError, ValueError):
+                self.errors[num] = str(sys.exc_info()[1])
+
+                readers.append(None)
+
+        return readers
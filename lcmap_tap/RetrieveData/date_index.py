@@ -0,0 +1,159 @@
+"""Parse the acquisition dates of ARD scene IDs in bulk and look scenes up by date.  Scene IDs are fixed width, e.g.
+LE07_CU_013005_20041223, so the YYYYMMDD characters sit at the same position in every ID and can be decoded for the
+whole array at once instead of with one strptime call per ID."""
+
+import numpy as np
+from numpy import ndarray
+
+# <slice> Position of the YYYYMMDD acquisition date in a scene ID
+DATE_CHARS = slice(15, 23)
+
+# <int> Ordinal day of 1970-01-01, the numpy datetime64 epoch
+EPOCH_ORDINAL = 719163
+
+# <dict> Memoized SceneDateIndex instances keyed by the scene IDs they were built from
+_indexes = dict()
+
+
+def parse_dates(scene_ids) -> ndarray:
+    """
+    Return the ordinal acquisition date of every scene ID, equivalent to
+    [dt.datetime.strptime(s[15:23], "%Y%m%d").toordinal() for s in scene_ids]
+
+    Args:
+        scene_ids: Sequence or array of scene ID strings
+
+    Returns:
+        result: int64 array of ordinal days
+
+    """
+    ids = np.asarray(scene_ids, dtype=np.str_)
+
+    if ids.size == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # View the fixed width unicode array as its code points, one row per ID
+    chars = ids.reshape(-1).view(np.uint32).reshape(ids.size, -1)[:, DATE_CHARS].astype(np.int64) - ord("0")
+
+    if chars.shape[1] != 8 or np.any((chars < 0) | (chars > 9)):
+        raise ValueError("Scene IDs don't contain a YYYYMMDD date at characters 15 to 23")
+
+    digits = chars @ 10 ** np.arange(7, -1, -1, dtype=np.int64)
+
+    year, month, day = digits // 10000, digits // 100 % 100, digits % 100
+
+    # Build datetime64 values from the parts, then convert days since the epoch to ordinal days
+    months = (year - 1970) * 12 + (month - 1)
+
+    days = months.astype("datetime64[M]").astype("datetime64[D]") + (day - 1)
+
+    if np.any(days.astype("datetime64[M]") != months.astype("datetime64[M]")):
+        raise ValueError("Scene IDs contain an invalid date")
+
+    return (days.astype(np.int64) + EPOCH_ORDINAL).reshape(ids.shape)
+
+
+class SceneDateIndex:
+    def __init__(self, scene_ids):
+        """
+        Args:
+            scene_ids: Sequence or array of scene ID strings, in any order
+
+        """
+        self.scene_ids = np.asarray(scene_ids, dtype=np.str_)
+
+        # <ndarray> Ordinal date of each scene, in the input order
+        self.dates = parse_dates(self.scene_ids)
+
+        # <ndarray> Input positions sorted by date, stable so scenes sharing a date keep their input order
+        self.order = np.argsort(self.dates, kind="mergesort")
+
+        self.sorted_dates = self.dates[self.order]
+
+    @classmethod
+    def get(cls, scene_ids):
+        """
+        Return the index for a set of scene IDs, parsing them only the first time the set is seen.  Every row of a
+        tile's cache holds the same scene IDs, so this is a one-time cost per tile.
+
+        Args:
+            scene_ids: Sequence or array of scene ID strings
+
+        Returns:
+            <SceneDateIndex>
+
+        """
+        ids = np.asarray(scene_ids, dtype=np.str_)
+
+        key = (ids.shape, ids.dtype.str, hash(ids.tobytes()))
+
+        if key not in _indexes:
+            _indexes[key] = cls(ids)
+
+        return _indexes[key]
+
+    def __len__(self):
+        return self.sorted_dates.size
+
+    def positions(self, date) -> ndarray:
+        """
+        Return the input positions of every scene acquired on a date
+
+        Args:
+            date: Ordinal day, or a date/datetime object
+
+        Returns:
+            result: Array of positions into scene_ids, in input order
+
+        """
+        if hasattr(date, "toordinal"):
+            date = date.toordinal()
+
+        lo, hi = np.searchsorted(self.sorted_dates, [date, date + 1], side="left")
+
+        return self.order[lo:hi]
+
+    def find(self, date):
+        """
+        Return the first scene ID acquired on a date
+
+        Args:
+            date: Ordinal day, or a date/datetime object
+
+        Returns:
+            result: The scene ID, or None if no scene was acquired that day
+
+        """
+        pos = self.positions(date)
+
+        if pos.size == 0:
+            return None
+
+        return str(self.scene_ids[pos[0]])
+
+    def nearest(self, date):
+        """
+        Return the scene ID acquired closest to a date, the earlier one on a tie
+
+        Args:
+            date: Ordinal day, or a date/datetime object
+
+        Returns:
+            result: The scene ID, or None if the index is empty
+
+        """
+        if len(self) == 0:
+            return None
+
+        if hasattr(date, "toordinal"):
+            date = date.toordinal()
+
+        i = int(np.searchsorted(self.sorted_dates, date, side="left"))
+
+        if i == len(self) or (i > 0 and date - self.sorted_dates[i - 1] <= self.sorted_dates[i] - date):
+            i = self.positions(self.sorted_dates[i - 1])[0]
+
+        else:
+            i = self.order[i]
+
+        return str(self.scene_ids[i])
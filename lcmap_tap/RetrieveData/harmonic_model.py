@@ -0,0 +1,136 @@
+"""Batched evaluation of the PyCCD harmonic change models.  The models are
+
+    intercept + c0 * t + c1 * cos(wt) + c2 * sin(wt) + c3 * cos(2wt) + c4 * sin(2wt) + c5 * cos(3wt) + c6 * sin(3wt)
+
+with w = 2 * pi / 365.25, so for a vector of dates they are a product of a harmonic design matrix, built once per
+date vector, with the stacked intercepts and coefficients of every band."""
+
+import numpy as np
+from numpy import ndarray
+
+# <float> The period of the harmonic terms in days
+AVG_DAYS_YR = 365.25
+
+
+def design_matrix(days: ndarray) -> ndarray:
+    """
+    Build the harmonic design matrix for a vector of ordinal dates
+
+    Args:
+        days: The ordinal dates
+
+    Returns:
+        result: Array of shape (dates, 8) with the columns 1, t, cos(wt), sin(wt), cos(2wt), sin(2wt), cos(3wt), sin(3wt)
+
+    """
+    days = np.asarray(days, dtype=np.float64)
+
+    result = np.empty((days.size, 8), dtype=np.float64)
+
+    result[:, 0] = 1.0
+
+    result[:, 1] = days
+
+    for k in range(1, 4):
+        arg = days * k * 2 * np.pi / AVG_DAYS_YR
+
+        result[:, 2 * k] = np.cos(arg)
+
+        result[:, 2 * k + 1] = np.sin(arg)
+
+    return result
+
+
+def model_coefficients(change_models: list, bands: tuple) -> ndarray:
+    """
+    Stack the intercept and coefficients of each band of each change model
+
+    Args:
+        change_models: The "change_models" of a PyCCD result
+        bands: The band names used as keys in the change models
+
+    Returns:
+        result: Array of shape (models, 8, bands), row 0 holds the intercepts
+
+    """
+    result = np.zeros((len(change_models), 8, len(bands)), dtype=np.float64)
+
+    for m, model in enumerate(change_models):
+        for b, band in enumerate(bands):
+            result[m, 0, b] = model[band]["intercept"]
+
+            result[m, 1:, b] = model[band]["coefficients"][:7]
+
+    return result
+
+
+def evaluate_dates(days: ndarray, coefs: ndarray) -> ndarray:
+    """
+    Evaluate any number of models on one shared date vector, e.g. every pixel of a chip for a synthetic image
+
+    Args:
+        days: The ordinal dates
+        coefs: Array of shape (..., 8, bands) as returned by model_coefficients
+
+    Returns:
+        result: Array of shape (..., dates, bands)
+
+    """
+    return np.matmul(design_matrix(days), coefs)
+
+
+def evaluate(change_models: list, bands: tuple) -> ndarray:
+    """
+    Evaluate every band of every change model over the model's own date range (start_day to end_day, daily) with a
+    single batched matrix product
+
+    Args:
+        change_models: The "change_models" of a PyCCD result
+        bands: The band names used as keys in the change models, each becomes a field of the output
+
+    Returns:
+        result: Structured array with one record per (model, date) holding the fields "segment", "date" and one
+                float field per band, ordered by model then date
+
+    """
+    dtype = [("segment", np.int32), ("date", np.int64)] + [(band, np.float64) for band in bands]
+
+    days = [np.arange(model["start_day"], model["end_day"] + 1) for model in change_models]
+
+    if not days:
+        return np.zeros(0, dtype=dtype)
+
+    segment = np.repeat(np.arange(len(days), dtype=np.int32), [len(d) for d in days])
+
+    days = np.concatenate(days)
+
+    # Pair every row of the design matrix with the coefficients of its own model
+    values = np.einsum("nk,nkb->nb", design_matrix(days), model_coefficients(change_models, bands)[segment])
+
+    result = np.zeros(days.size, dtype=dtype)
+
+    result["segment"] = segment
+
+    result["date"] = days
+
+    for b, band in enumerate(bands):
+        result[band] = values[:, b]
+
+    return result
+
+
+def segment_slices(predictions: ndarray, num_segments: int) -> list:
+    """
+    Return the slice of each model's records in the output of evaluate
+
+    Args:
+        predictions: Structured array returned by evaluate
+        num_segments: The number of change models
+
+    Returns:
+        result: list of slices, one per model
+
+    """
+    bounds = np.searchsorted(predictions["segment"], np.arange(num_segments + 1))
+
+    return [slice(bounds[m], bounds[m + 1]) for m in range(num_segments)]
@@ -0,0 +1,214 @@
+"""Pixel-major, memory-mapped copies of the YATSM cache files.  A YATSM row file stores its values as
+(bands, observations, columns), so pulling one pixel out of it means decompressing and materializing the whole row.
+The converted layout stores each row as (columns, bands, observations) in an uncompressed .npy file, which makes a
+pixel's full time series a single contiguous slice of a memory-map.
+
+A row is converted in a background thread the first time one of its pixels is read from the YATSM cache, and again
+when its YATSM file changes.  The lcmap_tap_mmap command converts a whole tile ahead of time."""
+
+import argparse
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lcmap_tap.Auxiliary import caching
+
+# Converts rows in the background, one at a time so the tool's own reads aren't starved of disk bandwidth
+_converter = ThreadPoolExecutor(max_workers=1)
+
+# <set> The (output directory, row) of the conversions that are queued or running
+_converting = set()
+
+_lock = threading.Lock()
+
+
+def get_row(file: str):
+    """
+    Return the row number encoded in a YATSM cache file name, e.g. yatsm_r123_n2049_b8.npy.npz -> 123
+
+    Args:
+        file: The cache file name or full path
+
+    Returns:
+        <int> The row number, or None if the file isn't a row cache file
+
+    """
+    match = re.search(r"r(\d+)", os.path.basename(file))
+
+    if match is None:
+        return None
+
+    return int(match.group(1))
+
+
+class MmapCache:
+    def __init__(self, cache_dir: str, out_dir: str = None):
+        """
+        Args:
+            cache_dir: Full path to the tile-specific YATSM cache
+            out_dir: Directory holding the converted files, by default a local cache directory tied to cache_dir
+
+        """
+        self.cache_dir = cache_dir
+
+        if out_dir is None:
+            out_dir = caching.get_cache_dir(cache_dir, "pixel_major")
+
+        self.out_dir = out_dir
+
+    def data_file(self, row: int) -> str:
+        """
+        Full path to the converted values of a row
+
+        """
+        return os.path.join(self.out_dir, "r{}_Y.npy".format(row))
+
+    def ids_file(self, row: int) -> str:
+        """
+        Full path to the image IDs of a row
+
+        """
+        return os.path.join(self.out_dir, "r{}_image_IDs.npy".format(row))
+
+    def has_row(self, row: int) -> bool:
+        """
+        Check whether a row has been converted
+
+        """
+        return os.path.exists(self.data_file(row)) and os.path.exists(self.ids_file(row))
+
+    def is_current(self, row: int, source: str = None) -> bool:
+        """
+        Check whether a row has been converted and is at least as new as its YATSM cache file
+
+        Args:
+            row: The row number
+            source: Full path to the row's YATSM cache file, None if there isn't one to compare against
+
+        """
+        if not self.has_row(row):
+            return False
+
+        return source is None or os.path.getmtime(self.data_file(row)) >= os.path.getmtime(source)
+
+    def convert_file(self, file: str, overwrite: bool = False):
+        """
+        Rewrite one YATSM row file into the pixel-major layout
+
+        Args:
+            file: Full path to the YATSM cache file
+            overwrite: If False, skip rows that are already converted and newer than the source file
+
+        Returns:
+            None
+
+        """
+        row = get_row(file)
+
+        if row is None:
+            return None
+
+        if not overwrite and self.is_current(row, file):
+            return None
+
+        data = np.load(file)
+
+        # (bands, observations, columns) -> (columns, bands, observations)
+        values = np.ascontiguousarray(np.transpose(data["Y"], (2, 0, 1)))
+
+        # Write to temporary names first so that an interrupted conversion never leaves a partial row behind
+        temp_data = self.data_file(row) + ".tmp.npy"
+        temp_ids = self.ids_file(row) + ".tmp.npy"
+
+        np.save(temp_data, values)
+        np.save(temp_ids, np.asarray(data["image_IDs"]).astype(str))
+
+        os.replace(temp_ids, self.ids_file(row))
+        os.replace(temp_data, self.data_file(row))
+
+    def convert_later(self, file: str):
+        """
+        Convert a row file in the background thread, does nothing if its conversion is already queued
+
+        Args:
+            file: Full path to the YATSM cache file
+
+        Returns:
+            None
+
+        """
+        key = (self.out_dir, get_row(file))
+
+        with _lock:
+            if key in _converting:
+                return None
+
+            _converting.add(key)
+
+        def convert():
+            try:
+                self.convert_file(file)
+
+            except (IOError, KeyError, ValueError):
+                print("Couldn't convert {}: {}".format(file, sys.exc_info()[1]))
+
+            finally:
+                with _lock:
+                    _converting.discard(key)
+
+        _converter.submit(convert)
+
+    def convert(self, overwrite: bool = False):
+        """
+        Rewrite every row file in the cache directory
+
+        Args:
+            overwrite: If False, only convert rows that are missing or out of date
+
+        Returns:
+            None
+
+        """
+        for f in sorted(os.listdir(self.cache_dir)):
+            if f.endswith(".npz"):
+                self.convert_file(os.path.join(self.cache_dir, f), overwrite=overwrite)
+
+    def load_pixel(self, row: int, column: int):
+        """
+        Read the time series of a single pixel
+
+        Args:
+            row: The pixel row within the tile
+            column: The pixel column within the tile
+
+        Returns:
+            Tuple of the (bands, observations) values and the image IDs
+
+        """
+        values = np.load(self.data_file(row), mmap_mode="r")
+
+        return np.array(values[column]), np.load(self.ids_file(row))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a tile's YATSM cache into the pixel-major memory-mapped "
+                                                 "layout used by the TAP tool")
+
+    parser.add_argument("cache_dir", help="Full path to the tile-specific YATSM cache")
+
+    parser.add_argument("-o", "--output", default=None,
+                        help="Output directory, defaults to the tool's local cache directory")
+
+    parser.add_argument("--overwrite", action="store_true", help="Re-convert rows that are already up to date")
+
+    args = parser.parse_args()
+
+    MmapCache(args.cache_dir, out_dir=args.output).convert(overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
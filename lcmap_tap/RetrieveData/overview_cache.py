@@ -0,0 +1,284 @@
+"""Reduced-resolution copies of the ARD bands kept in the local cache directory.  Each band of a scene is written once
+as a tiled GeoTIFF at 1/OVERVIEW_LEVEL of the full resolution, with internal overviews below that, so a fully zoomed
+out tile can be displayed from a file of a few hundred kilobytes instead of decoding the 5000x5000 band in the tarball.
+Only the surface reflectance bands and PIXELQA, the bands the image viewer displays, are copied.  The copies are built
+by a small process pool in the background while the tool runs, or all at once with the lcmap_tap_overviews command,
+and a scene is only rebuilt when its tarballs change."""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from osgeo import gdal
+
+from lcmap_tap.Auxiliary import caching
+from lcmap_tap.RetrieveData.ard_info import QA_NUM
+
+# <int> Decimation level of the cached copies relative to the full resolution bands
+OVERVIEW_LEVEL = 8
+
+# <list> Internal overview factors of the cached copies, i.e. levels 16 and 32 of the full resolution
+INTERNAL_LEVELS = [2, 4]
+
+# <int> Number of worker processes building the copies in the background while the tool runs, at most 2 and leaving a
+# CPU free by default, can be set with the LCMAP_TAP_OVERVIEW_WORKERS env. variable, 0 leaves the build to the
+# lcmap_tap_overviews command
+OVERVIEW_WORKERS = int(os.environ.get("LCMAP_TAP_OVERVIEW_WORKERS", max(0, min(2, (os.cpu_count() or 1) - 1))))
+
+# <str> Name of the file recording the tarball modification times a scene was built from
+STAMP_FILE = "stamp.json"
+
+# <dict> OverviewCache instances keyed by the ARD directory they were created for
+_caches = dict()
+
+
+def build_scene(paths: list, out_dir: str, stamp: dict, level: int = OVERVIEW_LEVEL):
+    """
+    Write the reduced resolution copies of the bands of one scene, run in a worker process
+
+    Args:
+        paths: The GDAL virtual file paths of the bands to copy, in the order of ARDInfo.vsipaths
+        out_dir: Directory the copies are written to
+        stamp: The tarball modification times, written last to mark the scene as complete
+        level: Decimation level of the copies
+
+    Returns:
+        out_dir
+
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    for num, path in enumerate(paths):
+        src = gdal.Open(path)
+
+        if src is None:
+            raise IOError("Couldn't open {}".format(path))
+
+        out_file = os.path.join(out_dir, "{:02d}.tif".format(num))
+
+        temp = out_file + ".tmp.tif"
+
+        # Nearest neighbour keeps the PIXELQA bit patterns intact
+        gdal.Translate(temp, src, format="GTiff",
+                       width=int(math.ceil(src.RasterXSize / level)),
+                       height=int(math.ceil(src.RasterYSize / level)),
+                       resampleAlg="nearest",
+                       creationOptions=["TILED=YES", "COMPRESS=DEFLATE"])
+
+        ds = gdal.Open(temp, gdal.GA_Update)
+
+        ds.BuildOverviews("NEAREST", INTERNAL_LEVELS)
+
+        ds = None
+
+        os.replace(temp, out_file)
+
+    with open(os.path.join(out_dir, STAMP_FILE), "w") as f:
+        json.dump(stamp, f)
+
+    return out_dir
+
+
+class OverviewCache:
+    def __init__(self, ard_info, cache_dir: str = None):
+        """
+        Args:
+            ard_info: <ARDInfo> The tile's ARD scenes
+            cache_dir: Directory to keep the copies in, defaults to the tool's local cache directory
+
+        """
+        self.ard_info = ard_info
+
+        self.cache_dir = cache_dir if cache_dir is not None else caching.get_cache_dir(ard_info.root, "overviews")
+
+        self.executor = None
+
+        self.futures = dict()
+
+        self.thread = None
+
+        self.stopped = threading.Event()
+
+        # Keeps stop() from shutting the executor down while a scene is being submitted
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls, ard_info):
+        """
+        Return the cache of an ARD directory, created once per directory so a running build is shared by every
+        ARDInfo made for it
+
+        Args:
+            ard_info: <ARDInfo>
+
+        Returns:
+            <OverviewCache>
+
+        """
+        key = os.path.abspath(ard_info.root)
+
+        if key not in _caches:
+            _caches[key] = cls(ard_info)
+
+        else:
+            # Pick up tarballs that appeared since the cache was created
+            _caches[key].ard_info = ard_info
+
+        return _caches[key]
+
+    def scene_dir(self, scene: str) -> str:
+        """
+        Return the directory holding a scene's copies
+
+        """
+        return os.path.join(self.cache_dir, scene)
+
+    def stamp(self, scene: str) -> dict:
+        """
+        Return the modification times of a scene's tarballs
+
+        """
+        return {prod: os.path.getmtime(tar) for prod, tar in self.ard_info.lookup[scene].items()
+                if os.path.exists(tar)}
+
+    def is_current(self, scene: str) -> bool:
+        """
+        Check whether a scene's copies exist and were built from its current tarballs
+
+        """
+        try:
+            with open(os.path.join(self.scene_dir(scene), STAMP_FILE), "r") as f:
+                return json.load(f) == self.stamp(scene)
+
+        except (IOError, ValueError):
+            return False
+
+    def get_paths(self, scene: str):
+        """
+        Return the copies of a scene's surface reflectance bands and PIXELQA, in the order of ARDInfo.vsipaths
+
+        Args:
+            scene: The scene ID
+
+        Returns:
+            list of file paths, or None if the scene hasn't been built yet
+
+        """
+        if scene not in self.ard_info.lookup or not self.is_current(scene):
+            return None
+
+        return [os.path.join(self.scene_dir(scene), "{:02d}.tif".format(num))
+                for num in range(QA_NUM + 1)]
+
+    def build(self, workers: int = None, scenes=None):
+        """
+        Build the copies of every scene that isn't current and wait for them to finish
+
+        Args:
+            workers: Number of worker processes, defaults to the number of CPUs
+            scenes: The scene IDs to build, defaults to all of the tile's scenes, most recent first
+
+        Returns:
+            dict of scene ID: error message for the scenes that failed
+
+        """
+        scenes = scenes if scenes is not None else sorted(self.ard_info.scene_ids, key=lambda s: s[15:23],
+                                                          reverse=True)
+
+        errors = dict()
+
+        # Spawn rather than fork, the GUI process has threads running
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        for scene in scenes:
+            if self.is_current(scene):
+                continue
+
+            with self.lock:
+                if self.stopped.is_set():
+                    break
+
+                self.futures[scene] = self.executor.submit(build_scene, self.ard_info.vsipaths[scene][:QA_NUM + 1],
+                                                           self.scene_dir(scene), self.stamp(scene))
+
+        for scene, future in list(self.futures.items()):
+            try:
+                future.result()
+
+            except CancelledError:
+                continue
+
+            except Exception:
+                errors[scene] = str(sys.exc_info()[1])
+
+        self.executor.shutdown(wait=not self.stopped.is_set())
+
+        self.executor = None
+
+        self.futures = dict()
+
+        return errors
+
+    def start(self, workers: int = OVERVIEW_WORKERS):
+        """
+        Build the copies in a background thread, does nothing if a build is already running or workers is 0
+
+        Args:
+            workers: Number of worker processes, at most the number of CPUs
+
+        Returns:
+            None
+
+        """
+        if not workers or (self.thread is not None and self.thread.is_alive()):
+            return None
+
+        workers = min(workers, os.cpu_count() or 1)
+
+        self.stopped.clear()
+
+        self.thread = threading.Thread(target=self.build, kwargs={"workers": workers}, daemon=True)
+
+        self.thread.start()
+
+    def stop(self):
+        """
+        Cancel the scenes that haven't started building yet and shut the worker processes down without waiting for
+        the scenes being built
+
+        """
+        with self.lock:
+            self.stopped.set()
+
+            for future in list(self.futures.values()):
+                future.cancel()
+
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+
+
+def main():
+    from lcmap_tap.RetrieveData.ard_info import ARDInfo
+
+    parser = argparse.ArgumentParser(description="Build reduced resolution copies of a tile's ARD bands for the "
+                                                 "TAP tool's image viewer")
+
+    parser.add_argument("ard_dir", help="Full path to the directory containing the tile's ARD tarballs")
+
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes")
+
+    args = parser.parse_args()
+
+    errors = OverviewCache(ARDInfo(args.ard_dir, "", "")).build(workers=args.workers)
+
+    for scene, message in errors.items():
+        print("{}: {}".format(scene, message))
+
+
+if __name__ == "__main__":
+    main()
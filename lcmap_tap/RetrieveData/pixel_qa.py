@@ -0,0 +1,157 @@
+"""Decode the ARD PIXELQA band into clear, water, cloud, shadow, snow and fill masks.  Every possible 16-bit PIXELQA
+value is decoded once into a lookup table of flags, so the masks of a whole band or time series come from a single
+gather instead of comparing the band against lists of values.
+
+PIXELQA bits (Collection 1):
+    0 fill, 1 clear, 2 water, 3 cloud shadow, 4 snow, 5 cloud, 6-7 cloud confidence,
+    8-9 cirrus confidence (LC08 only), 10 terrain occlusion (LC08 only)"""
+
+import numpy as np
+from numpy import ndarray
+
+# <int> Flags of a decoded PIXELQA value
+CLEAR = 1
+WATER = 2
+CLOUD = 4
+SHADOW = 8
+SNOW = 16
+FILL = 32
+
+# <int> Number of distinct PIXELQA values
+NUM_VALUES = 2 ** 16
+
+# <int> Confidence levels of the 2-bit confidence fields
+CONF_LOW = 1
+
+# <dict> Decoded flag lookup tables keyed by sensor group, see get_lut
+_luts = dict()
+
+# <dict> Boolean lookup tables keyed by (sensor group, flags, invert), see get_mask
+_mask_luts = dict()
+
+
+def sensor_group(sensor):
+    """
+    Return the PIXELQA layout a sensor uses: "OLI" for LC08, "TM" for the TM/ETM+ sensors (LT04, LT05, LE07), or None
+    for a mix of both, e.g. a pixel's time series
+
+    """
+    if sensor is None:
+        return None
+
+    return "OLI" if sensor.upper().startswith("LC08") else "TM"
+
+
+def decode(values: ndarray, group) -> ndarray:
+    """
+    Decode PIXELQA values bit by bit into flags
+
+    Args:
+        values: int array of PIXELQA values
+        group: The sensor group from sensor_group
+
+    Returns:
+        uint8 array of flags
+
+    """
+    def bit(num):
+        return (values >> num) & 1 == 1
+
+    cloud_conf = (values >> 6) & 3
+
+    cirrus_conf = (values >> 8) & 3
+
+    flags = np.zeros(values.shape, dtype=np.uint8)
+
+    flags[bit(0)] |= FILL
+    flags[bit(2)] |= WATER
+    flags[bit(3)] |= SHADOW
+    flags[bit(4)] |= SNOW
+    flags[bit(5)] |= CLOUD
+
+    # Clear land or water with low cloud confidence and nothing else flagged
+    clear = (bit(1) ^ bit(2)) & (cloud_conf == CONF_LOW) & ((values & 0b111001) == 0)
+
+    if group == "OLI":
+        # Low cirrus confidence and no terrain occlusion
+        clear &= (cirrus_conf == CONF_LOW) & (values >> 10 == 0)
+
+    elif group == "TM":
+        # The upper bits are unused
+        clear &= values >> 8 == 0
+
+    else:
+        clear &= ((cirrus_conf == CONF_LOW) & (values >> 10 == 0)) | (values >> 8 == 0)
+
+    flags[clear] |= CLEAR
+
+    return flags
+
+
+def get_lut(sensor=None) -> ndarray:
+    """
+    Return the lookup table of the flags of every PIXELQA value
+
+    Args:
+        sensor: The sensor, e.g. "LC08" or "LE07", or None for a mix of sensors
+
+    Returns:
+        uint8 array of NUM_VALUES flags
+
+    """
+    group = sensor_group(sensor)
+
+    if group not in _luts:
+        _luts[group] = decode(np.arange(NUM_VALUES, dtype=np.int64), group)
+
+    return _luts[group]
+
+
+def get_flags(qa, sensor=None) -> ndarray:
+    """
+    Decode a PIXELQA band or time series
+
+    Args:
+        qa: Array of PIXELQA values
+        sensor: The sensor, e.g. "LC08" or "LE07", or None for a mix of sensors
+
+    Returns:
+        uint8 array of flags with the shape of qa
+
+    """
+    return get_lut(sensor)[as_index(qa)]
+
+
+def get_mask(qa, flags: int, sensor=None, invert: bool = False) -> ndarray:
+    """
+    Return where a PIXELQA band or time series has any of the given flags
+
+    Args:
+        qa: Array of PIXELQA values
+        flags: The flags to test, e.g. CLOUD | SHADOW
+        sensor: The sensor, e.g. "LC08" or "LE07", or None for a mix of sensors
+        invert: Return where none of the flags are set instead
+
+    Returns:
+        bool array with the shape of qa
+
+    """
+    key = (sensor_group(sensor), flags, invert)
+
+    if key not in _mask_luts:
+        _mask_luts[key] = ((get_lut(sensor) & flags) != 0) != invert
+
+    return _mask_luts[key][as_index(qa)]
+
+
+def as_index(qa) -> ndarray:
+    """
+    Return PIXELQA values usable as indices into the lookup tables
+
+    """
+    qa = np.asarray(qa)
+
+    if qa.dtype == np.uint16:
+        return qa
+
+    return qa.astype(np.int64) & (NUM_VALUES - 1)
@@ -0,0 +1,267 @@
+"""Pixel-indexed store of PyCCD results.  Each chip JSON file of a tile is ingested once into a data file of its own
+that starts with a (row, column) -> offset table of the chip's pixels, so looking up the results for one pixel reads
+only that pixel's record instead of parsing a whole chip of 10,000 results.  A chip that is ingested again replaces
+its data file, so the store never holds more than one copy of a chip's results."""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from lcmap_tap.Auxiliary import caching
+
+# <int> Number of pixel rows and columns in an ARD tile
+TILE_SIZE = 5000
+
+# <int> Number of pixel rows and columns in a chip
+CHIP_SIZE = 100
+
+# <bytes> Written at the start of each data file so that an offset of 0 in its table always means "not stored"
+MAGIC = b"TAPCHIP1"
+
+# <struct.Struct> Each record in a data file is prefixed by its length in bytes
+RECORD_HEADER = struct.Struct("<I")
+
+# <struct.Struct> An entry of the offset table
+OFFSET = struct.Struct("<i")
+
+# <dict> PixelStore instances keyed by (json_dir, tile)
+_stores = dict()
+
+
+class PixelStore:
+    def __init__(self, json_dir: str, tile: str, affine, store_dir: str = None):
+        """
+        Args:
+            json_dir: Full path to the tile and version specific PyCCD results
+            tile: The tile name, e.g. "H05V02"
+            affine: <GeoAffine> The pixel affine of the tile, used to map result coordinates to row/column
+            store_dir: Directory holding the store, by default a local cache directory tied to json_dir
+
+        """
+        self.json_dir = json_dir
+
+        self.tile = tile
+
+        self.affine = affine
+
+        if store_dir is None:
+            store_dir = caching.get_cache_dir(json_dir, "pixel_store")
+
+        self.store_dir = store_dir
+
+        # The chip data files of the tile and their manifest
+        self.tile_dir = os.path.join(self.store_dir, self.tile)
+
+        os.makedirs(self.tile_dir, exist_ok=True)
+
+        self.manifest_file = os.path.join(self.tile_dir, "manifest.json")
+
+        self.manifest = self.load_manifest()
+
+    @classmethod
+    def get_store(cls, json_dir: str, tile: str, affine):
+        """
+        Return the store of a tile's PyCCD results, created once per json_dir and tile so its manifest is only read
+        the first time
+
+        Args:
+            json_dir: Full path to the tile and version specific PyCCD results
+            tile: The tile name, e.g. "H05V02"
+            affine: <GeoAffine> The pixel affine of the tile
+
+        Returns:
+            <PixelStore>
+
+        """
+        key = (os.path.abspath(json_dir), tile)
+
+        if key not in _stores:
+            _stores[key] = cls(json_dir=json_dir, tile=tile, affine=affine)
+
+        return _stores[key]
+
+    def load_manifest(self) -> dict:
+        """
+        Read the record of which chip files have been ingested and their modification times
+
+        Returns:
+            dict of chip file name: mtime
+
+        """
+        if not os.path.exists(self.manifest_file):
+            return dict()
+
+        with open(self.manifest_file, "r") as f:
+            return json.load(f)
+
+    def save_manifest(self):
+        """
+        Write the chip manifest to disk
+
+        Returns:
+            None
+
+        """
+        with open(self.manifest_file, "w") as f:
+            json.dump(self.manifest, f)
+
+    def chip_file(self, chip_row: int, chip_col: int) -> str:
+        """
+        Full path to the data file of the chip at a chip row/column of the tile
+
+        """
+        return os.path.join(self.tile_dir, "c{:02d}_{:02d}.dat".format(chip_row, chip_col))
+
+    def rowcol(self, x, y):
+        """
+        Transform result coordinates to pixel row/column in the tile
+
+        Args:
+            x: <numpy.ndarray> The x-coordinates of the results
+            y: <numpy.ndarray> The y-coordinates of the results
+
+        Returns:
+            Tuple of integer row and column arrays
+
+        """
+        row = (y - self.affine.ul_y - self.affine.ul_x * self.affine.rot_2) / self.affine.y_res
+        col = (x - self.affine.ul_x - self.affine.ul_y * self.affine.rot_1) / self.affine.x_res
+
+        return row.astype(np.int64), col.astype(np.int64)
+
+    def is_current(self, chip_file: str) -> bool:
+        """
+        Check whether a chip file has been ingested and hasn't changed since
+
+        Args:
+            chip_file: Full path to the chip JSON file
+
+        Returns:
+            True if the store holds the current results for this chip
+
+        """
+        return self.manifest.get(os.path.basename(chip_file)) == os.path.getmtime(chip_file)
+
+    def write_chip(self, chip_row: int, chip_col: int, rows, cols, payloads):
+        """
+        Write the data file of a chip, replacing the previous one in one step
+
+        Args:
+            chip_row: The chip row within the tile
+            chip_col: The chip column within the tile
+            rows: Pixel rows of the records within the chip
+            cols: Pixel columns of the records within the chip
+            payloads: <list> The encoded records
+
+        Returns:
+            None
+
+        """
+        offsets = np.zeros((CHIP_SIZE, CHIP_SIZE), dtype=np.int32)
+
+        out_file = self.chip_file(chip_row, chip_col)
+
+        temp = out_file + ".tmp"
+
+        with open(temp, "wb") as f:
+            f.write(MAGIC)
+
+            # Written again once the offsets are known
+            f.write(offsets.tobytes())
+
+            for row, col, payload in zip(rows, cols, payloads):
+                offsets[row, col] = f.tell()
+
+                f.write(RECORD_HEADER.pack(len(payload)))
+
+                f.write(payload)
+
+            f.seek(len(MAGIC))
+
+            f.write(offsets.astype("<i4").tobytes())
+
+        os.replace(temp, out_file)
+
+    def add_chip(self, chip_file: str):
+        """
+        Parse a chip JSON file and write all of its pixel results to the store
+
+        Args:
+            chip_file: Full path to the chip JSON file
+
+        Returns:
+            None
+
+        """
+        with open(chip_file, "r") as f:
+            records = json.load(f)
+
+        if not records:
+            return None
+
+        rows, cols = self.rowcol(np.array([r["x"] for r in records], dtype=np.float64),
+                                 np.array([r["y"] for r in records], dtype=np.float64))
+
+        valid = (rows >= 0) & (rows < TILE_SIZE) & (cols >= 0) & (cols < TILE_SIZE)
+
+        # A chip file holds the results of one chip, group them by chip all the same
+        chips = dict()
+
+        for num in np.flatnonzero(valid):
+            chips.setdefault((rows[num] // CHIP_SIZE, cols[num] // CHIP_SIZE), list()).append(num)
+
+        for (chip_row, chip_col), nums in chips.items():
+            # The "result" is already a JSON string, store it as-is rather than decoding it here
+            self.write_chip(chip_row, chip_col, rows[nums] % CHIP_SIZE, cols[nums] % CHIP_SIZE,
+                            [records[num]["result"].encode("utf-8") for num in nums])
+
+        self.manifest[os.path.basename(chip_file)] = os.path.getmtime(chip_file)
+
+        self.save_manifest()
+
+    def get(self, rowcol):
+        """
+        Retrieve the decoded PyCCD results for a pixel
+
+        Args:
+            rowcol: <RowColumn> The pixel location within the tile
+
+        Returns:
+            dict containing the change models and processing mask, or None if the pixel isn't in the store
+
+        """
+        data_file = self.chip_file(rowcol.row // CHIP_SIZE, rowcol.column // CHIP_SIZE)
+
+        if not os.path.exists(data_file):
+            return None
+
+        with open(data_file, "rb") as f:
+            f.seek(len(MAGIC) + OFFSET.size * ((rowcol.row % CHIP_SIZE) * CHIP_SIZE + rowcol.column % CHIP_SIZE))
+
+            offset, = OFFSET.unpack(f.read(OFFSET.size))
+
+            if offset == 0:
+                return None
+
+            f.seek(offset)
+
+            length, = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+
+            return json.loads(f.read(length).decode("utf-8"))
+
+    def build(self, chip_files):
+        """
+        Ingest every chip file of the tile that isn't already current in the store
+
+        Args:
+            chip_files: <list> Full paths to the tile's chip JSON files
+
+        Returns:
+            None
+
+        """
+        for chip_file in chip_files:
+            if not self.is_current(chip_file):
+                self.add_chip(chip_file)
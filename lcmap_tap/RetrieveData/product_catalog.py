@@ -0,0 +1,195 @@
+"""Persistent catalog of a tile's mapped products.  The pyccd product versions found under the tile's eval directory
+and the year -> file lookup of each product directory are saved to disk once, so the maps viewer looks a year up in a
+dictionary instead of globbing and searching the file names.  A saved listing is rebuilt when the modification time
+of its directory changes."""
+
+import json
+import os
+import re
+
+from lcmap_tap.Auxiliary import caching
+
+# <dict> Catalogs already loaded by this process, keyed by the eval directory
+_loaded = dict()
+
+
+def get_years(file: str):
+    """
+    Return the years in a product file name, e.g. [1999] for H05V02_ChangeMap_color_1999.tif
+
+    Args:
+        file: The file name or full path
+
+    Returns:
+        <list> The years as integers
+
+    """
+    return [int(year) for year in re.findall(r"(?<!\d)(?:19|20)\d{2}(?!\d)", os.path.basename(file))]
+
+
+class ProductCatalog:
+    def __init__(self, root_dir: str, versions):
+        """
+        Args:
+            root_dir: Full path to the tile's eval directory
+            versions: The pyccd product versions, listed from highest to lowest priority
+
+        """
+        self.root_dir = root_dir
+
+        self.versions = list(versions)
+
+        self.catalog_file = os.path.join(caching.get_cache_dir(root_dir, "catalog"), "catalog.json")
+
+        # <dict> The saved catalog, {"root_mtime": float, "available": [version], "products": {key: listing}}
+        self.catalog = {"root_mtime": None, "available": list(), "products": dict()}
+
+        # <dict> Year -> full path lookups of the product directories listed so far, keyed like the saved listings
+        self.lookups = dict()
+
+        self.load()
+
+    @classmethod
+    def get(cls, root_dir: str, versions):
+        """
+        Return the catalog of an eval directory, loaded once per process
+
+        Args:
+            root_dir: Full path to the tile's eval directory
+            versions: The pyccd product versions, listed from highest to lowest priority
+
+        Returns:
+            <ProductCatalog>
+
+        """
+        key = os.path.abspath(root_dir)
+
+        if key not in _loaded:
+            _loaded[key] = cls(root_dir, versions)
+
+        return _loaded[key]
+
+    def load(self):
+        """
+        Read the saved catalog, a missing or unreadable one is rebuilt as it is used
+
+        Returns:
+            None
+
+        """
+        try:
+            with open(self.catalog_file, "r") as f:
+                saved = json.load(f)
+
+            if saved.get("versions") == self.versions:
+                self.catalog = saved["catalog"]
+
+        except (IOError, KeyError, ValueError):
+            pass
+
+    def save(self):
+        """
+        Write the catalog, replacing the previous file in one step
+
+        Returns:
+            None
+
+        """
+        temp = self.catalog_file + ".tmp"
+
+        with open(temp, "w") as f:
+            json.dump({"versions": self.versions, "catalog": self.catalog}, f)
+
+        os.replace(temp, self.catalog_file)
+
+    @staticmethod
+    def get_mtime(directory: str):
+        """
+        Return the modification time of a directory, or None if it doesn't exist
+
+        """
+        try:
+            return os.path.getmtime(directory)
+
+        except OSError:
+            return None
+
+    def get_version(self) -> str:
+        """
+        Return the highest priority version that has both ChangeMaps and CoverMaps, the versions are only probed
+        again when the eval directory changes
+
+        Returns:
+            The version identifier, or None if there isn't one
+
+        """
+        mtime = self.get_mtime(self.root_dir)
+
+        if mtime is None:
+            return None
+
+        if mtime != self.catalog["root_mtime"]:
+            self.catalog["root_mtime"] = mtime
+
+            self.catalog["available"] = [version for version in self.versions
+                                         if os.path.exists(os.path.join(self.root_dir, version, "ChangeMaps")) and
+                                         os.path.exists(os.path.join(self.root_dir, version, "CoverMaps"))]
+
+            self.save()
+
+        available = self.catalog["available"]
+
+        return available[0] if available else None
+
+    def get_files(self, version: str, category: str, alias: str) -> dict:
+        """
+        Return the files of a product by year, listing its directory again only if it has changed
+
+        Args:
+            version: The pyccd product version
+            category: "ChangeMaps" or "CoverMaps"
+            alias: The product's subdirectory
+
+        Returns:
+            dict of year: full path to the product's .tif file
+
+        """
+        key = "/".join((version, category, alias))
+
+        directory = os.path.join(self.root_dir, version, category, alias)
+
+        mtime = self.get_mtime(directory)
+
+        if mtime is None:
+            return dict()
+
+        listing = self.catalog["products"].get(key)
+
+        if listing is None or listing["mtime"] != mtime:
+            files = dict()
+
+            # Keep the first file for a year, matching the previous search of the glob results
+            for f in sorted(os.listdir(directory)):
+                if f.endswith(".tif"):
+                    for year in get_years(f):
+                        files.setdefault(str(year), f)
+
+            listing = {"mtime": mtime, "files": files}
+
+            self.catalog["products"][key] = listing
+
+            self.lookups.pop(key, None)
+
+            self.save()
+
+        if key not in self.lookups:
+            self.lookups[key] = {int(year): os.path.join(directory, f) for year, f in listing["files"].items()}
+
+        return self.lookups[key]
+
+    def get_file(self, version: str, category: str, alias: str, year: int):
+        """
+        Return the full path to a product's file for a year, or None if there isn't one
+
+        """
+        return self.get_files(version, category, alias).get(int(year))
@@ -1,11 +1,12 @@
 """Retrieve data, make it accessible via attributes of the CCDReader class"""
+import copy
 import datetime as dt
 import json
 import os
 import re
+import threading
 
 from collections import Counter
-from collections import OrderedDict
 from collections import namedtuple
 from typing import Tuple
 from osgeo import ogr
@@ -16,17 +17,48 @@ from lcmap_tap.Plotting import plot_functions
 
 from lcmap_tap.Auxiliary import projections
 
+from lcmap_tap.Auxiliary.lru_cache import LRUCache, estimate_nbytes
+
+from lcmap_tap.RetrieveData import harmonic_model
+
+from lcmap_tap.RetrieveData.ard_extract import ARDExtractor
+
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex
+
+from lcmap_tap.RetrieveData.mmap_cache import MmapCache
+
+from lcmap_tap.RetrieveData import pixel_qa
+
+from lcmap_tap.RetrieveData.pixel_store import PixelStore
+
+from lcmap_tap.RetrieveData.tile_inventory import TileInventory
+
 # Define some helper methods and data structures
 GeoExtent = namedtuple("GeoExtent", ["x_min", "y_max", "x_max", "y_min"])
 GeoAffine = namedtuple("GeoAffine", ["ul_x", "x_res", "rot_1", "ul_y", "rot_2", "y_res"])
 GeoCoordinate = namedtuple("GeoCoordinate", ["x", "y"])
 RowColumn = namedtuple("RowColumn", ["row", "column"])
 RowColumnExtent = namedtuple("RowColumnExtent", ["start_row", "start_col", "end_row", "end_col"])
+GridLocation = namedtuple("GridLocation", ["h", "v", "pixel_rowcol", "pixel_coord", "chip_rowcol", "chip_coord"])
 CONUS_EXTENT = GeoExtent(x_min=-2565585,
                          y_min=14805,
                          x_max=2384415,
                          y_max=3314805)
 
+# <int> Memory budget in MB for extracted pixels kept by CCDReader.get, can be set with the LCMAP_TAP_PIXEL_CACHE_MB
+# env. variable or changed at runtime with PIXEL_CACHE.resize()
+PIXEL_CACHE_MB = int(os.environ.get("LCMAP_TAP_PIXEL_CACHE_MB", 256))
+
+# <LRUCache> Process-wide cache of CCDReader instances keyed by tile, pixel row/col, cache_dir and json_dir
+PIXEL_CACHE = LRUCache(max_bytes=PIXEL_CACHE_MB * 2 ** 20)
+
+# Well known text for each of the supported units
+UNITS_WKT = {"meters": projections.AEA_WKT,
+             "lat/long": projections.WGS_84_WKT}
+
+# Coordinate transformations are reused, one set per thread because the GDAL objects aren't thread-safe
+_transforms = threading.local()
+
 
 class GeoInfo:
     def __init__(self, x: str, y: str, units: str = "meters"):
@@ -87,20 +119,23 @@ class GeoInfo:
         Determine the H and V designations from the entered geo-coordinates
 
         Args:
-            x: GeoCoordinate.x
-            y: GeoCoordinate.y
+            x: GeoCoordinate.x, a single value or an array
+            y: GeoCoordinate.y, a single value or an array
             x_min: Use the CONUS_EXTENT.x_min
             y_max: Use the CONUS_EXTENT.y_max
             base:
 
         Returns:
-            Tuple containing the H and V as integers
+            Tuple containing the H and V as integers, or as integer arrays for array input
         """
-        h = int((x - x_min) / base)
+        h = (x - x_min) / base
+
+        v = (y_max - y) / base
 
-        v = int((y_max - y) / base)
+        if np.ndim(h) == 0:
+            return int(h), int(v)
 
-        return h, v
+        return np.trunc(h).astype(np.int64), np.trunc(v).astype(np.int64)
 
     @staticmethod
     def geospatial_hv(loc, h, v):
@@ -154,6 +189,32 @@ class GeoInfo:
         return GeoCoordinate(x=str_to_float(xpieces),
                              y=str_to_float(ypieces))
 
+    @staticmethod
+    def get_transform(src="meters", dest="lat/long"):
+        """
+        Return the coordinate transformation between two units, created once per thread and reused afterwards
+
+        Args:
+            src: <str> Input units
+            dest: <str> Output units
+
+        Returns:
+            <osr.CoordinateTransformation>
+        """
+        if not hasattr(_transforms, "cache"):
+            _transforms.cache = dict()
+
+        if (src, dest) not in _transforms.cache:
+            in_srs = osr.SpatialReference()
+            in_srs.ImportFromWkt(UNITS_WKT[src])
+
+            out_srs = osr.SpatialReference()
+            out_srs.ImportFromWkt(UNITS_WKT[dest])
+
+            _transforms.cache[(src, dest)] = osr.CoordinateTransformation(in_srs, out_srs)
+
+        return _transforms.cache[(src, dest)]
+
     @staticmethod
     def unit_conversion(coord, src="meters", dest="lat/long"):
         """
@@ -163,33 +224,36 @@ class GeoInfo:
         Args:
             src: <str> Input units
             dest: <str> Output units
-            coord: <GeoCoordinate>
+            coord: <GeoCoordinate> Holding single values, or arrays to convert many coordinates in one call
 
         Choices:
             ["proj", "geog"]
 
         Returns:
-            <GeoCoordinate> Object containing a coordinate value pair in the new units
+            <GeoCoordinate> Object containing a coordinate value pair (or arrays) in the new units
         """
-        units = {"meters": projections.AEA_WKT,
-                 "lat/long": projections.WGS_84_WKT}
+        transform = GeoInfo.get_transform(src=src, dest=dest)
 
-        in_srs = osr.SpatialReference()
-        in_srs.ImportFromWkt(units[src])
+        if np.ndim(coord.x) == 0:
+            point = ogr.Geometry(ogr.wkbPoint)
 
-        out_srs = osr.SpatialReference()
-        out_srs.ImportFromWkt(units[dest])
+            point.AddPoint(coord.x, coord.y)
 
-        point = ogr.Geometry(ogr.wkbPoint)
+            point.Transform(transform)
 
-        point.AddPoint(coord.x, coord.y)
+            return GeoCoordinate(x=point.GetX(),
+                                 y=point.GetY())
 
-        transform = osr.CoordinateTransformation(in_srs, out_srs)
+        x = np.asarray(coord.x, dtype=np.float64)
+        y = np.asarray(coord.y, dtype=np.float64)
 
-        point.Transform(transform)
+        if x.size == 0:
+            return GeoCoordinate(x=x, y=y)
 
-        return GeoCoordinate(x=point.GetX(),
-                             y=point.GetY())
+        out = np.array(transform.TransformPoints(np.column_stack([x.ravel(), y.ravel()]).tolist()))
+
+        return GeoCoordinate(x=out[:, 0].reshape(x.shape),
+                             y=out[:, 1].reshape(y.shape))
 
     @staticmethod
     def geo_to_rowcol(affine, coord):
@@ -207,7 +271,11 @@ class GeoInfo:
         row = (coord.y - affine.ul_y - affine.ul_x * affine.rot_2) / affine.y_res
         col = (coord.x - affine.ul_x - affine.ul_y * affine.rot_1) / affine.x_res
 
-        return RowColumn(row=int(row), column=int(col))
+        if np.ndim(row) == 0:
+            return RowColumn(row=int(row), column=int(col))
+
+        # Truncate toward zero like int() does for single values
+        return RowColumn(row=np.trunc(row).astype(np.int64), column=np.trunc(col).astype(np.int64))
 
     @staticmethod
     def rowcol_to_geo(affine, rowcol):
@@ -227,9 +295,91 @@ class GeoInfo:
 
         return GeoCoordinate(x=x, y=y)
 
+    @classmethod
+    def locate(cls, x, y, units="meters") -> GridLocation:
+        """
+        Locate any number of coordinates on the ARD grid in one call, the array counterpart of the GeoInfo attributes
+
+        Args:
+            x: Array of X-coordinates in the given units
+            y: Array of Y-coordinates in the given units
+            units: Default is "meters"; how to interpret the input coordinates ("meters", "lat/long")
+
+        Returns:
+            <GridLocation> Holding arrays of the tile H and V, the pixel and chip row/column within the tile and the
+            upper-left coordinates (in meters) of those pixels and chips
+        """
+        coord = GeoCoordinate(x=np.asarray(x, dtype=np.float64), y=np.asarray(y, dtype=np.float64))
+
+        if units != "meters":
+            coord = cls.unit_conversion(coord=coord, src=units, dest="meters")
+
+        h, v = cls.get_hv(x=coord.x, y=coord.y)
+
+        _, pixel_affine = cls.geospatial_hv(loc=CONUS_EXTENT, h=h, v=v)
+
+        chip_affine = pixel_affine._replace(x_res=3000, y_res=-3000)
+
+        pixel_rowcol = cls.geo_to_rowcol(pixel_affine, coord)
+
+        chip_rowcol = cls.geo_to_rowcol(chip_affine, coord)
+
+        return GridLocation(h=h,
+                            v=v,
+                            pixel_rowcol=pixel_rowcol,
+                            pixel_coord=cls.rowcol_to_geo(pixel_affine, pixel_rowcol),
+                            chip_rowcol=chip_rowcol,
+                            chip_coord=cls.rowcol_to_geo(chip_affine, chip_rowcol))
+
+    @classmethod
+    def from_location(cls, location: GridLocation, num: int, coord: GeoCoordinate, geo_coord: GeoCoordinate,
+                      units: str = "meters"):
+        """
+        Make the GeoInfo of one of the coordinates located with GeoInfo.locate, without transforming it again
+
+        Args:
+            location: <GridLocation> The arrays returned by GeoInfo.locate
+            num: Index of the coordinate in the arrays
+            coord: <GeoCoordinate> Arrays of the coordinates in meters
+            geo_coord: <GeoCoordinate> Arrays of the coordinates in geographic lat/lon
+            units: The units the coordinates were given in
+
+        Returns:
+            <GeoInfo>
+        """
+        geo_info = cls.__new__(cls)
+
+        geo_info.units = units
+
+        geo_info.coord = GeoCoordinate(x=float(coord.x[num]), y=float(coord.y[num]))
+
+        geo_info.geo_coord = GeoCoordinate(x=float(geo_coord.x[num]), y=float(geo_coord.y[num]))
+
+        geo_info.H, geo_info.V = int(location.h[num]), int(location.v[num])
+
+        geo_info.EXTENT, geo_info.PIXEL_AFFINE = cls.geospatial_hv(loc=CONUS_EXTENT, h=geo_info.H, v=geo_info.V)
+
+        geo_info.CHIP_AFFINE = geo_info.PIXEL_AFFINE._replace(x_res=3000, y_res=-3000)
+
+        def item(rowcol):
+            return RowColumn(row=int(rowcol.row[num]), column=int(rowcol.column[num]))
+
+        def point(geo):
+            return GeoCoordinate(x=geo.x[num].item(), y=geo.y[num].item())
+
+        geo_info.pixel_rowcol = item(location.pixel_rowcol)
+        geo_info.pixel_coord = point(location.pixel_coord)
+
+        geo_info.chip_rowcol = item(location.chip_rowcol)
+        geo_info.chip_coord = point(location.chip_coord)
+
+        geo_info.rowcol = geo_info.pixel_rowcol
+
+        return geo_info
+
 
 class CCDReader:
-    def __init__(self, x, y, units, cache_dir, json_dir):
+    def __init__(self, x, y, units, cache_dir, json_dir, results=None, cachepoint=None, geo_info=None, ard_dir=None):
         """
         Use x and y coordinates to determine the H-V tile, retrieve the corresponding cache file and json file
         based on the input coordinates.
@@ -238,22 +388,32 @@ class CCDReader:
             y: <str> Representation of the coordinate Y-value in meters
             cache_dir: <str> Full path to the tile-specific ARD cache
             json_dir: <str> Full path to the tile and version specific PyCCD results
+            results: <dict> Optional, the already decoded PyCCD results for the pixel (see BatchReader)
+            cachepoint: <tuple> Optional, the already extracted (data, dates, image_ids) for the pixel
+            geo_info: <GeoInfo> Optional, the already computed GeoInfo for the coordinate
+            ard_dir: <str> Optional, full path to the tile's ARD tarballs, the observations are extracted from them
+                     if the cache doesn't have the pixel's row
         """
-        self.geo_info = GeoInfo(x=x, y=y, units=units)
+        self.geo_info = geo_info if geo_info is not None else GeoInfo(x=x, y=y, units=units)
 
         self.cache_dir = cache_dir
 
         self.json_dir = json_dir
 
-        self.CACHE_INV = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir)]
+        self.ard_dir = ard_dir
+
+        # <TileInventory> Row -> cache file and chip coordinate -> JSON file lookups, persisted between sessions
+        self.inventory = TileInventory.get(cache_dir=self.cache_dir, json_dir=self.json_dir)
 
-        self.JSON_INV = [os.path.join(self.json_dir, f) for f in os.listdir(self.json_dir)]
+        self.CACHE_INV = list(self.inventory.rows.values())
+
+        self.JSON_INV = list(self.inventory.chips.values())
 
         # ****Setup geospatial and temporal information****
 
-        self.results = self.extract_jsoncurve()
+        self.results = results if results is not None else self.extract_jsoncurve()
 
-        self.data, self.dates, self.image_ids = self.extract_cachepoint()
+        self.data, self.dates, self.image_ids = cachepoint if cachepoint is not None else self.extract_cachepoint()
 
         self.BEGIN_DATE = dt.date(year=1982, month=1, day=1)
         self.END_DATE = dt.date(year=2015, month=12, day=31)
@@ -273,8 +433,7 @@ class CCDReader:
 
         self.test_data()
 
-        self.fill_mask = np.ones_like(self.qa, dtype=np.bool)
-        self.fill_mask[self.qa == 1] = False
+        self.fill_mask = pixel_qa.get_mask(self.qa, pixel_qa.FILL, invert=True)
 
         self.fill_in = self.fill_mask[self.date_mask]
         self.fill_out = self.fill_mask[~self.date_mask]
@@ -289,108 +448,116 @@ class CCDReader:
         self.bands = ('blue', 'green', 'red', 'nir', 'swir1', 'swir2', 'thermal')
         self.indices = ('ndvi', 'msavi', 'evi', 'savi', 'ndmi', 'nbr', 'nbr2')
 
-        self.band_info = {b: {'coefs': [], 'inter': [], 'pred': []} for b in self.bands}
-
-        self.predicted_values = []
-        self.prediction_dates = []
-        self.break_dates = []
-        self.start_dates = []
-        self.end_dates = []
+        self.break_dates = [result['break_day'] for result in self.results['change_models']]
+        self.start_dates = [result['start_day'] for result in self.results['change_models']]
+        self.end_dates = [result['end_day'] for result in self.results['change_models']]
 
-        for num, result in enumerate(self.results['change_models']):
-            days = np.arange(result['start_day'], result['end_day'] + 1)
+        # <numpy.ndarray> Structured array of the model predictions with one record per (model, date) and fields
+        # "segment", "date", and one field per band.  All models and bands are evaluated with one matrix product.
+        self.predictions = harmonic_model.evaluate(self.results['change_models'], self.bands)
 
-            self.break_dates.append(result['break_day'])
+        # <list> Slices of each change model's records in self.predictions
+        self.segments = harmonic_model.segment_slices(self.predictions, len(self.results['change_models']))
 
-            self.start_dates.append(result['start_day'])
+        # <list> The dates of each change model's predictions
+        self.prediction_dates = [self.predictions['date'][seg] for seg in self.segments]
 
-            self.end_dates.append(result['end_day'])
+        # Intercepts, coefficients and predictions of the last change model, kept for backwards compatibility
+        self.band_info = {b: {'coefs': [], 'inter': [], 'pred': []} for b in self.bands}
 
+        if self.segments:
             for b in self.bands:
-                self.band_info[b]['inter'] = result[b]['intercept']
-
-                self.band_info[b]['coefs'] = result[b]['coefficients']
-
-                self.band_info[b]['pred'] = self.predicts(days, result[b]['coefficients'], result[b]['intercept'])
-
-                self.prediction_dates.append(days)
-
-                self.predicted_values.append(self.band_info[b]['pred'])
-
-        # Calculate indices from observed values
-        self.EVI = plot_functions.evi(B=self.data[0].astype(np.float), NIR=self.data[3].astype(np.float),
-                                      R=self.data[2].astype(np.float))
-
-        self.NDVI = plot_functions.ndvi(R=self.data[2].astype(np.float), NIR=self.data[3].astype(np.float))
-
-        self.MSAVI = plot_functions.msavi(R=self.data[2].astype(np.float), NIR=self.data[3].astype(np.float))
-
-        self.SAVI = plot_functions.savi(R=self.data[2].astype(np.float), NIR=self.data[3].astype(np.float))
+                self.band_info[b]['inter'] = self.results['change_models'][-1][b]['intercept']
+
+                self.band_info[b]['coefs'] = self.results['change_models'][-1][b]['coefficients']
+
+                self.band_info[b]['pred'] = self.predictions[b][self.segments[-1]]
+
+        # <dict> Memoized float copies of the observed bands, shared by the index calculations
+        self._float_bands = dict()
+
+        # The lookups map selections from the GUI to the corresponding plot data.  Each entry is only calculated the
+        # first time it is requested (see make_plots.get_plot_items), so plotting a single band doesn't pay for
+        # every index.  The order of insertion is preserved.
+        self.index_lookup = plot_functions.LazyLookup([("NDVI", lambda: self.get_index(plot_functions.ndvi,
+                                                                                        R=2, NIR=3)),
+                                                       ("MSAVI", lambda: self.get_index(plot_functions.msavi,
+                                                                                         R=2, NIR=3)),
+                                                       ("EVI", lambda: self.get_index(plot_functions.evi,
+                                                                                       B=0, NIR=3, R=2)),
+                                                       ("SAVI", lambda: self.get_index(plot_functions.savi,
+                                                                                        R=2, NIR=3)),
+                                                       ("NDMI", lambda: self.get_index(plot_functions.ndmi,
+                                                                                        NIR=3, SWIR1=4)),
+                                                       ("NBR", lambda: self.get_index(plot_functions.nbr,
+                                                                                       NIR=3, SWIR2=5)),
+                                                       ("NBR-2", lambda: self.get_index(plot_functions.nbr2,
+                                                                                         SWIR1=4, SWIR2=5))])
+
+        self.band_lookup = plot_functions.LazyLookup([("Blue", lambda: (self.data[0], self.get_predicts(0))),
+                                                      ("Green", lambda: (self.data[1], self.get_predicts(1))),
+                                                      ("Red", lambda: (self.data[2], self.get_predicts(2))),
+                                                      ("NIR", lambda: (self.data[3], self.get_predicts(3))),
+                                                      ("SWIR-1", lambda: (self.data[4], self.get_predicts(4))),
+                                                      ("SWIR-2", lambda: (self.data[5], self.get_predicts(5))),
+                                                      ("Thermal", lambda: (self.data[6], self.get_predicts(6)))])
+
+        # Combine these two lookups, values are shared with (and memoized in) the originals
+        self.all_lookup = plot_functions.LazyLookup.chain(self.band_lookup, self.index_lookup)
+
+    @classmethod
+    def get(cls, x, y, units, cache_dir, json_dir, ard_dir=None):
+        """
+        Return the CCDReader for a pixel from the process-wide PIXEL_CACHE, extracting it only if it isn't cached.
+        Any coordinate within the same pixel shares the extracted data, the returned instance always carries the
+        GeoInfo of the requested coordinate.
 
-        self.NDMI = plot_functions.ndmi(NIR=self.data[3].astype(np.float), SWIR1=self.data[4].astype(np.float))
-
-        self.NBR = plot_functions.nbr(NIR=self.data[3].astype(np.float), SWIR2=self.data[5].astype(np.float))
+        Args:
+            x: <str> Representation of the coordinate X-value in the given units
+            y: <str> Representation of the coordinate Y-value in the given units
+            units: <str> How to interpret the input coordinate ("meters", "lat/long")
+            cache_dir: <str> Full path to the tile-specific ARD cache
+            json_dir: <str> Full path to the tile and version specific PyCCD results
+            ard_dir: <str> Optional, full path to the tile's ARD tarballs, used for rows missing from the cache
 
-        self.NBR2 = plot_functions.nbr2(SWIR1=self.data[4].astype(np.float), SWIR2=self.data[5].astype(np.float))
+        Returns:
+            <CCDReader>
+        """
+        geo_info = GeoInfo(x=x, y=y, units=units)
 
-        # Calculate indices from the results' change models
-        # The change models are stored by order of model, then
-        # band number.  For example, the band values for the first change model are represented by indices 0-5,
-        # the second model by indices 6-11, and so on.
-        self.NDVI_ = [plot_functions.ndvi(NIR=self.predicted_values[m * len(self.bands) + 3],
-                                          R=self.predicted_values[m * len(self.bands) + 2])
-                      for m in range(len(self.results["change_models"]))]
+        key = (geo_info.H, geo_info.V, geo_info.pixel_rowcol.row, geo_info.pixel_rowcol.column,
+               os.path.abspath(cache_dir), os.path.abspath(json_dir), os.path.abspath(ard_dir) if ard_dir else None)
 
-        self.MSAVI_ = [plot_functions.msavi(R=self.predicted_values[m * len(self.bands) + 2],
-                                            NIR=self.predicted_values[m * len(self.bands) + 3])
-                       for m in range(len(self.results["change_models"]))]
+        reader = PIXEL_CACHE.get(key)
 
-        self.EVI_ = [plot_functions.evi(B=self.predicted_values[m * len(self.bands)],
-                                        NIR=self.predicted_values[m * len(self.bands) + 3],
-                                        R=self.predicted_values[m * len(self.bands) + 2])
-                     for m in range(len(self.results["change_models"]))]
+        if reader is None:
+            reader = cls(x=x, y=y, units=units, cache_dir=cache_dir, json_dir=json_dir, geo_info=geo_info,
+                         ard_dir=ard_dir)
 
-        self.SAVI_ = [plot_functions.savi(NIR=self.predicted_values[m * len(self.bands) + 3],
-                                          R=self.predicted_values[m * len(self.bands) + 2])
-                      for m in range(len(self.results["change_models"]))]
+            PIXEL_CACHE.put(key, reader, nbytes=reader.nbytes())
 
-        self.NDMI_ = [plot_functions.ndmi(NIR=self.predicted_values[m * len(self.bands) + 3],
-                                          SWIR1=self.predicted_values[m * len(self.bands) + 4])
-                      for m in range(len(self.results["change_models"]))]
+            # The lookups memoize their series on the cached reader, its entry grows with each one calculated
+            def resize(*args):
+                PIXEL_CACHE.update(key, nbytes=reader.nbytes())
 
-        self.NBR_ = [plot_functions.nbr(NIR=self.predicted_values[m * len(self.bands) + 3],
-                                        SWIR2=self.predicted_values[m * len(self.bands) + 5])
-                     for m in range(len(self.results["change_models"]))]
+            reader.band_lookup.on_memoize = resize
 
-        self.NBR2_ = [plot_functions.nbr2(SWIR1=self.predicted_values[m * len(self.bands) + 4],
-                                          SWIR2=self.predicted_values[m * len(self.bands) + 5])
-                      for m in range(len(self.results["change_models"]))]
+            reader.index_lookup.on_memoize = resize
 
-        # Use a list of tuples for passing to OrderedDict so the order of element insertion is preserved
-        # The dictionaries are used to map selections from the GUI to the corresponding plot data
-        self.index_lookup = [("NDVI", (self.NDVI, self.NDVI_)),
-                             ("MSAVI", (self.MSAVI, self.MSAVI_)),
-                             ("EVI", (self.EVI, self.EVI_)),
-                             ("SAVI", (self.SAVI, self.SAVI_)),
-                             ("NDMI", (self.NDMI, self.NDMI_)),
-                             ("NBR", (self.NBR, self.NBR_)),
-                             ("NBR-2", (self.NBR2, self.NBR2_))]
+            return reader
 
-        self.index_lookup = OrderedDict(self.index_lookup)
+        # A shallow copy shares the extracted arrays but keeps the exact coordinate that was requested
+        reader = copy.copy(reader)
 
-        self.band_lookup = [("Blue", (self.data[0], self.get_predicts(0))),
-                            ("Green", (self.data[1], self.get_predicts(1))),
-                            ("Red", (self.data[2], self.get_predicts(2))),
-                            ("NIR", (self.data[3], self.get_predicts(3))),
-                            ("SWIR-1", (self.data[4], self.get_predicts(4))),
-                            ("SWIR-2", (self.data[5], self.get_predicts(5))),
-                            ("Thermal", (self.data[6], self.get_predicts(6)))]
+        reader.geo_info = geo_info
 
-        self.band_lookup = OrderedDict(self.band_lookup)
+        return reader
 
-        # Combine these two dictionaries
-        # self.all_lookup = {**self.band_lookup, **self.index_lookup}
-        self.all_lookup = plot_functions.merge_dicts(self.band_lookup, self.index_lookup)
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the extracted data, not counting the tile inventory which is shared between readers
+        """
+        return estimate_nbytes({key: value for key, value in vars(self).items() if key != "inventory"})
 
     @staticmethod
     def load_cache(file):
@@ -418,12 +585,12 @@ class CCDReader:
     @staticmethod
     def imageid_date(image_ids):
         """
-        Extract the ordinal day from the ARD image name.
+        Extract the ordinal day from the ARD image name.  The dates are parsed once per set of image IDs and
+        returned as a copy, because the callers modify their arrays in place.
         :param image_ids: 
         :return: 
         """
-        return np.array([dt.datetime.strptime(d[15:23], "%Y%m%d").toordinal()
-                         for d in image_ids])
+        return np.copy(SceneDateIndex.get(image_ids).dates)
 
     def mask_daterange(self, dates):
         """
@@ -451,43 +618,55 @@ class CCDReader:
 
     def extract_cachepoint(self):
         """
-        Extract the spectral values from the cache file
+        Extract the spectral values from the cache file.  If the row has been converted to the pixel-major
+        memory-mapped layout, read only the pixel's slice from it instead of loading the full row, otherwise the full
+        row is loaded and converted in the background for the next pixels.  If the cache has no file for the row, the
+        values are extracted from the ARD tarballs when an ard_dir was given.
         :return:
         """
-        # rowcol = self.geo_to_rowcol(self.PIXEL_AFFINE, coord)
+        mmap_cache = MmapCache(self.cache_dir)
+
+        cache_file = self.inventory.cache_file(self.geo_info.rowcol.row)
+
+        if mmap_cache.is_current(self.geo_info.rowcol.row, cache_file):
+            data, image_ids = mmap_cache.load_pixel(self.geo_info.rowcol.row, self.geo_info.rowcol.column)
+
+            return data, self.imageid_date(image_ids), image_ids
+
+        if cache_file is not None:
+            # The row hasn't been converted, or the YATSM cache was re-run since it was
+            mmap_cache.convert_later(cache_file)
 
-        # data, image_ids = self.load_cache(self.find_file(self.CACHE_INV, "r{}".format(rowcol.row)))
-        data, image_ids = self.load_cache(self.find_file(self.CACHE_INV,
-                                                         "r{}".format(self.geo_info.rowcol.row)))
+        if cache_file is None and self.ard_dir:
+            # There's no cache for this row yet, read the observations from the ARD tarballs instead
+            return ARDExtractor.get(self.ard_dir).extract(self.geo_info.rowcol.row, self.geo_info.rowcol.column)
+
+        data, image_ids = self.load_cache(cache_file)
 
         dates = self.imageid_date(image_ids)
 
-        # return data[:, :, rowcol.column], dates, image_ids
         return data[:, :, self.geo_info.rowcol.column], dates, image_ids
 
     def extract_jsoncurve(self):
         """
-        Extract the pyccd information from the json file representing a chip of results.
+        Extract the pyccd information for the pixel.  Results are read from the tile's PixelStore, the chip JSON file
+        is only parsed (and added to the store) the first time one of its pixels is requested or if it has changed.
         """
-        # pixel_rowcol = self.geo_to_rowcol(self.PIXEL_AFFINE, coord)
-        # pixel_coord = self.rowcol_to_geo(self.PIXEL_AFFINE, pixel_rowcol)
-        #
-        # chip_rowcol = self.geo_to_rowcol(self.CHIP_AFFINE, coord)
-        # chip_coord = self.rowcol_to_geo(self.CHIP_AFFINE, chip_rowcol)
+        file = self.inventory.json_file(self.geo_info.chip_coord.x, self.geo_info.chip_coord.y)
 
-        # file = self.find_file(self.JSON_INV,
-        #                       "H{:02d}V{:02d}_{}_{}.json".format(self.H, self.V, chip_coord.x, chip_coord.y))
-        # result = self.find_chipcurve(file, pixel_coord)
+        if file is None:
+            raise ValueError("No PyCCD results for the chip at ({}, {}) in {}".format(self.geo_info.chip_coord.x,
+                                                                                     self.geo_info.chip_coord.y,
+                                                                                     self.json_dir))
 
-        file = self.find_file(self.JSON_INV,
-                              "H{:02d}V{:02d}_{}_{}.json".format(self.geo_info.H,
-                                                                 self.geo_info.V,
-                                                                 self.geo_info.chip_coord.x,
-                                                                 self.geo_info.chip_coord.y))
+        store = PixelStore.get_store(json_dir=self.json_dir,
+                                     tile="H{:02d}V{:02d}".format(self.geo_info.H, self.geo_info.V),
+                                     affine=self.geo_info.PIXEL_AFFINE)
 
-        result = self.find_chipcurve(file, self.geo_info.pixel_coord)
+        if not store.is_current(file):
+            store.add_chip(file)
 
-        return json.loads(result["result"])
+        return store.get(self.geo_info.pixel_rowcol)
 
     @staticmethod
     def predicts(days, coef, intercept):
@@ -616,21 +795,39 @@ class CCDReader:
         if isinstance(num, int):
             num = [num]
 
-        return [self.predicted_values[m * len(self.bands) + n] for n in num
-                for m in range(len(self.results["change_models"]))]
+        return [self.predictions[self.bands[n]][seg] for n in num for seg in self.segments]
 
-    def get_pqa_mask(self):
+    def get_float_band(self, num):
         """
-        Generate a mask from the Pixel QA
-        :return:
+        Return a float copy of an observed band, made once and reused by every index that needs it
+
+        :param num: int
+        :return: numpy.ndarray
+        """
+        if num not in self._float_bands:
+            self._float_bands[num] = self.data[num].astype(np.float64)
+
+        return self._float_bands[num]
+
+    def get_index(self, func, **bands):
         """
-        clr_vals = [66, 68, 322, 324]
+        Calculate an index from the observed values and from each change model's predicted values
 
-        pixelqa_in = self.qa[self.date_mask]
+        :param func: The index function from plot_functions
+        :param bands: Keyword arguments of the index function mapped to band numbers, e.g. R=2, NIR=3
+        :return: tuple of the observed index values and a list of the model index values
+        """
+        observed = func(**{arg: self.get_float_band(num) for arg, num in bands.items()})
 
-        pixelqa_mask = np.zeros_like(pixelqa_in, dtype=np.bool)
+        models = [func(**{arg: self.predictions[self.bands[num]][seg] for arg, num in bands.items()})
+                  for seg in self.segments]
 
-        for val in clr_vals:
-            pixelqa_mask[pixelqa_in == val] = True
+        return observed, models
 
-        return pixelqa_mask
+    def get_pqa_mask(self):
+        """
+        Generate a mask of the clear observations from the Pixel QA, the series mixes sensors so both the TM/ETM+
+        and the LC08 clear values count
+        :return:
+        """
+        return pixel_qa.get_mask(self.qa[self.date_mask], pixel_qa.CLEAR)
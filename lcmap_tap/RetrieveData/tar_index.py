@@ -0,0 +1,181 @@
+"""Byte offsets of the members of the ARD tarballs.  Opening a raster through /vsitar/ makes GDAL walk the tar headers
+each time, but ARD tarballs are uncompressed, so once a member's offset and size are known it can be opened directly
+as a /vsisubfile/ of the tarball.  The offsets are persisted in the local cache directory and re-read for a tarball
+only when its size or modification time changes."""
+
+import json
+import os
+import tarfile
+import threading
+
+from lcmap_tap.Auxiliary import caching
+
+
+class TarIndex:
+    def __init__(self, ard_dir: str, cache_dir: str = None):
+        """
+        Args:
+            ard_dir: Full path to the directory containing the ARD tarballs
+            cache_dir: Directory to keep the index in, defaults to the tool's local cache directory
+
+        """
+        self.ard_dir = ard_dir
+
+        self.cache_dir = cache_dir if cache_dir is not None else caching.get_cache_dir(ard_dir, "tar_index")
+
+        self.index_file = os.path.join(self.cache_dir, "tar_index.json")
+
+        # <dict> Tarball name: {"mtime": float, "size": int, "members": {member name: [offset, size]}}
+        self.tars = self.load()
+
+        self.lock = threading.Lock()
+
+    def load(self) -> dict:
+        """
+        Read the persisted index, an empty one if there isn't one yet
+
+        """
+        try:
+            with open(self.index_file, "r") as f:
+                return json.load(f)
+
+        except (IOError, ValueError):
+            return dict()
+
+    def save(self):
+        """
+        Write the index, replacing the previous file in one step
+
+        """
+        temp = self.index_file + ".tmp"
+
+        with open(temp, "w") as f:
+            json.dump(self.tars, f)
+
+        os.replace(temp, self.index_file)
+
+    @staticmethod
+    def read_members(tar_path: str):
+        """
+        Walk the headers of a tarball
+
+        Args:
+            tar_path: Full path to the tarball
+
+        Returns:
+            dict of member name: [offset, size], or None if the tarball is compressed or unreadable
+
+        """
+        try:
+            # "r:" only accepts uncompressed tarballs, whose members are stored contiguously
+            with tarfile.open(tar_path, "r:") as tar:
+                return {member.name: [member.offset_data, member.size] for member in tar if member.isfile()}
+
+        except (IOError, tarfile.TarError):
+            return None
+
+    def is_current(self, tar_path: str) -> bool:
+        """
+        Check whether the index holds the current member offsets of a tarball
+
+        """
+        entry = self.tars.get(os.path.basename(tar_path))
+
+        if entry is None:
+            return False
+
+        stat = os.stat(tar_path)
+
+        return entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size
+
+    def add(self, tar_path: str, save: bool = True):
+        """
+        Index the members of a tarball
+
+        Args:
+            tar_path: Full path to the tarball
+            save: Whether to write the index to disk afterwards
+
+        Returns:
+            None
+
+        """
+        members = self.read_members(tar_path)
+
+        stat = os.stat(tar_path)
+
+        with self.lock:
+            self.tars[os.path.basename(tar_path)] = {"mtime": stat.st_mtime,
+                                                     "size": stat.st_size,
+                                                     "members": members}
+
+            if save:
+                self.save()
+
+    def build(self, tar_paths):
+        """
+        Index every tarball that isn't already current, writing the index once at the end
+
+        Args:
+            tar_paths: Full paths to the tarballs
+
+        Returns:
+            None
+
+        """
+        changed = False
+
+        for tar_path in tar_paths:
+            if os.path.exists(tar_path) and not self.is_current(tar_path):
+                self.add(tar_path, save=False)
+
+                changed = True
+
+        if changed:
+            with self.lock:
+                self.save()
+
+    def member(self, tar_path: str, name: str):
+        """
+        Return the offset and size of a tarball member, indexing the tarball first if necessary
+
+        Args:
+            tar_path: Full path to the tarball
+            name: The member name
+
+        Returns:
+            Tuple of (offset, size), or None if the member can't be opened directly
+
+        """
+        if not os.path.exists(tar_path):
+            return None
+
+        if not self.is_current(tar_path):
+            self.add(tar_path)
+
+        members = self.tars[os.path.basename(tar_path)]["members"]
+
+        if members is None or name not in members:
+            return None
+
+        return tuple(members[name])
+
+    def vsipath(self, tar_path: str, name: str) -> str:
+        """
+        Return a GDAL virtual file path to a tarball member, a /vsisubfile/ path when its offset is known and a
+        /vsitar/ path otherwise
+
+        Args:
+            tar_path: Full path to the tarball
+            name: The member name
+
+        Returns:
+            The virtual file path
+
+        """
+        loc = self.member(tar_path, name)
+
+        if loc is None:
+            return "/vsitar/{}".format(tar_path) + os.sep + name
+
+        return "/vsisubfile/{}_{},{}".format(loc[0], loc[1], tar_path)
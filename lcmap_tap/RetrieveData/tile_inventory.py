@@ -0,0 +1,171 @@
+"""Persistent inventory of a tile's YATSM cache and PyCCD JSON files.  The directory listings are parsed once into
+row -> cache file and chip coordinate -> JSON file lookups, saved to disk, and only rebuilt when the modification
+time of a directory changes."""
+
+import json
+import os
+import re
+
+from lcmap_tap.Auxiliary import caching
+from lcmap_tap.RetrieveData.mmap_cache import get_row
+
+# <dict> Inventories already loaded by this process, keyed by (cache_dir, json_dir)
+_loaded = dict()
+
+
+def get_chip(file: str):
+    """
+    Return the chip upper-left coordinate encoded in a PyCCD JSON file name, e.g. H05V02_-2115585_2414805.json
+
+    Args:
+        file: The JSON file name or full path
+
+    Returns:
+        <tuple> The (x, y) chip coordinate as integers, or None if the file isn't a chip file
+
+    """
+    match = re.search(r"H\d+V\d+_(-?\d+(?:\.\d+)?)_(-?\d+(?:\.\d+)?)\.json$", os.path.basename(file))
+
+    if match is None:
+        return None
+
+    return int(float(match.group(1))), int(float(match.group(2)))
+
+
+class TileInventory:
+    def __init__(self, cache_dir: str, json_dir: str):
+        """
+        Args:
+            cache_dir: Full path to the tile-specific ARD cache
+            json_dir: Full path to the tile and version specific PyCCD results
+
+        """
+        self.cache_dir = cache_dir
+
+        self.json_dir = json_dir
+
+        self.rows = dict()
+
+        self.chips = dict()
+
+        self.cache_mtime = None
+
+        self.json_mtime = None
+
+        self.refresh()
+
+    @classmethod
+    def get(cls, cache_dir: str, json_dir: str):
+        """
+        Return the inventory for the pair of directories, reusing one already loaded by this process if the
+        directories haven't changed since
+
+        Args:
+            cache_dir: Full path to the tile-specific ARD cache
+            json_dir: Full path to the tile and version specific PyCCD results
+
+        Returns:
+            <TileInventory>
+
+        """
+        key = (os.path.abspath(cache_dir), os.path.abspath(json_dir))
+
+        if key in _loaded:
+            _loaded[key].refresh()
+
+        else:
+            _loaded[key] = cls(cache_dir, json_dir)
+
+        return _loaded[key]
+
+    @staticmethod
+    def inventory_file(directory: str, name: str) -> str:
+        """
+        Full path to the saved inventory of a directory
+
+        """
+        return os.path.join(caching.get_cache_dir(directory, "inventory"), "{}.json".format(name))
+
+    @classmethod
+    def load_listing(cls, directory: str, name: str, parse):
+        """
+        Load the saved listing of a directory if it is still current, otherwise list the directory and save it
+
+        Args:
+            directory: The directory to inventory
+            name: Name of the saved inventory ("cache" or "json")
+            parse: Function returning the lookup key for a file name, or None to leave the file out
+
+        Returns:
+            Tuple of the directory mtime and a list of (key, file name) pairs
+
+        """
+        mtime = os.path.getmtime(directory)
+
+        out_file = cls.inventory_file(directory, name)
+
+        try:
+            with open(out_file, "r") as f:
+                saved = json.load(f)
+
+            if saved["mtime"] == mtime:
+                return mtime, saved["files"]
+
+        except (IOError, KeyError, ValueError):
+            # Missing, or unreadable and listed again below
+            pass
+
+        files = list()
+
+        for f in sorted(os.listdir(directory)):
+            key = parse(f)
+
+            if key is not None:
+                files.append((key, f))
+
+        # Replace the saved inventory in one step so that another instance of the tool never reads a partial file
+        temp = out_file + ".tmp"
+
+        with open(temp, "w") as f:
+            json.dump({"mtime": mtime, "files": files}, f)
+
+        os.replace(temp, out_file)
+
+        return mtime, files
+
+    def refresh(self):
+        """
+        Rebuild the lookups for any directory whose modification time has changed
+
+        Returns:
+            None
+
+        """
+        if os.path.getmtime(self.cache_dir) != self.cache_mtime:
+            self.cache_mtime, files = self.load_listing(self.cache_dir, "cache",
+                                                        lambda f: get_row(f) if f.endswith(".npz") else None)
+
+            # Keep the first file for a row, matching the previous behavior of the directory scan
+            self.rows = dict()
+
+            for row, f in files:
+                self.rows.setdefault(row, os.path.join(self.cache_dir, f))
+
+        if os.path.getmtime(self.json_dir) != self.json_mtime:
+            self.json_mtime, files = self.load_listing(self.json_dir, "json", get_chip)
+
+            self.chips = {tuple(chip): os.path.join(self.json_dir, f) for chip, f in files}
+
+    def cache_file(self, row: int):
+        """
+        Return the full path to the cache file of a row, or None if there isn't one
+
+        """
+        return self.rows.get(row)
+
+    def json_file(self, x, y):
+        """
+        Return the full path to the JSON file of the chip with upper-left coordinate (x, y), or None if there isn't one
+
+        """
+        return self.chips.get((int(x), int(y)))
@@ -1,7 +1,8 @@
 import os
 import sys
 import traceback
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from osgeo import gdal
 import time
@@ -12,17 +13,53 @@ from PyQt5 import QtWidgets, QtGui
 
 from lcmap_tap.Visualization.ui_ard_viewer import Ui_ARDViewer
 from lcmap_tap.Visualization.rescale import Rescale
+from lcmap_tap.Visualization import index_render, raster_window
+from lcmap_tap.Visualization.render_worker import RenderWorker
+from lcmap_tap.Visualization.tile_layer import TiledPixmapItem
+from lcmap_tap.Visualization.time_lapse import ChipCube, PLAYBACK_FPS
 
 # Import the CCDReader class which retrieves json and cache data
 from lcmap_tap.RetrieveData.retrieve_data import CCDReader, GeoInfo
 from lcmap_tap.RetrieveData.retrieve_data import RowColumn
+from lcmap_tap.RetrieveData.overview_cache import OVERVIEW_LEVEL
 
 from lcmap_tap.Plotting import plot_functions
 
+from lcmap_tap.Auxiliary.lru_cache import LRUCache
+
+# <int> Memory budget in MB for rendered images, can be set with the LCMAP_TAP_IMAGE_CACHE_MB env. variable or
+# changed at runtime with IMAGE_CACHE.resize()
+IMAGE_CACHE_MB = int(os.environ.get("LCMAP_TAP_IMAGE_CACHE_MB", 256))
+
+# <LRUCache> Process-wide cache of rendered QImages keyed by the displayed product, its band sources and the window
+IMAGE_CACHE = LRUCache(max_bytes=IMAGE_CACHE_MB * 2 ** 20)
+
+# <ThreadPoolExecutor> Reads and stretches the bands of a composite concurrently, GDAL and most NumPy kernels release
+# the GIL so the bands are processed in parallel
+BAND_POOL = ThreadPoolExecutor(max_workers=4)
+
+
+def timed(func, *args, **kwargs):
+    """
+    Call a function and measure how long it takes
+
+    Returns:
+        Tuple of (result, seconds)
+
+    """
+    start = time.perf_counter()
+
+    result = func(*args, **kwargs)
+
+    return result, time.perf_counter() - start
+
 
 class ImageViewer(QtWidgets.QGraphicsView):
     image_clicked = QtCore.pyqtSignal(QtCore.QPointF)
 
+    # Emitted after zooming, panning or resizing, when a different part of the image may have become visible
+    view_changed = QtCore.pyqtSignal()
+
     def __init__(self):
         super(ImageViewer, self).__init__()
 
@@ -30,9 +67,13 @@ class ImageViewer(QtWidgets.QGraphicsView):
 
         self._empty = True
 
+        # <QRectF> The full extent of the raster in scene coordinates, the image may only cover part of it
+        self._extent = QtCore.QRectF()
+
         self.scene = QtWidgets.QGraphicsScene(self)
 
-        self._image = QtWidgets.QGraphicsPixmapItem()
+        # Draws only the visible tiles of the image at the current zoom
+        self._image = TiledPixmapItem()
 
         self._mouse_button = None
 
@@ -55,8 +96,22 @@ class ImageViewer(QtWidgets.QGraphicsView):
     def has_image(self):
         return not self._empty
 
+    def set_extent(self, width, height):
+        """
+        Set the full extent of the raster, scene coordinates are full resolution pixel coordinates within it
+
+        """
+        self._extent = QtCore.QRectF(0, 0, width, height)
+
+    def visible_rect(self) -> QtCore.QRectF:
+        """
+        Return the part of the scene that is visible in the viewport
+
+        """
+        return self.mapToScene(self.viewport().rect()).boundingRect()
+
     def fitInView(self, scale=True, **kwargs):
-        rect = QtCore.QRectF(self._image.pixmap().rect())
+        rect = QtCore.QRectF(self._extent) if not self._extent.isNull() else self._image.boundingRect()
 
         if not rect.isNull():
             self.setSceneRect(rect)
@@ -77,13 +132,38 @@ class ImageViewer(QtWidgets.QGraphicsView):
 
             self._zoom = 0
 
-    def set_image(self, pixmap=None):
+    def place_image(self, pixmap, window):
+        """
+        Show a pixmap read for a window in place of the current one, keeping the current zoom and position
+
+        Args:
+            pixmap: <QPixmap> or <QImage>
+            window: <Window> The part of the raster the pixmap covers, None if it covers the full extent
+
+        """
+        self._empty = pixmap is None or pixmap.isNull()
+
+        self._image.setPixmap(pixmap if not self._empty else QtGui.QPixmap())
+
+        if window is None or self._empty:
+            self._image.setPos(0, 0)
+
+            self._image.setTransform(QtGui.QTransform())
+
+        else:
+            # Stretch the (decimated) pixmap over the window so scene coordinates stay full resolution pixels
+            self._image.setPos(window.xoff, window.yoff)
+
+            self._image.setTransform(QtGui.QTransform.fromScale(window.xsize / pixmap.width(),
+                                                                window.ysize / pixmap.height()))
+
+    def set_image(self, pixmap=None, window=None):
         self._zoom = 0
 
         if pixmap and not pixmap.isNull():
             self._empty = False
 
-            self._image.setPixmap(pixmap)
+            self.place_image(pixmap, window)
 
         else:
             self._empty = True
@@ -113,6 +193,13 @@ class ImageViewer(QtWidgets.QGraphicsView):
             else:
                 self._zoom = 0
 
+            self.view_changed.emit()
+
+    def resizeEvent(self, event: QtGui.QResizeEvent):
+        super(ImageViewer, self).resizeEvent(event)
+
+        self.view_changed.emit()
+
     def toggle_drag(self):
         if self.dragMode() == QtWidgets.QGraphicsView.ScrollHandDrag:
             self.setDragMode(QtWidgets.QGraphicsView.NoDrag)
@@ -146,13 +233,247 @@ class ImageViewer(QtWidgets.QGraphicsView):
 
         super(ImageViewer, self).mouseReleaseEvent(event)
 
+        if self.dragMode() == QtWidgets.QGraphicsView.ScrollHandDrag:
+            self.view_changed.emit()
+
+
+class ImageRequest:
+    # The index function and the index of each input band in ard_file
+    INDEX_CALC = {"ndvi": {"func": plot_functions.ndvi,
+                           "args": {"R": 2,
+                                    "NIR": 3}},
+                  "msavi": {"func": plot_functions.msavi,
+                            "args": {"R": 2,
+                                     "NIR": 3}},
+                  "savi": {"func": plot_functions.savi,
+                           "args": {"R": 2,
+                                    "NIR": 3}},
+                  "evi": {"func": plot_functions.evi,
+                          "args": {"B": 0,
+                                   "R": 2,
+                                   "NIR": 3}},
+                  "ndmi": {"func": plot_functions.ndmi,
+                           "args": {"NIR": 3,
+                                    "SWIR1": 4}},
+                  "nbr": {"func": plot_functions.nbr,
+                          "args": {"NIR": 3,
+                                   "SWIR2": 5}},
+                  "nbr2": {"func": plot_functions.nbr2,
+                           "args": {"SWIR1": 4,
+                                    "SWIR2": 5}}
+                  }
+
+    def __init__(self, viewer, window):
+        """
+        Everything an image of the ARD viewer is made from, taken from the viewer on the GUI thread so the image can
+        be made on a render thread while the viewer changes
+
+        Args:
+            viewer: <ARDViewerX>
+            window: <Window> The part of the tile to make the image of
+
+        """
+        self.ard_file = list(viewer.ard_file)
+
+        self.overview_files = list(viewer.overview_files) if viewer.overview_files else None
+
+        self.sensor = viewer.sensor
+
+        self.scene = viewer.scene
+
+        self.stretch_stats = viewer.stretch_stats
+
+        self.bands = viewer.bands
+
+        self.index_name = viewer.index_name
+
+        self.cmap = viewer.cmap
+
+        self.window = window
+
+        # <OrderedDict> Seconds spent in each stage of making the image
+        self.timings = OrderedDict()
+
+    def nums(self):
+        """
+        Return the indices in ard_file of the bands the image is made from, without PIXELQA
+
+        """
+        if self.index_name:
+            return list(self.INDEX_CALC[self.index_name]["args"].values())
+
+        return [self.bands.R - 1, self.bands.G - 1, self.bands.B - 1]
+
+    def band_source(self, num):
+        """
+        Return the file a band's window is read from, its reduced resolution copy when the window is coarse enough
+
+        :param num: Index of the band in ard_file
+        :return: Tuple of (path, scale of the file)
+        """
+        if self.overview_files and self.window.level >= OVERVIEW_LEVEL:
+            return self.overview_files[num], OVERVIEW_LEVEL
+
+        return self.ard_file[num], 1
+
+    def read_band(self, num):
+        """
+        Read the window of a band, served from the decoded band cache when it was read before
+
+        :param num: Index of the band in ard_file
+        :return:
+        """
+        path, scale = self.band_source(num)
+
+        return raster_window.read_window(path, self.window, scale=scale)
+
+    def stretch_keys(self):
+        """
+        Return the names of the statistics the image is stretched with in the StretchStats sidecar files
+
+        :return:
+        """
+        if self.index_name:
+            return ["index_{}".format(self.index_name)]
+
+        return ["band_{}".format(num) for num in self.nums()]
+
+    def image_key(self):
+        """
+        Return the key of the image in the IMAGE_CACHE, the key of an index image ends with its colormap
+
+        :return:
+        """
+        name = self.index_name or "rgb"
+
+        if self.stretch_stats is None or self.scene is None:
+            stretch = None
+
+        elif name == "rgb":
+            stretch = tuple(self.stretch_stats.revision(key) for key in self.stretch_keys())
+
+        else:
+            stretch = self.stretch_stats.revision(self.stretch_keys()[0])
+
+        key = (name, self.sensor) + tuple(self.band_source(num) for num in self.nums() + [-1]) + \
+              (self.window, self.scene if stretch else None, stretch)
+
+        return key + (self.cmap,) if self.index_name else key
+
+    def render(self):
+        """
+        Make the image, or take it from the IMAGE_CACHE.  Runs on a render thread.
+
+        :return: <QImage>
+        """
+        key = self.image_key()
+
+        cached = IMAGE_CACHE.get(key)
+
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+
+        # Read the bands and PIXELQA concurrently
+        futures = OrderedDict([(num, BAND_POOL.submit(timed, self.read_band, num)) for num in self.nums() + [-1]])
+
+        arrays = OrderedDict()
+
+        for num, future in futures.items():
+            arrays[num], self.timings["read {}".format(num if num >= 0 else "qa")] = future.result()
+
+        self.timings["read"] = time.perf_counter() - start
+
+        qa = arrays.pop(-1)
+
+        if self.index_name:
+            img, self.timings["stretch"] = timed(self.make_index, arrays, qa, code_key=key[:-1])
+
+        else:
+            array, self.timings["stretch"] = timed(self.rescale_rgb, *arrays.values(), qa=qa)
+
+            img = QImage(array.data, array.shape[1], array.shape[0], array.strides[0], QImage.Format_RGB888)
+
+            # Keep the buffer the QImage refers to alive with it
+            img.ndarray = array
+
+        IMAGE_CACHE.put(key, img, nbytes=img.ndarray.nbytes)
+
+        return img
+
+    def make_index(self, arrays, qa, code_key):
+        """
+        Calculate and stretch the index and color it with the colormap
+
+        :param arrays: The input bands keyed by their index in ard_file
+        :param qa: The PIXELQA band
+        :param code_key: Key of the quantized index in the CODE_CACHE
+        :return: <QImage>
+        """
+        calc = self.INDEX_CALC[self.index_name]
+
+        # The scene-wide limits are only looked up if the index isn't quantized yet
+        limits = self.get_stretch(self.index_name) if code_key not in index_render.CODE_CACHE else None
+
+        bands = {arg: arrays[num] for arg, num in calc["args"].items()}
+
+        return index_render.render_index(code_key, calc["func"], bands, qa, self.sensor, limits=limits, cmap=self.cmap)
+
+    def rescale_rgb(self, r, g, b, qa):
+        """
+
+        :param r:
+        :param g:
+        :param b:
+        :param qa:
+        :return:
+        """
+        rgb = np.zeros((r.shape[0], r.shape[1], 3), dtype=np.uint8)
+
+        # Stretch the three channels concurrently
+        futures = [BAND_POOL.submit(timed, lambda array, num: Rescale(sensor=self.sensor, array=array, qa=qa,
+                                                                      hist=self.get_stretch(num)), array, num)
+                   for array, num in zip((r, g, b), self.nums())]
+
+        for channel, (name, future) in enumerate(zip("rgb", futures)):
+            rescale, self.timings["stretch {}".format(name)] = future.result()
+
+            rgb[:, :, channel] = rescale.rescaled
+
+        return rgb
+
+    def get_stretch(self, name):
+        """
+        Return the scene-wide statistics to stretch a band or index with
+
+        :param name: Index of the band in ard_file, or the index name
+        :return: The band histogram or index limits as passed to Rescale, None to stretch the window by itself
+        """
+        if self.stretch_stats is None or self.scene is None:
+            return None
+
+        try:
+            if isinstance(name, str):
+                calc = self.INDEX_CALC[name]
+
+                return self.stretch_stats.get_limits(self.scene, name, calc["func"], calc["args"], self.sensor)
+
+            return self.stretch_stats.get_hist(self.scene, name, self.sensor)
+
+        except (AttributeError, IndexError, KeyError, RuntimeError):
+            print("Couldn't get the stretch of {} {}: {}".format(self.scene, name, sys.exc_info()[1]))
+
+            return None
+
 
 class ARDViewerX(QtWidgets.QMainWindow):
     Bands = namedtuple('Bands', ['R', 'G', 'B'])
 
     band_nums = [1, 2, 3, 4, 5, 6]
 
-    def __init__(self, ard_file, ccd, sensor, gui, current_view=None):
+    def __init__(self, ard_file, ccd, sensor, gui, current_view=None, overview_files=None, scene=None,
+                 prefetcher=None, stretch_stats=None, ard_info=None):
         """
 
         Args:
@@ -160,6 +481,11 @@ class ARDViewerX(QtWidgets.QMainWindow):
             ccd: 
             sensor:
             gui:
+            overview_files: List of the reduced resolution copies of the ard_file bands, None if there aren't any
+            scene: The scene ID of the ard observation
+            prefetcher: <ScenePrefetcher> Reads the scenes before and after this one while it is displayed
+            stretch_stats: <StretchStats> Scene-wide stretch statistics, each window is stretched by itself if None
+            ard_info: <ARDInfo> The tile's ARD scenes, needed for the time-lapse playback
         """
         super(ARDViewerX, self).__init__()
 
@@ -174,15 +500,35 @@ class ARDViewerX(QtWidgets.QMainWindow):
         self.R = None
         self.G = None
         self.B = None
-        self.r = None
-        self.g = None
-        self.b = None
-        self.qa = None
         self.img = None
-        self.rgb = None
         self.current_pixel = None
         self.new_ccd = None
 
+        # <Window> The part of the tile that is currently displayed, and at which decimation level
+        self.window = None
+
+        # <Window> The part of the tile of the latest image request
+        self.requested = None
+
+        # <tuple> The (columns, rows) of the full resolution bands
+        self.extent = None
+
+        # <str> Name of the displayed index, None while the RGB composite is displayed
+        self.index_name = None
+
+        # <str> Name of the matplotlib colormap of the index images
+        self.cmap = index_render.INDEX_CMAP
+
+        # <OrderedDict> Seconds spent in each stage of the last composite, see report_timings
+        self.timings = OrderedDict()
+
+        # Makes the images on a thread pool, the newest request replaces any that is still being made
+        self.renderer = RenderWorker(lambda request: request.render(), parent=self)
+
+        self.renderer.image_ready.connect(self.show_image)
+
+        self.renderer.render_failed.connect(self.render_failed)
+
         self.graphics_view = ImageViewer()
 
         self.ui.scrollArea.setWidget(self.graphics_view)
@@ -191,6 +537,19 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
         self.ard_file = ard_file
 
+        self.overview_files = overview_files
+
+        self.scene = scene
+
+        self.prefetcher = prefetcher
+
+        self.stretch_stats = stretch_stats
+
+        self.ard_info = ard_info
+
+        # <ChipCube> The chips of the time-lapse playback, None while it isn't playing
+        self.cube = None
+
         self.sensor = sensor
 
         self.ccd = ccd
@@ -211,11 +570,6 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
         self.r_check, self.g_check, self.b_check = 0, 0, 0
 
-        # Read in the full extent of the raster bands 1, 2, 3, and PIXELQA
-        self.read_data()
-
-        self.get_rgb()
-
         self.r_actions = [self.ui.actionBand_1, self.ui.actionBand_2, self.ui.actionBand_3, self.ui.actionBand_4,
                           self.ui.actionBand_5, self.ui.actionBand_6]
 
@@ -274,7 +628,8 @@ class ARDViewerX(QtWidgets.QMainWindow):
         # Display the GUI for the user
         self.init_ui()
 
-        self.display_img()
+        # Make the image of the visible window of the raster bands 1, 2, 3, and PIXELQA at the displayed resolution
+        self.render()
 
         self.make_rect()
 
@@ -282,6 +637,32 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
         self.graphics_view.image_clicked.connect(self.update_rect)
 
+        # Re-read the bands once zooming or panning has paused, rather than on every wheel step
+        self.refresh_timer = QtCore.QTimer(self)
+
+        self.refresh_timer.setSingleShot(True)
+
+        self.refresh_timer.setInterval(200)
+
+        self.refresh_timer.timeout.connect(self.refresh_window)
+
+        self.graphics_view.view_changed.connect(self.refresh_timer.start)
+
+        # Play the chips of every scene around the selected pixel, added here rather than in the Designer file
+        self.action_playback = QtWidgets.QAction("Play time-lapse", self)
+
+        self.action_playback.setCheckable(True)
+
+        self.ui.menuImage.addAction(self.action_playback)
+
+        self.action_playback.toggled.connect(self.toggle_playback)
+
+        self.playback_timer = QtCore.QTimer(self)
+
+        self.playback_timer.setInterval(int(1000 / PLAYBACK_FPS))
+
+        self.playback_timer.timeout.connect(self.next_frame)
+
     def init_ui(self):
         """
         Initialize the map-viewer window
@@ -296,6 +677,10 @@ class ARDViewerX(QtWidgets.QMainWindow):
         Returns:
 
         """
+        self.stop_playback()
+
+        self.renderer.stop()
+
         self.close()
 
     def save_img(self):
@@ -340,9 +725,18 @@ class ARDViewerX(QtWidgets.QMainWindow):
         try:
             self.sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Ignored, QtWidgets.QSizePolicy.Ignored)
 
-            self.pixel_map = QPixmap.fromImage(self.img)
+            # The tiled item makes pixmaps of the visible tiles only
+            self.pixel_map = self.img
+
+            if self.graphics_view.has_image():
+                # Keep the current zoom and position, only the image changes
+                self.graphics_view.place_image(self.pixel_map, self.window)
 
-            self.graphics_view.set_image(self.pixel_map)
+                self.prefetch()
+
+                return None
+
+            self.graphics_view.set_image(self.pixel_map, self.window)
 
             if self.current_view:
 
@@ -355,9 +749,24 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
                 self.graphics_view.scale(factor, factor)
 
+            self.prefetch()
+
         except AttributeError:
             pass
 
+    def prefetch(self):
+        """
+        Have the neighbouring scenes read for the displayed window and bands
+
+        :return:
+        """
+        if self.prefetcher is None or self.scene is None:
+            return None
+
+        nums = ImageRequest(self, self.window).nums() + [len(self.ard_file) - 1]
+
+        self.prefetcher.prefetch(self.scene, self.window, nums)
+
     def zoom_to_point(self):
         """
         Zoom to the selected point
@@ -393,8 +802,8 @@ class ARDViewerX(QtWidgets.QMainWindow):
         row_ul = check_upper(self.row)
         col_ul = check_upper(self.col)
 
-        row_lr = check_lower(self.row, self.r.shape[0])
-        col_lr = check_lower(self.col, self.r.shape[0])
+        row_lr = check_lower(self.row, self.extent[1])
+        col_lr = check_lower(self.col, self.extent[0])
 
         upper_left = QtCore.QPointF(col_ul, row_ul)
         bottom_right = QtCore.QPointF(col_lr, row_lr)
@@ -417,6 +826,9 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
         self.current_view = self.graphics_view.sceneRect()
 
+        # Read the zoomed in area at full resolution
+        self.refresh_timer.start()
+
     def get_R(self, band):
         """
 
@@ -497,129 +909,287 @@ class ARDViewerX(QtWidgets.QMainWindow):
 
         :return:
         """
+        self.index_name = None
+
         try:
             if self.r_check + self.g_check + self.b_check == 3:
                 self.bands = self.Bands(R=self.R, G=self.G, B=self.B)
 
-                self.read_data()
+            self.render()
 
-                self.get_rgb()
+        except AttributeError:
+            pass
 
-                self.display_img()
+    def get_window(self, pad=0.25):
+        """
+        Return the window of the tile needed to display the visible area at the current zoom
 
-            else:
-                self.get_rgb()
+        :param pad: Fraction of the visible width and height added on each side
+        :return: <Window>
+        """
+        view_rect = self.graphics_view.viewport().rect()
 
-                self.display_img()
+        if self.graphics_view.has_image():
+            visible = self.graphics_view.visible_rect()
 
-        except AttributeError:
-            pass
+            visible = (visible.left(), visible.top(), visible.right(), visible.bottom())
+
+        else:
+            visible = (0, 0, self.extent[0], self.extent[1])
+
+        window = raster_window.get_window(visible, view_rect.width(), view_rect.height(),
+                                          self.extent[0], self.extent[1], pad=pad)
+
+        # Show the full tile from the reduced resolution copies, even if that is a little coarser than the screen
+        if self.overview_files and window.level < OVERVIEW_LEVEL and \
+                (window.xsize, window.ysize) == tuple(self.extent):
+            window = window._replace(level=OVERVIEW_LEVEL)
 
-    def read_data(self):
+        return window
+
+    def refresh_window(self):
         """
+        Render a new window if the visible area isn't covered by the requested one at the needed resolution
 
         :return:
         """
         try:
-            self.r = gdal.Open(self.ard_file[self.bands.R - 1]).ReadAsArray()
-            self.g = gdal.Open(self.ard_file[self.bands.G - 1]).ReadAsArray()
-            self.b = gdal.Open(self.ard_file[self.bands.B - 1]).ReadAsArray()
+            # The playback frames replace the rendered image until it is stopped
+            if self.cube is not None or raster_window.covers(self.requested, self.get_window(pad=0)):
+                return None
+
+            self.render(preview=False)
 
-            self.qa = gdal.Open(self.ard_file[-1]).ReadAsArray()
+        except (AttributeError, TypeError):
+            print(sys.exc_info()[0])
+            print(sys.exc_info()[1])
+            traceback.print_tb(sys.exc_info()[2])
+
+    def render(self, preview=True):
+        """
+        Have the image of the current scene, bands and view made on the render threads.  A cached image is shown
+        right away, otherwise the full tile is first shown from the reduced resolution copies if they are built.
+
+        :param preview: Whether to show a coarse preview while the image is made
+        :return:
+        """
+        try:
+            self.extent = raster_window.raster_size(self.ard_file[-1])
 
         except AttributeError:
             self.gui.ui.plainTextEdit_results.appendPlainText("Could not open {}".format(self.ard_file))
 
-    def get_rgb(self):
+            return None
+
+        self.graphics_view.set_extent(*self.extent)
+
+        request = ImageRequest(self, self.get_window())
+
+        self.requested = request.window
+
+        cached = IMAGE_CACHE.get(request.image_key())
+
+        if cached is not None:
+            # Nothing older may replace it
+            self.renderer.cancel()
+
+            self.show_image(request, cached, False)
+
+            return None
+
+        coarse = None
+
+        if preview and self.overview_files and request.window.level < OVERVIEW_LEVEL:
+            coarse = ImageRequest(self, raster_window.Window(xoff=0, yoff=0, xsize=self.extent[0],
+                                                             ysize=self.extent[1], level=OVERVIEW_LEVEL))
+
+        self.renderer.submit(request, preview=coarse)
+
+    def show_image(self, request, image, preview):
         """
+        Display an image made on the render threads, connected to RenderWorker.image_ready
 
+        :param request: <ImageRequest> The request the image was made for
+        :param image: <QImage>
+        :param preview: Whether the image is a coarse preview
         :return:
         """
-        self.rgb = self.rescale_rgb(r=self.r, g=self.g, b=self.b, qa=self.qa)
+        if request is None or image is None:
+            return None
 
-        self.img = QImage(self.rgb.data, self.r.shape[0], self.r.shape[0], self.rgb.strides[0], QImage.Format_RGB888)
+        self.img = image
 
-        self.img.ndarray = self.rgb
+        self.window = request.window
 
-    def get_index(self, name: str):
+        self.timings = request.timings
+
+        self.display_img()
+
+        if not preview and self.timings:
+            self.report_timings()
+
+        if not preview:
+            self.report_stretch(request)
+
+    def render_failed(self, request, message):
         """
-        Generate and display the index that was selected
+        Report an image that couldn't be made, connected to RenderWorker.render_failed
 
-        Args:
-            name: The index name, used to identify the appropriate index calculation and input arguments
+        :return:
+        """
+        self.gui.ui.plainTextEdit_results.appendPlainText("Could not display {}: {}".format(request.scene, message))
 
-        Returns:
-            None
+    def report_stretch(self, request):
+        """
+        Show in the status bar when the tile-wide stretch comes from only some of the tile's scenes, it shifts as more
+        scenes are viewed until the statistics of the whole tile are built
 
+        :param request: <ImageRequest> The request of the displayed image
+        :return:
         """
-        index_calc = {"ndvi": {"func": plot_functions.ndvi,
-                               "args": {"R": self.ard_file[2],
-                                        "NIR": self.ard_file[3]}},
-                      "msavi": {"func": plot_functions.msavi,
-                                "args": {"R": self.ard_file[2],
-                                         "NIR": self.ard_file[3]}},
-                      "savi": {"func": plot_functions.savi,
-                               "args": {"R": self.ard_file[2],
-                                        "NIR": self.ard_file[3]}},
-                      "evi": {"func": plot_functions.evi,
-                              "args": {"B": self.ard_file[0],
-                                       "R": self.ard_file[2],
-                                       "NIR": self.ard_file[3]}},
-                      "ndmi": {"func": plot_functions.ndmi,
-                               "args": {"NIR": self.ard_file[3],
-                                        "SWIR1": self.ard_file[4]}},
-                      "nbr": {"func": plot_functions.nbr,
-                              "args": {"NIR": self.ard_file[3],
-                                       "SWIR2": self.ard_file[5]}},
-                      "nbr2": {"func": plot_functions.nbr2,
-                               "args": {"SWIR1": self.ard_file[4],
-                                        "SWIR2": self.ard_file[5]}                               }
-                      }
+        if request.stretch_stats is None or request.stretch_stats.mode != "tile" or self.cube is not None:
+            return None
 
-        func = index_calc[name]["func"]
+        counts = [request.stretch_stats.coverage(key) for key in request.stretch_keys()]
 
-        self.index = func(**vars(index_calc[name]["args"]))
+        used, total = min(count for count, _ in counts), counts[0][1]
 
-        # Read in the arrays required for the selected index function
-        for key in index_calc[name]["args"].keys():
-            index_calc[name]["args"][key] = gdal.Open(index_calc[name]["args"][key]).ReadAsArray()
+        if used < total:
+            self.ui.statusbar.showMessage("Partial tile stretch from {} of {} scenes".format(used, total))
 
-        if isinstance(self.qa, type(None)):
-            self.qa = gdal.Open(self.ard_file[-1]).ReadAsArray()
+        else:
+            self.ui.statusbar.clearMessage()
 
-        self.index_vis = np.zeros((self.r.shape[0], self.r.shape[0], 1), dtype=np.uint8)
+    def report_timings(self):
+        """
+        Print the time spent in each stage of the last composite
 
-        index_rescale = Rescale(sensor=self.sensor, array=self.index, qa=self.qa)
+        :return:
+        """
+        print("Composite timings (ms): " + ", ".join("{} {:.1f}".format(stage, seconds * 1000)
+                                                    for stage, seconds in self.timings.items()))
 
-        self.index_vis[:, :, 0] = index_rescale.rescaled
+    def toggle_playback(self, checked: bool):
+        """
+        Start or stop the time-lapse playback, connected to the playback action
 
-        self.img = QImage(self.index_vis.data, self.r.shape[0], self.r.shape[0], self.index_vis.strides[0],
-                          QImage.Format_RGB888)
+        :param checked: Whether the action was checked
+        :return:
+        """
+        if checked:
+            self.start_playback()
 
-        self.img.ndarray = self.index_vis
+        else:
+            self.stop_playback()
 
-        self.display_img()
+    def start_playback(self):
+        """
+        Read the chips of every scene around the selected pixel and show them one after the other, starting at the
+        current scene
 
-    def rescale_rgb(self, r, g, b, qa):
+        :return:
         """
+        if self.ard_info is None or self.cube is not None:
+            return None
+
+        try:
+            self.cube = ChipCube(self.ard_info, self.row, self.col,
+                                 nums=[self.bands.R - 1, self.bands.G - 1, self.bands.B - 1])
+
+        except (AttributeError, IndexError, KeyError):
+            self.gui.ui.plainTextEdit_results.appendPlainText("Could not play the time-lapse: {}".format(
+                sys.exc_info()[1]))
+
+            self.action_playback.setChecked(False)
+
+            return None
+
+        self.cube.seek(self.scene)
+
+        # Images of the current scene that are still being made would replace the frames
+        self.renderer.cancel()
+
+        window = self.cube.window
+
+        rect = QtCore.QRectF(window.xoff, window.yoff, window.xsize, window.ysize)
+
+        view_rect = self.graphics_view.viewport().rect()
+
+        scene_rect = self.graphics_view.transform().mapRect(rect)
+
+        factor = min(view_rect.width() / scene_rect.width(),
+                     view_rect.height() / scene_rect.height())
+
+        self.graphics_view.scale(factor, factor)
+
+        self.graphics_view.centerOn(rect.center())
+
+        self.playback_timer.start()
+
+    def next_frame(self):
+        """
+        Show the next frame of the time-lapse, connected to the playback timer.  Nothing changes while the frame is
+        still being read.
 
-        :param r:
-        :param g:
-        :param b:
-        :param qa:
         :return:
         """
-        rgb = np.zeros((self.r.shape[0], self.r.shape[0], 3), dtype=np.uint8)
+        if self.cube is None:
+            return None
 
-        r_rescale = Rescale(sensor=self.sensor, array=r, qa=qa)
-        g_rescale = Rescale(sensor=self.sensor, array=g, qa=qa)
-        b_rescale = Rescale(sensor=self.sensor, array=b, qa=qa)
+        frame = self.cube.next_frame()
 
-        rgb[:, :, 0] = r_rescale.rescaled
-        rgb[:, :, 1] = g_rescale.rescaled
-        rgb[:, :, 2] = b_rescale.rescaled
+        if frame is None:
+            return None
 
-        return rgb
+        scene, rgb = frame
+
+        img = QImage(rgb.data, rgb.shape[1], rgb.shape[0], rgb.strides[0], QImage.Format_RGB888)
+
+        # Keep the buffer the QImage refers to alive with it
+        img.ndarray = rgb
+
+        self.img = img
+
+        self.graphics_view.place_image(img, self.cube.window)
+
+        self.ui.statusbar.showMessage(scene)
+
+    def stop_playback(self):
+        """
+        Stop the time-lapse and show the current scene again
+
+        :return:
+        """
+        if self.cube is None:
+            return None
+
+        self.playback_timer.stop()
+
+        self.cube.stop()
+
+        self.cube = None
+
+        self.ui.statusbar.clearMessage()
+
+        if self.action_playback.isChecked():
+            self.action_playback.setChecked(False)
+
+        self.render()
+
+    def get_index(self, name: str):
+        """
+        Generate and display the index that was selected
+
+        Args:
+            name: The index name, used to identify the appropriate index calculation and input arguments
+
+        Returns:
+            None
+
+        """
+        self.index_name = name
+
+        self.render()
 
     def make_rect(self):
         """
@@ -674,9 +1244,8 @@ class ARDViewerX(QtWidgets.QMainWindow):
         # self.graphics_view.scene.addRect(self.rect, pen)
         self.graphics_view.scene.addItem(self.current_pixel)
 
-        time.sleep(1)
-
-        self.update_plot()
+        # Re-plot once the new rectangle is drawn
+        QtCore.QTimer.singleShot(0, self.update_plot)
 
     def update_plot(self):
 
@@ -688,11 +1257,13 @@ class ARDViewerX(QtWidgets.QMainWindow):
         print("coords", coords)
         print("coords type", type(coords), type(coords.x), type(coords.y))
 
-        self.new_ccd = CCDReader(x=coords.x,
-                                 y=coords.y,
-                                 units="meters",
-                                 cache_dir=self.ccd.cache_dir,
-                                 json_dir=self.ccd.json_dir)
+        # Extracted once here, the plot() call below is then served from the pixel cache
+        self.new_ccd = CCDReader.get(x=coords.x,
+                                     y=coords.y,
+                                     units="meters",
+                                     cache_dir=self.ccd.cache_dir,
+                                     json_dir=self.ccd.json_dir,
+                                     ard_dir=self.ccd.ard_dir)
 
         self.gui.ui.x1line.setText(str(coords.x))
         self.gui.ui.y1line.setText(str(coords.y))
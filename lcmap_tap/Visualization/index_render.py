@@ -0,0 +1,203 @@
+"""Render spectral index images through a colormap lookup table.  The index is calculated in blocks of rows and kept
+as float32, quantized once to 8-bit codes with the same clip and stretch as Rescale, and the codes are mapped through
+a 256-entry colormap straight into the 32-bit buffer a QImage is made from.  The codes are cached, so showing an
+index again with a different colormap only repeats the table lookup."""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+import matplotlib
+from PyQt5.QtGui import QImage
+
+from lcmap_tap.Auxiliary.lru_cache import LRUCache
+from lcmap_tap.RetrieveData import pixel_qa
+
+# <str> Name of the matplotlib colormap used for the index images, can be set with the LCMAP_TAP_INDEX_CMAP env.
+# variable
+INDEX_CMAP = os.environ.get("LCMAP_TAP_INDEX_CMAP", "gray")
+
+# <int> Number of rows calculated at a time, keeps the float temporaries of the index functions small
+CHUNK_ROWS = 256
+
+# <int> Memory budget in MB for the quantized index codes, can be set with the LCMAP_TAP_CODE_CACHE_MB env. variable
+CODE_CACHE_MB = int(os.environ.get("LCMAP_TAP_CODE_CACHE_MB", 64))
+
+# <LRUCache> Process-wide cache of the quantized index codes, keyed like the images they are rendered to
+CODE_CACHE = LRUCache(max_bytes=CODE_CACHE_MB * 2 ** 20)
+
+
+@lru_cache(maxsize=32)
+def colormap_lut(name: str) -> np.ndarray:
+    """
+    Return the 256 colors of a matplotlib colormap as QImage.Format_ARGB32 pixels
+
+    Args:
+        name: The colormap name, e.g. "gray" or "RdYlGn"
+
+    Returns:
+        uint32 array of 256 0xAARRGGBB values
+
+    """
+    rgba = (matplotlib.colormaps[name](np.arange(256)) * 255 + 0.5).astype(np.uint32)
+
+    lut = (rgba[:, 3] << 24) | (rgba[:, 0] << 16) | (rgba[:, 1] << 8) | rgba[:, 2]
+
+    lut.setflags(write=False)
+
+    return lut
+
+
+def row_chunks(rows: int, chunk_rows: int = CHUNK_ROWS):
+    """
+    Yield slices covering the rows in blocks of chunk_rows
+
+    """
+    for start in range(0, rows, chunk_rows):
+        yield slice(start, min(start + chunk_rows, rows))
+
+
+def calc_index(func, bands: dict) -> np.ndarray:
+    """
+    Calculate an index in blocks of rows
+
+    Args:
+        func: The index function from plot_functions
+        bands: The index function's arguments mapped to the input band arrays
+
+    Returns:
+        float32 array of the index
+
+    """
+    shape = next(iter(bands.values())).shape
+
+    index = np.empty(shape, dtype=np.float32)
+
+    for rows in row_chunks(shape[0]):
+        index[rows] = func(**{arg: array[rows].astype(np.float32) for arg, array in bands.items()})
+
+    return index
+
+
+def get_limits(index: np.ndarray, qa: np.ndarray, sensor: str, lower_percentile=1, upper_percentile=99):
+    """
+    Return the stretch of an index as Rescale makes it: the percentiles of the clear pixels, or of the non-fill
+    pixels if there are no clear ones, and the range of the clipped non-fill pixels
+
+    Returns:
+        Array of (lower limit, upper limit, low, high)
+
+    """
+    clear = pixel_qa.get_mask(qa, pixel_qa.CLEAR, sensor=sensor)
+
+    valid = pixel_qa.get_mask(qa, pixel_qa.FILL, sensor=sensor, invert=True)
+
+    values = index[valid]
+
+    if values.size == 0:
+        return np.zeros(4, dtype=np.float64)
+
+    lower, upper = np.nanpercentile(index[clear] if clear.any() else values, [lower_percentile, upper_percentile])
+
+    low, high = np.clip([np.nanmin(values), np.nanmax(values)], lower, upper)
+
+    return np.array([lower, upper, low, high], dtype=np.float64)
+
+
+def quantize(index: np.ndarray, qa: np.ndarray, sensor: str, limits) -> np.ndarray:
+    """
+    Stretch an index to 8-bit codes in blocks of rows, fill pixels get code 0
+
+    Args:
+        index: float32 array of the index, it is overwritten
+        qa: The PIXELQA band
+        sensor: The sensor, e.g. "LC08"
+        limits: The (lower limit, upper limit, low, high) of the stretch
+
+    Returns:
+        uint8 array of codes
+
+    """
+    lower, upper, low, high = limits
+
+    scale = np.float32(254.0 / (high - low)) if high > low else np.float32(0)
+
+    codes = np.empty(index.shape, dtype=np.uint8)
+
+    for rows in row_chunks(index.shape[0]):
+        chunk = index[rows]
+
+        np.clip(chunk, lower, upper, out=chunk)
+
+        chunk -= np.float32(low)
+
+        chunk *= scale
+
+        np.clip(chunk, 0, 254, out=chunk)
+
+        # NaN, e.g. where an index is undefined, renders as code 0 like the fill
+        np.nan_to_num(chunk, copy=False)
+
+        codes[rows] = chunk
+
+        codes[rows][pixel_qa.get_mask(qa[rows], pixel_qa.FILL, sensor=sensor)] = 0
+
+    return codes
+
+
+def to_qimage(codes: np.ndarray, cmap: str = INDEX_CMAP) -> QImage:
+    """
+    Map codes through a colormap into a QImage
+
+    Args:
+        codes: uint8 array of codes
+        cmap: The colormap name
+
+    Returns:
+        <QImage> of Format_ARGB32, its buffer is kept alive as its ndarray attribute
+
+    """
+    buffer = np.empty(codes.shape, dtype=np.uint32)
+
+    colormap_lut(cmap).take(codes, out=buffer)
+
+    img = QImage(buffer.data, buffer.shape[1], buffer.shape[0], buffer.strides[0], QImage.Format_ARGB32)
+
+    img.ndarray = buffer
+
+    return img
+
+
+def render_index(key, func, bands: dict, qa: np.ndarray, sensor: str, limits=None,
+                 cmap: str = INDEX_CMAP) -> QImage:
+    """
+    Render an index image, taking its codes from the CODE_CACHE if it was quantized before
+
+    Args:
+        key: Key of the codes in the CODE_CACHE
+        func: The index function from plot_functions
+        bands: The index function's arguments mapped to the input band arrays
+        qa: The PIXELQA band
+        sensor: The sensor, e.g. "LC08"
+        limits: The (lower limit, upper limit, low, high) of the stretch, defaults to the index's own
+        cmap: The colormap name
+
+    Returns:
+        <QImage>
+
+    """
+    codes = CODE_CACHE.get(key)
+
+    if codes is None:
+        index = calc_index(func, bands)
+
+        if limits is None:
+            limits = get_limits(index, qa, sensor)
+
+        codes = quantize(index, qa, sensor, limits)
+
+        codes.setflags(write=False)
+
+        CODE_CACHE.put(key, codes, nbytes=codes.nbytes)
+
+    return to_qimage(codes, cmap)
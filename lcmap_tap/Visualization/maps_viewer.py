@@ -5,13 +5,15 @@ import glob
 # matplotlib.use("Qt5Agg")
 
 from PyQt5 import QtCore, QtWidgets, QtGui
-from PyQt5.QtGui import QPixmap  # , QImage, QActionEvent
+from PyQt5.QtGui import QImage  # , QPixmap, QActionEvent
 from PyQt5.QtWidgets import QMainWindow, QSlider  # QFileDialog, QSizePolicy, QLabel, QAction
 
 # import matplotlib.pyplot as plt
 # from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 from lcmap_tap.Visualization.ui_maps_viewer import Ui_MapViewer
+from lcmap_tap.Visualization.tile_layer import TiledPixmapItem
+from lcmap_tap.RetrieveData.product_catalog import ProductCatalog
 
 
 class ImageViewer(QtWidgets.QGraphicsView):
@@ -26,7 +28,8 @@ class ImageViewer(QtWidgets.QGraphicsView):
 
         self.scene = QtWidgets.QGraphicsScene(self)
 
-        self._image = QtWidgets.QGraphicsPixmapItem()
+        # Draws only the visible tiles of the map at the current zoom
+        self._image = TiledPixmapItem()
 
         self._mouse_button = None
 
@@ -50,7 +53,7 @@ class ImageViewer(QtWidgets.QGraphicsView):
         return not self._empty
 
     def fitInView(self, scale=True, **kwargs):
-        rect = QtCore.QRectF(self._image.pixmap().rect())
+        rect = self._image.boundingRect()
 
         if not rect.isNull():
             self.setSceneRect(rect)
@@ -192,6 +195,9 @@ class MapsViewer(QMainWindow):
 
         self.root_dir = root + os.sep + self.tile + os.sep + "eval"
 
+        # <ProductCatalog> The product versions and the files of each product by year, saved between sessions
+        self.catalog = ProductCatalog.get(self.root_dir, self.versions)
+
         self.version = self.get_version()
 
         self.get_product_root_directories()
@@ -204,7 +210,8 @@ class MapsViewer(QMainWindow):
 
         self.ui.scrollArea.setWidget(self.graphics_view)
 
-        self.img_list1 = list()
+        # <dict> The files of the product shown in Map 1 by year
+        self.img_files1 = dict()
 
         self.img_list2 = list()
 
@@ -256,23 +263,7 @@ class MapsViewer(QMainWindow):
         Returns:
             version: The version identifier
         """
-        for version in self.versions:
-            temp_look = self.root_dir + os.sep + version
-
-            if os.path.exists(temp_look):
-
-                change_test = temp_look + os.sep + "ChangeMaps"
-                cover_test = temp_look + os.sep + "CoverMaps"
-
-                if os.path.exists(change_test) and os.path.exists(cover_test):
-
-                    return version
-
-                else:
-                    continue
-
-            else:
-                continue
+        return self.catalog.get_version()
 
     def get_product_root_directories(self):
         """
@@ -359,7 +350,7 @@ class MapsViewer(QMainWindow):
         if imgs is None:
             imgs = glob.glob(input_dir + os.sep + "*.tif")
 
-        self.pixel_map1 = QPixmap(imgs[0])
+        self.pixel_map1 = QImage(imgs[0])
 
         # self.ui.map1_QLabel.setPixmap(self.pixel_map1.scaled(self.ui.map1_QLabel.size(),
         #                                                      QtCore.Qt.KeepAspectRatio,
@@ -377,8 +368,8 @@ class MapsViewer(QMainWindow):
         self.ui.show_date.setText(str(value))
 
         try:
-            temp1 = [img for img in self.img_list1 if str(value) in img][0]
-            self.pixel_map1 = QPixmap(temp1)
+            temp1 = self.img_files1[value]
+            self.pixel_map1 = QImage(temp1)
 
             # self.ui.map1_QLabel.setPixmap(self.pixel_map1.scaled(self.ui.map1_QLabel.size(),
             #                                                      QtCore.Qt.KeepAspectRatio,
@@ -386,7 +377,7 @@ class MapsViewer(QMainWindow):
 
             self.graphics_view.set_image(self.pixel_map1)
 
-        except (TypeError, IndexError, AttributeError):
+        except (TypeError, KeyError, AttributeError):
             pass
 
         # try:
@@ -464,11 +455,12 @@ class MapsViewer(QMainWindow):
         if product is not "":
 
             try:
-                self.img_list1 = glob.glob(self.products[product]["root"] + os.sep + "*.tif")
+                self.img_files1 = self.catalog.get_files(self.version, self.products[product]["type"],
+                                                         self.products[product]["alias"])
 
-                temp = [img for img in self.img_list1 if str(self.ui.date_slider.value()) in img][0]
+                temp = self.img_files1[self.ui.date_slider.value()]
 
-                self.pixel_map1 = QPixmap(temp)
+                self.pixel_map1 = QImage(temp)
 
                 # self.ui.map1_QLabel.setPixmap(self.pixel_map1.scaled(self.ui.map1_QLabel.size(),
                 #                                                      QtCore.Qt.KeepAspectRatio,
@@ -476,7 +468,7 @@ class MapsViewer(QMainWindow):
 
                 self.graphics_view.set_image(self.pixel_map1)
 
-            except IndexError:
+            except KeyError:
                 pass
 
     # def browse_map2(self, index):
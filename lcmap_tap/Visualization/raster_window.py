@@ -0,0 +1,152 @@
+"""Read the part of an ARD band that is visible in the viewer, at the resolution it is displayed at.  A window is
+given in full resolution pixel coordinates of the tile together with a decimation level, so the displayed image can
+be positioned and scaled in the same coordinates that the full resolution image would use."""
+
+import math
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+from osgeo import gdal
+
+from lcmap_tap.Auxiliary.lru_cache import LRUCache
+
+# <namedtuple> A block of the raster in full resolution pixel coordinates, read with every level-th pixel
+Window = namedtuple("Window", ["xoff", "yoff", "xsize", "ysize", "level"])
+
+# <int> Memory budget in MB for decoded band windows, can be set with the LCMAP_TAP_BAND_CACHE_MB env. variable or
+# changed at runtime with BAND_CACHE.resize()
+BAND_CACHE_MB = int(os.environ.get("LCMAP_TAP_BAND_CACHE_MB", 512))
+
+# <LRUCache> Process-wide cache of decoded band windows keyed by (path, band, window, scale)
+BAND_CACHE = LRUCache(max_bytes=BAND_CACHE_MB * 2 ** 20)
+
+
+@lru_cache(maxsize=4096)
+def raster_size(path: str) -> tuple:
+    """
+    Return the (columns, rows) of a raster
+
+    Args:
+        path: Path or GDAL virtual file path of the raster
+
+    Returns:
+        Tuple of (columns, rows)
+
+    """
+    ds = gdal.Open(path)
+
+    return ds.RasterXSize, ds.RasterYSize
+
+
+def buffer_size(window: Window) -> tuple:
+    """
+    Return the (columns, rows) of the array read for a window
+
+    """
+    return int(math.ceil(window.xsize / window.level)), int(math.ceil(window.ysize / window.level))
+
+
+def read_window(path: str, window: Window, band: int = 1, scale: int = 1):
+    """
+    Read a window of a raster band.  Decimated reads let GDAL use the overviews of the raster if it has any.
+
+    Args:
+        path: Path or GDAL virtual file path of the raster
+        window: <Window> The block to read, in full resolution pixels
+        band: The band number
+        scale: Decimation level of the raster itself, e.g. for a reduced resolution copy of the full band.  The
+               window level must be a multiple of it.
+
+    Returns:
+        Array of shape (rows, columns) as given by buffer_size.  The array is shared through BAND_CACHE and is
+        read-only, copy it before modifying it.
+
+    """
+    key = (path, band, window, scale)
+
+    cached = BAND_CACHE.get(key)
+
+    if cached is not None:
+        return cached
+
+    buf_xsize, buf_ysize = buffer_size(window)
+
+    ds = gdal.Open(path)
+
+    xoff, yoff = window.xoff // scale, window.yoff // scale
+
+    xsize = min(int(math.ceil(window.xsize / scale)), ds.RasterXSize - xoff)
+    ysize = min(int(math.ceil(window.ysize / scale)), ds.RasterYSize - yoff)
+
+    array = ds.GetRasterBand(band).ReadAsArray(xoff, yoff, xsize, ysize, buf_xsize=buf_xsize, buf_ysize=buf_ysize)
+
+    array.setflags(write=False)
+
+    BAND_CACHE.put(key, array, nbytes=array.nbytes)
+
+    return array
+
+
+def get_level(scene_width: float, view_width: float) -> int:
+    """
+    Return the decimation level, a power of 2, at which about one raster pixel is read per screen pixel
+
+    Args:
+        scene_width: Width of the visible area in full resolution pixels
+        view_width: Width of the viewport in screen pixels
+
+    Returns:
+        The level, 1 for full resolution
+
+    """
+    if view_width <= 0 or scene_width <= view_width:
+        return 1
+
+    return 2 ** int(math.floor(math.log2(scene_width / view_width)))
+
+
+def get_window(visible, view_width: int, view_height: int, width: int, height: int, pad: float = 0.25) -> Window:
+    """
+    Return the window needed to display the visible area, padded on each side so small pans don't need a new read
+
+    Args:
+        visible: Tuple of (x_min, y_min, x_max, y_max) of the visible area in full resolution pixels
+        view_width: Width of the viewport in screen pixels
+        view_height: Height of the viewport in screen pixels
+        width: Number of columns of the raster
+        height: Number of rows of the raster
+        pad: Fraction of the visible width and height added on each side
+
+    Returns:
+        <Window> Aligned to multiples of its level and clipped to the raster
+
+    """
+    x_min, y_min, x_max, y_max = visible
+
+    level = min(get_level(x_max - x_min, view_width), get_level(y_max - y_min, view_height))
+
+    pad_x, pad_y = (x_max - x_min) * pad, (y_max - y_min) * pad
+
+    xoff = max(0, int(math.floor((x_min - pad_x) / level)) * level)
+    yoff = max(0, int(math.floor((y_min - pad_y) / level)) * level)
+
+    x_end = min(width, int(math.ceil((x_max + pad_x) / level)) * level)
+    y_end = min(height, int(math.ceil((y_max + pad_y) / level)) * level)
+
+    return Window(xoff=xoff, yoff=yoff, xsize=max(1, x_end - xoff), ysize=max(1, y_end - yoff), level=level)
+
+
+def covers(outer: Window, inner: Window) -> bool:
+    """
+    Check whether the data read for one window can display another, i.e. it spans the other's extent at the same or
+    a finer resolution
+
+    """
+    if outer is None or inner is None:
+        return False
+
+    return (outer.level <= inner.level and
+            outer.xoff <= inner.xoff and outer.yoff <= inner.yoff and
+            outer.xoff + outer.xsize >= inner.xoff + inner.xsize and
+            outer.yoff + outer.ysize >= inner.yoff + inner.ysize)
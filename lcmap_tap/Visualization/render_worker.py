@@ -0,0 +1,151 @@
+"""Make the images of a viewer on a Qt thread pool so the window stays responsive while bands are read and stretched.
+Each request may come with a coarse preview that is made first and shown until the full image is done.  Only the
+latest request is wanted: submitting a new one drops the queued tasks of the older ones, and the images of tasks that
+were already running are discarded when they arrive."""
+
+import sys
+import traceback
+
+from PyQt5 import QtCore
+
+
+class RenderSignals(QtCore.QObject):
+    # Emitted with (generation, request, image, is preview) when a task is done
+    finished = QtCore.pyqtSignal(int, object, object, bool)
+
+    # Emitted with (generation, request, error message) when a task fails
+    failed = QtCore.pyqtSignal(int, object, str)
+
+
+class RenderTask(QtCore.QRunnable):
+    def __init__(self, worker, generation: int, render, request, preview: bool):
+        """
+        Args:
+            worker: <RenderWorker> The worker the task was submitted to
+            generation: The worker's generation when the task was submitted
+            render: Function making the image of a request, called on a pool thread
+            request: The request to make the image of
+            preview: Whether the image is the coarse preview of the request
+
+        """
+        super(RenderTask, self).__init__()
+
+        self.worker = worker
+
+        self.generation = generation
+
+        self.render = render
+
+        self.request = request
+
+        self.preview = preview
+
+        self.signals = RenderSignals()
+
+    def run(self):
+        # Don't start on a request that was replaced while the task was queued
+        if self.generation != self.worker.generation:
+            return None
+
+        try:
+            image = self.render(self.request)
+
+        except Exception:
+            traceback.print_tb(sys.exc_info()[2])
+
+            self.signals.failed.emit(self.generation, self.request, str(sys.exc_info()[1]))
+
+            return None
+
+        self.signals.finished.emit(self.generation, self.request, image, self.preview)
+
+
+class RenderWorker(QtCore.QObject):
+    # Emitted on the GUI thread with (request, image, is preview) for the images of the latest request
+    image_ready = QtCore.pyqtSignal(object, object, bool)
+
+    # Emitted on the GUI thread with (request, error message) if the latest request failed
+    render_failed = QtCore.pyqtSignal(object, str)
+
+    def __init__(self, render, threads: int = 2, parent=None):
+        """
+        Args:
+            render: Function making the image of a request, called on a pool thread
+            threads: Number of render threads
+            parent: <QObject>
+
+        """
+        super(RenderWorker, self).__init__(parent)
+
+        self.render = render
+
+        self.pool = QtCore.QThreadPool(self)
+
+        self.pool.setMaxThreadCount(threads)
+
+        # <int> Incremented on every request, tasks of an older generation are stale
+        self.generation = 0
+
+        # <bool> Whether the full image of the latest request was shown, a late preview is then discarded
+        self.done = False
+
+    def submit(self, request, preview=None):
+        """
+        Make the image of a request, replacing any earlier one
+
+        Args:
+            request: The request
+            preview: A request for a coarse version of the image, made first if given
+
+        Returns:
+            None
+
+        """
+        # Drop the tasks of earlier requests
+        self.cancel()
+
+        self.done = False
+
+        if preview is not None:
+            self.start(preview, True)
+
+        self.start(request, False)
+
+    def start(self, request, preview: bool):
+        task = RenderTask(self, self.generation, self.render, request, preview)
+
+        task.signals.finished.connect(self.on_finished)
+
+        task.signals.failed.connect(self.on_failed)
+
+        self.pool.start(task)
+
+    def on_finished(self, generation: int, request, image, preview: bool):
+        if generation != self.generation or (preview and self.done):
+            return None
+
+        self.done = self.done or not preview
+
+        self.image_ready.emit(request, image, preview)
+
+    def on_failed(self, generation: int, request, message: str):
+        if generation == self.generation:
+            self.render_failed.emit(request, message)
+
+    def cancel(self):
+        """
+        Drop the queued tasks and discard the images of the running ones
+
+        """
+        self.generation += 1
+
+        self.pool.clear()
+
+    def stop(self):
+        """
+        Cancel the requests and wait for the running tasks
+
+        """
+        self.cancel()
+
+        self.pool.waitForDone()
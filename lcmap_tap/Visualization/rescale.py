@@ -3,9 +3,124 @@
 import os
 import numpy as np
 
+from lcmap_tap.RetrieveData import pixel_qa
+
+# <int> Number of distinct 16-bit values
+NUM_CODES = 2 ** 16
+
+# <dict> Cached PIXELQA class lookup tables keyed by sensor, see qa_class_lut
+_class_luts = dict()
+
+# <dict> Cached (values, sort order) of the 16-bit codes keyed by dtype, see code_values
+_code_values = dict()
+
+
+def qa_class_lut(sensor: str) -> np.ndarray:
+    """
+    Return a lookup table of the stretch class of every PIXELQA value: 0 fill, 1 valid, 2 clear.  The classes are
+    shifted into the upper bits, ready to be combined with a 16-bit value into a histogram bin.
+
+    Args:
+        sensor: The sensor, e.g. "LC08"
+
+    Returns:
+        intp array of NUM_CODES classes << 16
+
+    """
+    if sensor not in _class_luts:
+        flags = pixel_qa.get_lut(sensor)
+
+        lut = np.ones(NUM_CODES, dtype=np.intp)
+
+        lut[(flags & pixel_qa.CLEAR) != 0] = 2
+
+        lut[(flags & pixel_qa.FILL) != 0] = 0
+
+        _class_luts[sensor] = lut << 16
+
+    return _class_luts[sensor]
+
+
+def code_values(dtype) -> tuple:
+    """
+    Return the value of each 16-bit code of a dtype, i.e. of its bit pattern read as uint16, and the order that sorts
+    the codes by value
+
+    Args:
+        dtype: np.int16 or np.uint16
+
+    Returns:
+        Tuple of (values, order)
+
+    """
+    dtype = np.dtype(dtype)
+
+    if dtype not in _code_values:
+        values = np.arange(NUM_CODES, dtype=np.uint16).view(dtype)
+
+        _code_values[dtype] = (values, np.argsort(values, kind="stable"))
+
+    return _code_values[dtype]
+
+
+def hist_percentile(sorted_values: np.ndarray, cumulative: np.ndarray, q: float):
+    """
+    Return the same percentile np.percentile (linear method) returns for the data a histogram was made from
+
+    Args:
+        sorted_values: The values of the histogram bins in increasing order, as their original dtype
+        cumulative: Cumulative counts of the bins in the same order
+        q: The percentile, 0 to 100
+
+    Returns:
+        The percentile as a float
+
+    """
+    n = int(cumulative[-1])
+
+    def element(k):
+        # The k-th smallest value of the data
+        return sorted_values[np.searchsorted(cumulative, k, side="right")]
+
+    quantile = np.true_divide(q, 100)
+
+    # Matches np.percentile's linear method
+    virtual = (n - 1) * quantile
+
+    if virtual >= n - 1:
+        return np.float64(element(n - 1))
+
+    if virtual < 0:
+        return np.float64(element(0))
+
+    previous = np.floor(virtual)
+
+    gamma = virtual - previous
+
+    a, b = element(int(previous)), element(int(previous) + 1)
+
+    diff_b_a = b - a
+
+    if gamma >= 0.5:
+        return b - diff_b_a * (1 - gamma)
+
+    return a + diff_b_a * gamma
+
 
 class Rescale:
-    def __init__(self, sensor, array, qa, lower_percentile=1, upper_percentile=99):
+    def __init__(self, sensor, array, qa, lower_percentile=1, upper_percentile=99, hist=None, limits=None):
+        """
+        Args:
+            sensor: The sensor, e.g. "LC08"
+            array: The band or index to stretch
+            qa: The PIXELQA band
+            lower_percentile: Percentile clipped to the low end of the stretch
+            upper_percentile: Percentile clipped to the high end of the stretch
+            hist: The (PIXELQA class, value) histogram of a 16-bit band to derive the stretch from, e.g. of the whole
+                  scene, instead of from the array itself
+            limits: The (lower limit, upper limit, low, high) to stretch a float array with instead of its own
+
+        """
         self.lower_percentile = lower_percentile
 
         self.upper_percentile = upper_percentile
@@ -16,13 +131,18 @@ class Rescale:
 
         self.qa = qa
 
-        self.mask_clear = np.zeros_like(self.qa, dtype=np.bool)
+        if self.array.dtype in (np.int16, np.uint16):
+            # 16-bit reflectance, stretched from a histogram through a lookup table
+            self.rescaled = self.rescale_hist(hist=hist)
+
+            return
 
-        self.mask_fill = np.copy(self.mask_clear)
+        self.mask_clear, self.mask_fill = self.get_masks()
 
-        self.get_masks()
+        if limits is not None:
+            self.limits = list(limits[0:2])
 
-        if not np.any(self.mask_clear == True):
+        elif not np.any(self.mask_clear == True):
             self.limits = self.get_percentiles(qa=self.mask_fill)
 
         else:
@@ -30,28 +150,82 @@ class Rescale:
 
         self.clipped = self.clip_array()
 
-        self.rescaled = self.rescale_array()
+        self.rescaled = self.rescale_array(*(limits[2:4] if limits is not None else ()))
 
-    def get_masks(self):
+    def rescale_hist(self, out_min=1.0, out_max=255.0, hist=None):
         """
+        Stretch a 16-bit array in one pass over the pixels.  A single histogram of (PIXELQA class, value) gives the
+        percentile limits and the min/max of the clipped values, then the output is gathered from a lookup table of
+        the stretched value of every (class, value) pair.  The result is the same as that of get_percentiles,
+        clip_array and rescale_array, as uint8.
 
+        :param out_min:
+        :param out_max:
+        :param hist: Histogram to use instead of the array's own
         :return:
         """
+        values, order = code_values(self.array.dtype)
 
-        if self.sensor == "LC08":
-            # PIXELQA 322, 324 are clear land/water obs. with low confidence cloud and low confidence cirrus
-            self.mask_clear[self.qa == 322] = True
-            self.mask_clear[self.qa == 324] = True
+        # <ndarray> class << 16 | value bits, the histogram bin and lookup table index of every pixel
+        index = qa_class_lut(self.sensor)[pixel_qa.as_index(self.qa)]
 
-        else:
-            # PIXELQA 66, 68 are clear land/water obs. with low confidence cloud
-            self.mask_clear[self.qa == 66] = True
-            self.mask_clear[self.qa == 68] = True
-            # print(mask_clear)
+        index |= self.array.view(np.uint16)
+
+        if hist is None:
+            hist = np.bincount(index.ravel(), minlength=3 * NUM_CODES).reshape(3, NUM_CODES)
+
+        self.hist = hist
+
+        lut = np.zeros((3, NUM_CODES), dtype=np.uint8)
+
+        valid = (hist[1] + hist[2])[order]
+
+        if not valid.any():
+            self.limits = [np.nan, np.nan]
+
+            self.range = (np.nan, np.nan)
+
+            return lut.ravel()[index]
+
+        # Percentiles of the clear pixels, or of all non-fill pixels if there are no clear ones
+        counts = hist[2][order] if hist[2].any() else valid
+
+        sorted_values = values[order]
 
-        self.mask_fill[self.qa != 1] = True
+        cumulative = np.cumsum(counts)
 
-        return None
+        self.limits = [hist_percentile(sorted_values, cumulative, self.lower_percentile),
+                       hist_percentile(sorted_values, cumulative, self.upper_percentile)]
+
+        # Clipping an integer array to float limits in place truncates the limits toward zero
+        lower, upper = int(self.limits[0]), int(self.limits[1])
+
+        clipped = np.clip(values.astype(np.int64), lower, upper)
+
+        present = np.flatnonzero(valid)
+
+        low = min(max(int(sorted_values[present[0]]), lower), upper)
+
+        high = min(max(int(sorted_values[present[-1]]), lower), upper)
+
+        self.range = (low, high)
+
+        if high > low:
+            # Values outside of a histogram given for a larger area are held at the ends of the stretch
+            lut[1] = lut[2] = np.clip((clipped - low) * (out_max - out_min) / (high - low),
+                                      0, out_max - out_min).astype(np.uint8)
+
+        return lut.ravel()[index]
+
+    def get_masks(self):
+        """
+        Return the clear mask, i.e. clear land/water obs. with low confidence cloud (and cirrus for LC08), and the
+        mask of the non-fill pixels
+
+        :return:
+        """
+        return (pixel_qa.get_mask(self.qa, pixel_qa.CLEAR, sensor=self.sensor),
+                pixel_qa.get_mask(self.qa, pixel_qa.FILL, sensor=self.sensor, invert=True))
 
     def get_percentiles(self, qa):
         """
@@ -67,25 +241,28 @@ class Rescale:
         :return:
         """
 
-        clipped = np.zeros_like(self.array)
+        # Cast back to the input type, truncating the limits for integer arrays
+        return np.clip(self.array, self.limits[0], self.limits[1]).astype(self.array.dtype)
 
-        np.clip(a=self.array, a_min=self.limits[0], a_max=self.limits[1], out=clipped)
-
-        return clipped
-
-    def rescale_array(self, out_min=1.0, out_max=255.0):
+    def rescale_array(self, low=None, high=None, out_min=1.0, out_max=255.0):
         """
 
+        :param low: Value stretched to 0, defaults to the minimum of the clipped non-fill pixels
+        :param high: Value stretched to out_max - out_min, defaults to the maximum of the clipped non-fill pixels
         :param out_min:
         :param out_max:
         :return:
         """
+        if low is None:
+            low, high = np.min(self.clipped[self.mask_fill]), np.max(self.clipped[self.mask_fill])
+
+        self.range = (low, high)
+
         out_data = np.zeros_like(self.clipped, dtype=np.int32)
 
-        out_data[self.mask_fill] = (
-                (self.clipped[self.mask_fill] - np.min(self.clipped[self.mask_fill])) *
-                (out_max - out_min) / (np.max(self.clipped[self.mask_fill]) -
-                                       np.min(self.clipped[self.mask_fill]))
+        out_data[self.mask_fill] = np.clip(
+                (self.clipped[self.mask_fill] - low) * (out_max - out_min) / (high - low),
+                0, out_max - out_min
         )
 
         return out_data
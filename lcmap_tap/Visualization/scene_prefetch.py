@@ -0,0 +1,145 @@
+"""Decode the scenes acquired before and after the displayed one while the user looks at it.  Analysts usually step
+through the observations in date order, so the neighbouring scenes are read for the current window and bands into
+the decoded band cache on a small thread pool, and the next step is served from memory.  GDAL releases the GIL while
+it reads and decodes, so threads are enough here."""
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lcmap_tap.RetrieveData.overview_cache import OVERVIEW_LEVEL
+from lcmap_tap.Visualization import raster_window
+
+
+class ScenePrefetcher:
+    def __init__(self, ard_info, depth: int = 3, workers: int = 2, overviews=None):
+        """
+        Args:
+            ard_info: <ARDInfo> The tile's ARD scenes
+            depth: Number of scenes prefetched on each side of the displayed one
+            workers: Number of reader threads
+            overviews: <OverviewCache> Reduced resolution copies of the scenes, read instead of the full bands when
+                       the window is coarse enough
+
+        """
+        self.ard_info = ard_info
+
+        self.depth = depth
+
+        self.overviews = overviews
+
+        # <list> Scene IDs in acquisition date order
+        self.by_date = [str(ard_info.date_index.scene_ids[i]) for i in ard_info.date_index.order]
+
+        self.position = {scene: num for num, scene in enumerate(self.by_date)}
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.futures = list()
+
+        # <int> Incremented on every new request so running tasks of an older one stop early
+        self.generation = 0
+
+        self.last_request = None
+
+        self.lock = threading.Lock()
+
+    def neighbours(self, scene: str) -> list:
+        """
+        Return the scenes around one in date order, alternating after and before it, closest first
+
+        """
+        pos = self.position.get(scene)
+
+        if pos is None:
+            return list()
+
+        scenes = list()
+
+        for step in range(1, self.depth + 1):
+            for num in (pos + step, pos - step):
+                if 0 <= num < len(self.by_date):
+                    scenes.append(self.by_date[num])
+
+        return scenes
+
+    def sources(self, scene: str, window, nums) -> list:
+        """
+        Return the (path, scale) of each band a viewer would read for a scene and window, mirroring
+        ARDViewerX.band_source
+
+        """
+        paths = self.ard_info.vsipaths[scene][0:7]
+
+        overview_files = self.overviews.get_paths(scene) if self.overviews else None
+
+        if overview_files and window.level >= OVERVIEW_LEVEL:
+            return [(overview_files[0:7][num], OVERVIEW_LEVEL) for num in nums]
+
+        return [(paths[num], 1) for num in nums]
+
+    def read_scene(self, scene: str, window, nums, generation: int):
+        """
+        Decode the bands of one scene into the band cache, run in a reader thread
+
+        """
+        try:
+            for path, scale in self.sources(scene, window, nums):
+                if generation != self.generation:
+                    return None
+
+                raster_window.read_window(path, window, scale=scale)
+
+        except (AttributeError, IndexError, KeyError, RuntimeError):
+            # A scene that can't be read is simply not prefetched, it will report its error when it is displayed
+            print("Prefetch of {} failed: {}".format(scene, sys.exc_info()[1]))
+
+    def cancel(self):
+        """
+        Cancel the outstanding prefetches
+
+        """
+        with self.lock:
+            self.generation += 1
+
+            for future in self.futures:
+                future.cancel()
+
+            self.futures = list()
+
+            self.last_request = None
+
+    def prefetch(self, scene: str, window, nums):
+        """
+        Prefetch the neighbours of the displayed scene, replacing any earlier request
+
+        Args:
+            scene: The displayed scene ID
+            window: <Window> The displayed window
+            nums: Indices in ARDInfo.vsipaths of the displayed bands, including PIXELQA
+
+        Returns:
+            None
+
+        """
+        request = (scene, window, tuple(nums))
+
+        if request == self.last_request or window is None:
+            return None
+
+        self.cancel()
+
+        with self.lock:
+            self.last_request = request
+
+            self.futures = [self.executor.submit(self.read_scene, neighbour, window, list(nums), self.generation)
+                            for neighbour in self.neighbours(scene)]
+
+    def stop(self):
+        """
+        Cancel the outstanding prefetches and release the reader threads
+
+        """
+        self.cancel()
+
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,335 @@
+"""Stretch statistics of the ARD scenes, computed once per scene and kept in a small sidecar file in the local cache
+directory.  For each displayed band the (PIXELQA class, value) histogram of the whole scene is stored, and for each
+index the percentile limits and the range they stretch.  The viewer stretches every window of a scene with the same
+statistics, so an image no longer changes its contrast while panning and zooming, and no percentiles are computed
+for the displayed pixels.
+
+The statistics are taken from the full tile at OVERVIEW_LEVEL, i.e. from every 8th pixel of every 8th row, which is
+the same read that displays a fully zoomed out scene.
+
+In the "tile" mode, set with the LCMAP_TAP_STRETCH env. variable, the band histograms of all scenes that have
+statistics are added up so that every scene of the tile is stretched alike.  The tile-wide limits of an index are
+the medians of the per-scene limits.  Until build() has been run for the tile, e.g. with
+python -m lcmap_tap.Visualization.stretch_stats, the tile-wide statistics only cover the scenes viewed so far and shift
+as more are viewed; coverage() tells how many scenes they come from."""
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+import numpy as np
+
+from lcmap_tap.Auxiliary import caching
+from lcmap_tap.RetrieveData.ard_info import QA_NUM
+from lcmap_tap.RetrieveData.overview_cache import OVERVIEW_LEVEL
+from lcmap_tap.Visualization import raster_window
+from lcmap_tap.Visualization.rescale import Rescale
+
+# <str> "scene" to stretch each scene with its own statistics, "tile" for statistics aggregated over the tile's scenes
+STRETCH_MODE = os.environ.get("LCMAP_TAP_STRETCH", "scene")
+
+# <dict> StretchStats instances keyed by the ARD directory they were created for
+_stores = dict()
+
+
+class StretchStats:
+    def __init__(self, ard_info, cache_dir: str = None, overviews=None, mode: str = STRETCH_MODE):
+        """
+        Args:
+            ard_info: <ARDInfo> The tile's ARD scenes
+            cache_dir: Directory to keep the sidecar files in, defaults to the tool's local cache directory
+            overviews: <OverviewCache> Reduced resolution copies of the scenes, read instead of the full bands when
+                       they are built
+            mode: "scene" or "tile"
+
+        """
+        self.ard_info = ard_info
+
+        self.cache_dir = cache_dir if cache_dir is not None else caching.get_cache_dir(ard_info.root, "stretch")
+
+        self.overviews = overviews
+
+        self.mode = mode
+
+        # <dict> The loaded statistics of each scene, {scene: {key: array}}
+        self.stats = dict()
+
+        # <dict> The aggregated statistics of the tile, {key: (number of scenes, array)}
+        self.tile_stats = dict()
+
+        self.lock = threading.RLock()
+
+    @classmethod
+    def get(cls, ard_info, overviews=None):
+        """
+        Return the store of an ARD directory, created once per directory
+
+        Args:
+            ard_info: <ARDInfo>
+            overviews: <OverviewCache>
+
+        Returns:
+            <StretchStats>
+
+        """
+        key = os.path.abspath(ard_info.root)
+
+        if key not in _stores:
+            _stores[key] = cls(ard_info, overviews=overviews)
+
+        else:
+            # Pick up tarballs that appeared since the store was created
+            _stores[key].ard_info = ard_info
+
+            _stores[key].overviews = overviews
+
+        return _stores[key]
+
+    def stats_file(self, scene: str) -> str:
+        """
+        Return the sidecar file of a scene
+
+        """
+        return os.path.join(self.cache_dir, "{}.npz".format(scene))
+
+    def stamp(self, scene: str) -> str:
+        """
+        Return the modification times of a scene's tarballs, the statistics are recomputed when they change
+
+        """
+        return json.dumps({prod: os.path.getmtime(tar) for prod, tar in self.ard_info.lookup[scene].items()
+                           if os.path.exists(tar)}, sort_keys=True)
+
+    def load(self, scene: str) -> dict:
+        """
+        Return the statistics of a scene, read from its sidecar file the first time
+
+        """
+        with self.lock:
+            if scene not in self.stats:
+                try:
+                    with np.load(self.stats_file(scene)) as f:
+                        stats = {key: f[key] for key in f.files}
+
+                    if str(stats.pop("stamp")) != self.stamp(scene):
+                        stats = dict()
+
+                except (IOError, KeyError, ValueError):
+                    stats = dict()
+
+                self.stats[scene] = stats
+
+            return self.stats[scene]
+
+    def save(self, scene: str):
+        """
+        Write the statistics of a scene, replacing its previous sidecar file in one step
+
+        """
+        out_file = self.stats_file(scene)
+
+        temp = out_file + ".tmp.npz"
+
+        with self.lock:
+            # The histograms are mostly empty bins and compress to a few kilobytes
+            np.savez_compressed(temp, stamp=self.stamp(scene), **self.stats[scene])
+
+            os.replace(temp, out_file)
+
+    def read_sample(self, scene: str, num: int):
+        """
+        Read the full tile of a band at OVERVIEW_LEVEL
+
+        Args:
+            scene: The scene ID
+            num: Index of the band in ARDInfo.vsipaths
+
+        Returns:
+            Array of the band values
+
+        """
+        paths = self.ard_info.vsipaths[scene]
+
+        overview_files = self.overviews.get_paths(scene) if self.overviews else None
+
+        path, scale = (overview_files[num], OVERVIEW_LEVEL) if overview_files else (paths[num], 1)
+
+        width, height = raster_window.raster_size(paths[num])
+
+        window = raster_window.Window(xoff=0, yoff=0, xsize=width, ysize=height, level=OVERVIEW_LEVEL)
+
+        return raster_window.read_window(path, window, scale=scale)
+
+    def scene_hist(self, scene: str, num: int, sensor: str):
+        """
+        Return the (PIXELQA class, value) histogram of a band of a scene, computing it the first time
+
+        Args:
+            scene: The scene ID
+            num: Index of the band in ARDInfo.vsipaths
+            sensor: The scene's sensor
+
+        Returns:
+            Array of shape (3, 65536)
+
+        """
+        stats = self.load(scene)
+
+        key = "band_{}".format(num)
+
+        if key not in stats:
+            hist = Rescale(sensor, self.read_sample(scene, num), self.read_sample(scene, QA_NUM)).hist
+
+            with self.lock:
+                stats[key] = hist.astype(np.uint32)
+
+                self.save(scene)
+
+        return stats[key]
+
+    def scene_limits(self, scene: str, name: str, func, args: dict, sensor: str):
+        """
+        Return the stretch of an index of a scene, computing it the first time
+
+        Args:
+            scene: The scene ID
+            name: The index name
+            func: The index function from plot_functions
+            args: The index function's arguments mapped to indices of the bands in ARDInfo.vsipaths
+            sensor: The scene's sensor
+
+        Returns:
+            Array of (lower limit, upper limit, low, high) as passed to Rescale
+
+        """
+        stats = self.load(scene)
+
+        key = "index_{}".format(name)
+
+        if key not in stats:
+            index = func(**{arg: self.read_sample(scene, num).astype(np.float64) for arg, num in args.items()})
+
+            rescale = Rescale(sensor, index, self.read_sample(scene, QA_NUM))
+
+            with self.lock:
+                stats[key] = np.array(list(rescale.limits) + list(rescale.range), dtype=np.float64)
+
+                self.save(scene)
+
+        return stats[key]
+
+    def aggregate(self, key: str, combine):
+        """
+        Return the statistic of every scene that has it combined into one for the tile, recombined when more scenes
+        have it
+
+        Args:
+            key: The statistic's name in the sidecar files
+            combine: Function combining the list of per-scene arrays
+
+        Returns:
+            Tuple of (number of scenes, array)
+
+        """
+        arrays = [stats[key] for stats in (self.load(scene) for scene in self.ard_info.scene_ids) if key in stats]
+
+        with self.lock:
+            if key not in self.tile_stats or self.tile_stats[key][0] != len(arrays):
+                self.tile_stats[key] = (len(arrays), combine(arrays))
+
+            return self.tile_stats[key]
+
+    def get_hist(self, scene: str, num: int, sensor: str):
+        """
+        Return the histogram to stretch a band of a scene with in the current mode
+
+        """
+        hist = self.scene_hist(scene, num, sensor)
+
+        if self.mode != "tile":
+            return hist
+
+        return self.aggregate("band_{}".format(num), lambda arrays: np.sum(arrays, axis=0, dtype=np.int64))[1]
+
+    def get_limits(self, scene: str, name: str, func, args: dict, sensor: str):
+        """
+        Return the stretch of an index of a scene in the current mode
+
+        """
+        limits = self.scene_limits(scene, name, func, args, sensor)
+
+        if self.mode != "tile":
+            return limits
+
+        return self.aggregate("index_{}".format(name), lambda arrays: np.median(arrays, axis=0))[1]
+
+    def revision(self, key: str):
+        """
+        Return what the statistic used for a key currently depends on, for keys of images made with it
+
+        """
+        if self.mode != "tile":
+            return self.mode
+
+        return self.mode, self.tile_stats.get(key, (0, None))[0]
+
+    def coverage(self, key: str):
+        """
+        Return how many of the tile's scenes the tile-wide statistic of a key was last combined from
+
+        Returns:
+            Tuple of (number of scenes, number of scenes in the tile)
+
+        """
+        return self.tile_stats.get(key, (0, None))[0], len(self.ard_info.scene_ids)
+
+    def build(self, nums=range(QA_NUM), sensor_of=None):
+        """
+        Compute the band histograms of every scene that doesn't have them yet
+
+        Args:
+            nums: Indices of the bands in ARDInfo.vsipaths
+            sensor_of: Function returning the sensor of a scene ID, defaults to ARDInfo.get_sensor
+
+        Returns:
+            dict of scene ID: error message for the scenes that failed
+
+        """
+        sensor_of = sensor_of if sensor_of is not None else self.ard_info.get_sensor
+
+        errors = dict()
+
+        for scene in self.ard_info.scene_ids:
+            try:
+                for num in nums:
+                    self.scene_hist(scene, num, sensor_of(scene))
+
+            except (AttributeError, IndexError, RuntimeError):
+                errors[scene] = str(sys.exc_info()[1])
+
+        return errors
+
+
+def main():
+    from lcmap_tap.RetrieveData.ard_info import ARDInfo
+    from lcmap_tap.RetrieveData.overview_cache import OverviewCache
+
+    parser = argparse.ArgumentParser(description="Compute the stretch statistics of a tile's ARD scenes for the TAP "
+                                                 "tool's image viewer")
+
+    parser.add_argument("ard_dir", help="Full path to the directory containing the tile's ARD tarballs")
+
+    args = parser.parse_args()
+
+    ard_info = ARDInfo(args.ard_dir, "", "")
+
+    errors = StretchStats(ard_info, overviews=OverviewCache(ard_info)).build()
+
+    for scene, message in errors.items():
+        print("{}: {}".format(scene, message))
+
+
+if __name__ == "__main__":
+    main()
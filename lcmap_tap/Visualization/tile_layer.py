@@ -0,0 +1,134 @@
+"""A QGraphicsItem that draws a large image from fixed-size tiles at several zoom levels.  Only the tiles that
+intersect the exposed part of the view are made and turned into pixmaps, at the level matching the current scale, so
+zooming and panning over a 5000x5000 raster only touches a screenful of pixels and the tiles held in memory are
+bounded by TILE_CACHE.  The item is used in place of a QGraphicsPixmapItem by the image viewers and offers the same
+setPixmap/pixmap calls, taking a QImage as well as a QPixmap so a large image never has to become one pixmap."""
+
+import math
+import os
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from lcmap_tap.Auxiliary.lru_cache import LRUCache
+
+# <int> Width and height of the tiles in pixels of their level
+TILE_SIZE = 256
+
+# <int> Memory budget in MB for the tiles, can be set with the LCMAP_TAP_TILE_CACHE_MB env. variable or changed at
+# runtime with TILE_CACHE.resize()
+TILE_CACHE_MB = int(os.environ.get("LCMAP_TAP_TILE_CACHE_MB", 128))
+
+# <LRUCache> Process-wide cache of the tile pixmaps keyed by (image cacheKey, level, column, row), an image shown
+# again, e.g. from the viewer's image cache or after a resize, reuses its tiles
+TILE_CACHE = LRUCache(max_bytes=TILE_CACHE_MB * 2 ** 20)
+
+
+class TiledPixmapItem(QtWidgets.QGraphicsItem):
+    def __init__(self, parent=None):
+        super(TiledPixmapItem, self).__init__(parent)
+
+        self._pixmap = QtGui.QPixmap()
+
+        # The exposed rect is needed to draw only the visible tiles
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+    def pixmap(self):
+        """
+        Return the displayed QPixmap or QImage
+
+        """
+        return self._pixmap
+
+    def setPixmap(self, pixmap):
+        """
+        Show a new image, the tiles of the previous one are left to age out of TILE_CACHE
+
+        Args:
+            pixmap: <QPixmap> or <QImage>
+
+        """
+        self.prepareGeometryChange()
+
+        self._pixmap = pixmap if pixmap is not None else QtGui.QPixmap()
+
+        self.update()
+
+    def boundingRect(self) -> QtCore.QRectF:
+        return QtCore.QRectF(self._pixmap.rect())
+
+    @staticmethod
+    def get_level(lod: float) -> int:
+        """
+        Return the level, a power of 2, at which a tile pixel covers about one screen pixel
+
+        Args:
+            lod: Screen pixels per image pixel
+
+        Returns:
+            The level, 1 for full resolution
+
+        """
+        if lod <= 0 or lod >= 1:
+            return 1
+
+        return 2 ** int(math.floor(math.log2(1 / lod)))
+
+    def tile_rect(self, level: int, col: int, row: int) -> QtCore.QRect:
+        """
+        Return the part of the image a tile is made from
+
+        """
+        span = TILE_SIZE * level
+
+        return QtCore.QRect(col * span, row * span, span, span).intersected(self._pixmap.rect())
+
+    def get_tile(self, level: int, col: int, row: int) -> QtGui.QPixmap:
+        """
+        Return a tile, made from the image the first time it is drawn
+
+        Args:
+            level: The decimation level
+            col: The tile column at that level
+            row: The tile row at that level
+
+        Returns:
+            <QPixmap> Of at most TILE_SIZE x TILE_SIZE pixels
+
+        """
+        key = (self._pixmap.cacheKey(), level, col, row)
+
+        tile = TILE_CACHE.get(key)
+
+        if tile is None:
+            source = self.tile_rect(level, col, row)
+
+            tile = self._pixmap.copy(source)
+
+            if level > 1:
+                # Nearest neighbour, like the untiled pixmap, so class colors of the maps aren't blended
+                tile = tile.scaled(int(math.ceil(source.width() / level)), int(math.ceil(source.height() / level)),
+                                   QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.FastTransformation)
+
+            if isinstance(tile, QtGui.QImage):
+                tile = QtGui.QPixmap.fromImage(tile)
+
+            TILE_CACHE.put(key, tile, nbytes=tile.width() * tile.height() * 4)
+
+        return tile
+
+    def paint(self, painter: QtGui.QPainter, option: QtWidgets.QStyleOptionGraphicsItem, widget=None):
+        if self._pixmap.isNull():
+            return None
+
+        level = self.get_level(option.levelOfDetailFromTransform(painter.worldTransform()))
+
+        span = TILE_SIZE * level
+
+        exposed = option.exposedRect.intersected(self.boundingRect())
+
+        for row in range(int(exposed.top() // span), int(math.ceil(exposed.bottom() / span))):
+            for col in range(int(exposed.left() // span), int(math.ceil(exposed.right() / span))):
+                tile = self.get_tile(level, col, row)
+
+                # Draw the tile over the part of the image it was made from
+                painter.drawPixmap(QtCore.QRectF(self.tile_rect(level, col, row)), tile, QtCore.QRectF(tile.rect()))
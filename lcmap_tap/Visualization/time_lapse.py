@@ -0,0 +1,212 @@
+"""Chips of every ARD scene around a pixel, for playing the scenes back as a time-lapse.  The chips are read with
+parallel windowed reads into a ring buffer of frames that runs ahead of the displayed one: as playback moves on, the
+slot of the frame just shown is reused for the next scene beyond the buffer, so memory stays at a fixed number of
+frames however many scenes the tile has.  Frames whose share of clear pixels is below a threshold can be skipped."""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lcmap_tap.RetrieveData import pixel_qa
+from lcmap_tap.RetrieveData.ard_extract import open_dataset
+from lcmap_tap.RetrieveData.ard_info import QA_NUM
+from lcmap_tap.Visualization import raster_window
+from lcmap_tap.Visualization.rescale import Rescale
+
+# <float> Frames per second of the playback, can be set with the LCMAP_TAP_PLAYBACK_FPS env. variable
+PLAYBACK_FPS = float(os.environ.get("LCMAP_TAP_PLAYBACK_FPS", 4))
+
+# <float> Frames with a smaller fraction of clear pixels are skipped, can be set with the LCMAP_TAP_PLAYBACK_MIN_CLEAR
+# env. variable, 0 shows every scene
+PLAYBACK_MIN_CLEAR = float(os.environ.get("LCMAP_TAP_PLAYBACK_MIN_CLEAR", 0))
+
+
+class ChipCube:
+    def __init__(self, ard_info, row: int, col: int, nums, size: int = 256, capacity: int = 32, workers: int = 8,
+                 min_clear: float = PLAYBACK_MIN_CLEAR):
+        """
+        Args:
+            ard_info: <ARDInfo> The tile's ARD scenes
+            row: Row of the pixel the chips are centered on
+            col: Column of the pixel the chips are centered on
+            nums: Indices in ARDInfo.vsipaths of the R, G and B bands
+            size: Width and height of the chips
+            capacity: Number of frames held in the ring buffer
+            workers: Number of reader threads
+            min_clear: Frames with a smaller fraction of clear pixels are skipped
+
+        """
+        self.ard_info = ard_info
+
+        self.nums = list(nums)
+
+        self.min_clear = min_clear
+
+        # <list> Scene IDs in acquisition date order
+        self.scenes = [str(ard_info.date_index.scene_ids[i]) for i in ard_info.date_index.order]
+
+        width, height = raster_window.raster_size(ard_info.vsipaths[self.scenes[0]][QA_NUM])
+
+        xsize, ysize = min(size, width), min(size, height)
+
+        # The chip is shifted inside the tile near its edges
+        self.window = raster_window.Window(xoff=min(max(0, col - xsize // 2), width - xsize),
+                                           yoff=min(max(0, row - ysize // 2), height - ysize),
+                                           xsize=xsize, ysize=ysize, level=1)
+
+        self.capacity = capacity
+
+        # <ndarray> The ring buffer, frame step is held in slot step % capacity
+        self.frames = np.zeros((capacity, ysize, xsize, 3), dtype=np.uint8)
+
+        # <list> The step held in each slot, -1 while it is empty or being read
+        self.slots = [-1] * capacity
+
+        # <dict> Fraction of clear pixels of each scene read so far
+        self.clear = dict()
+
+        # <dict> The reads in progress, {step: future}
+        self.pending = dict()
+
+        # <int> The step of the displayed frame, steps keep counting when playback loops back to the first scene
+        self.step = -1
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.lock = threading.Lock()
+
+    def seek(self, scene: str):
+        """
+        Start playback at a scene
+
+        """
+        with self.lock:
+            self.step = (self.scenes.index(scene) if scene in self.scenes else 0) - 1
+
+        self.fill()
+
+    def scene(self, step: int) -> str:
+        return self.scenes[step % len(self.scenes)]
+
+    def read_chip(self, scene: str):
+        """
+        Read and stretch the chip of one scene, run in a reader thread
+
+        Returns:
+            Tuple of (RGB array, fraction of clear pixels)
+
+        """
+        w = self.window
+
+        def read(num):
+            ds = open_dataset(self.ard_info.vsipaths[scene][num])
+
+            return ds.GetRasterBand(1).ReadAsArray(w.xoff, w.yoff, w.xsize, w.ysize)
+
+        qa = read(QA_NUM)
+
+        sensor = self.ard_info.get_sensor(scene)
+
+        rgb = np.dstack([Rescale(sensor=sensor, array=read(num), qa=qa).rescaled for num in self.nums])
+
+        valid = pixel_qa.get_mask(qa, pixel_qa.FILL, sensor=sensor, invert=True)
+
+        clear = pixel_qa.get_mask(qa, pixel_qa.CLEAR, sensor=sensor)
+
+        return rgb, clear.sum() / max(1, valid.sum())
+
+    def skipped(self, step: int) -> bool:
+        """
+        Check whether the scene of a step is known to be too cloudy to show, or couldn't be read
+
+        """
+        return self.clear.get(self.scene(step), 1.0) < self.min_clear
+
+    def load(self, step: int):
+        """
+        Read a frame into its slot of the ring buffer, run in a reader thread
+
+        """
+        scene = self.scene(step)
+
+        try:
+            rgb, clear = self.read_chip(scene)
+
+        except (AttributeError, IndexError, RuntimeError):
+            print("Couldn't read the chip of {}: {}".format(scene, sys.exc_info()[1]))
+
+            # Always skipped
+            rgb, clear = None, -1.0
+
+        with self.lock:
+            self.pending.pop(step, None)
+
+            self.clear[scene] = clear
+
+            # Playback may have moved past the frame while it was read
+            if rgb is not None and self.step < step < self.step + self.capacity:
+                self.frames[step % self.capacity] = rgb
+
+                self.slots[step % self.capacity] = step
+
+    def fill(self):
+        """
+        Start reading the frames after the displayed one that aren't in the ring buffer yet, closest first.  Scenes
+        already known to be skipped aren't read again.
+
+        """
+        with self.lock:
+            for step in range(self.step + 1, self.step + self.capacity):
+                if self.slots[step % self.capacity] != step and step not in self.pending and not self.skipped(step):
+                    self.pending[step] = self.executor.submit(self.load, step)
+
+    def next_frame(self):
+        """
+        Move to the next frame, skipping scenes that aren't clear enough
+
+        Returns:
+            Tuple of (scene ID, RGB array) or None if the next frame isn't read yet
+
+        """
+        frame = None
+
+        with self.lock:
+            last = self.step + self.capacity - 1
+
+            step = self.step + 1
+
+            # Pass over the scenes known to be too cloudy, as far as they have been read, and free their slots
+            while step <= last and self.skipped(step):
+                self.slots[step % self.capacity] = -1
+
+                step += 1
+
+            # Playback moves past the skipped scenes even while the next frame is still being read, so the scenes
+            # beyond the buffer get read
+            self.step = step - 1
+
+            if step <= last and self.slots[step % self.capacity] == step:
+                self.step = step
+
+                frame = np.copy(self.frames[step % self.capacity])
+
+        # Reuse the slots of the frames passed over for the scenes beyond the buffer
+        self.fill()
+
+        return (self.scene(step), frame) if frame is not None else None
+
+    def stop(self):
+        """
+        Cancel the outstanding reads and release the reader threads
+
+        """
+        with self.lock:
+            for future in self.pending.values():
+                future.cancel()
+
+            self.pending = dict()
+
+        self.executor.shutdown(wait=False)
@@ -21,7 +21,10 @@ setup(
         'gdal'
     ],
 
-    entry_points={'gui_scripts': ['lcmap_tap = lcmap_tap.__main__:main']},
+    entry_points={'gui_scripts': ['lcmap_tap = lcmap_tap.__main__:main'],
+                  'console_scripts': ['lcmap_tap_extract = lcmap_tap.RetrieveData.batch_extract:main',
+                                      'lcmap_tap_overviews = lcmap_tap.RetrieveData.overview_cache:main',
+                                      'lcmap_tap_mmap = lcmap_tap.RetrieveData.mmap_cache:main']},
 
     dependency_links=['https://github.com/conda-forge/gdal-feedstock/'],
 
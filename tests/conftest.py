@@ -0,0 +1,18 @@
+"""Shared fixtures of the lcmap_tap tests"""
+
+import pytest
+
+from lcmap_tap.Auxiliary import caching
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    """
+    Keep the caches built by the tests out of the user's cache directory
+
+    """
+    root = tmp_path / "cache"
+
+    monkeypatch.setattr(caching, "CACHE_ROOT", str(root))
+
+    return root
@@ -0,0 +1,43 @@
+"""Bulk parsing of the scene ID dates against strptime"""
+
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex, parse_dates
+
+SCENE_IDS = ["LC08_CU_005002_20130412_20181024_C01_V01",
+             "LE07_CU_005002_19991231_20181024_C01_V01",
+             "LT05_CU_005002_19840229_20181024_C01_V01",
+             "LE07_CU_005002_20130412_20181024_C01_V01",
+             "LT04_CU_005002_19821101_20181024_C01_V01"]
+
+
+def test_parse_dates_matches_strptime():
+    expected = [dt.datetime.strptime(s[15:23], "%Y%m%d").toordinal() for s in SCENE_IDS]
+
+    np.testing.assert_array_equal(parse_dates(SCENE_IDS), expected)
+
+    assert parse_dates(list()).size == 0
+
+
+@pytest.mark.parametrize("scene_id", ["LC08_CU_005002_20130229_20181024_C01_V01",
+                                      "LC08_CU_005002_2013041X_20181024_C01_V01"])
+def test_parse_dates_rejects_bad_dates(scene_id):
+    with pytest.raises(ValueError):
+        parse_dates([scene_id])
+
+
+def test_index_lookups():
+    index = SceneDateIndex(SCENE_IDS)
+
+    assert list(index.positions(dt.date(2013, 4, 12))) == [0, 3]
+
+    assert index.find(dt.date(2013, 4, 12)) == SCENE_IDS[0]
+
+    assert index.find(dt.date(2013, 4, 13)) is None
+
+    assert index.nearest(dt.date(1999, 6, 1)) == SCENE_IDS[1]
+
+    assert [str(s) for s in index.scene_ids[index.order]] == [SCENE_IDS[i] for i in (4, 2, 1, 0, 3)]
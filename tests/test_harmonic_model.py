@@ -0,0 +1,92 @@
+"""The batched harmonic model evaluation against the per-band predicts formula"""
+
+import numpy as np
+import pytest
+
+from lcmap_tap.RetrieveData import harmonic_model
+
+BANDS = ("blue", "green", "red", "nir", "swir1", "swir2", "thermal")
+
+
+def predicts(days, coef, intercept):
+    """
+    The per-band model as CCDReader.predicts evaluates it
+
+    """
+    return (intercept + coef[0] * days +
+            coef[1] * np.cos(days * 1 * 2 * np.pi / 365.25) + coef[2] * np.sin(days * 1 * 2 * np.pi / 365.25) +
+            coef[3] * np.cos(days * 2 * 2 * np.pi / 365.25) + coef[4] * np.sin(days * 2 * 2 * np.pi / 365.25) +
+            coef[5] * np.cos(days * 3 * 2 * np.pi / 365.25) + coef[6] * np.sin(days * 3 * 2 * np.pi / 365.25))
+
+
+@pytest.fixture
+def change_models():
+    rng = np.random.RandomState(0)
+
+    models = list()
+
+    for start_day, end_day in ((724000, 726500), (726501, 726501), (727000, 730000)):
+        model = {"start_day": start_day, "end_day": end_day}
+
+        for band in BANDS:
+            model[band] = {"intercept": rng.uniform(-5e4, 5e4),
+                           "coefficients": list(np.append(rng.uniform(-0.1, 0.1, 1), rng.uniform(-500, 500, 6)))}
+
+        models.append(model)
+
+    return models
+
+
+def test_evaluate_matches_predicts(change_models):
+    predictions = harmonic_model.evaluate(change_models, BANDS)
+
+    slices = harmonic_model.segment_slices(predictions, len(change_models))
+
+    for m, model in enumerate(change_models):
+        records = predictions[slices[m]]
+
+        days = np.arange(model["start_day"], model["end_day"] + 1)
+
+        np.testing.assert_array_equal(records["segment"], m)
+
+        np.testing.assert_array_equal(records["date"], days)
+
+        for band in BANDS:
+            np.testing.assert_allclose(records[band],
+                                       predicts(days, model[band]["coefficients"], model[band]["intercept"]),
+                                       rtol=1e-9, atol=1e-6)
+
+
+def test_evaluate_dates_matches_predicts(change_models):
+    days = np.arange(725000, 729000, 16)
+
+    values = harmonic_model.evaluate_dates(days, harmonic_model.model_coefficients(change_models, BANDS))
+
+    assert values.shape == (len(change_models), days.size, len(BANDS))
+
+    for m, model in enumerate(change_models):
+        for b, band in enumerate(BANDS):
+            np.testing.assert_allclose(values[m, :, b],
+                                       predicts(days, model[band]["coefficients"], model[band]["intercept"]),
+                                       rtol=1e-9, atol=1e-6)
+
+
+def test_no_models():
+    predictions = harmonic_model.evaluate(list(), BANDS)
+
+    assert predictions.size == 0
+
+    assert harmonic_model.segment_slices(predictions, 0) == list()
+
+
+def test_ccdreader_predicts(change_models):
+    pytest.importorskip("osgeo")
+
+    from lcmap_tap.RetrieveData.retrieve_data import CCDReader
+
+    days = np.arange(724000, 726500)
+
+    model = change_models[0]
+
+    np.testing.assert_array_equal(CCDReader.predicts(days, model["red"]["coefficients"], model["red"]["intercept"]),
+                                  predicts(days, model["red"]["coefficients"], model["red"]["intercept"]))
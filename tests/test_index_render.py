@@ -0,0 +1,97 @@
+"""The float32 index quantization and colormap lookup against the float64 Rescale rendering they replaced"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+pytest.importorskip("PyQt5")
+
+from lcmap_tap.Plotting import plot_functions  # noqa: E402
+from lcmap_tap.Visualization import index_render  # noqa: E402
+from lcmap_tap.Visualization.rescale import Rescale  # noqa: E402
+
+
+@pytest.fixture
+def scene():
+    rng = np.random.RandomState(0)
+
+    shape = (300, 200)
+
+    qa = rng.choice([1, 322, 324, 328, 352, 480], size=shape).astype(np.uint16)
+
+    bands = {"R": rng.randint(0, 3000, size=shape).astype(np.int16),
+             "NIR": rng.randint(1000, 6000, size=shape).astype(np.int16)}
+
+    for band in bands.values():
+        band[qa == 1] = -9999
+
+    return bands, qa
+
+
+def legacy_codes(bands, qa, limits=None):
+    """
+    The index as the viewer stretched it before the lookup table rendering, in float64 through Rescale
+
+    """
+    index = plot_functions.ndvi(**{arg: array.astype(np.float64) for arg, array in bands.items()})
+
+    return Rescale(sensor="LC08", array=index, qa=qa, limits=limits).rescaled
+
+
+def test_limits_match_rescale(scene):
+    bands, qa = scene
+
+    index = plot_functions.ndvi(**{arg: array.astype(np.float64) for arg, array in bands.items()})
+
+    rescale = Rescale(sensor="LC08", array=index, qa=qa)
+
+    limits = index_render.get_limits(index, qa, "LC08")
+
+    np.testing.assert_allclose(limits, list(rescale.limits) + list(rescale.range))
+
+
+@pytest.mark.parametrize("shared", [False, True])
+def test_codes_match_rescale(scene, shared):
+    bands, qa = scene
+
+    # Scene-wide limits, as the stretch statistics give them
+    limits = np.array([-0.2, 0.6, -0.1, 0.5]) if shared else None
+
+    index = index_render.calc_index(plot_functions.ndvi, bands)
+
+    codes = index_render.quantize(index, qa, "LC08", limits if shared else index_render.get_limits(index, qa, "LC08"))
+
+    expected = legacy_codes(bands, qa, limits=limits)
+
+    assert np.abs(codes.astype(np.int32) - expected).max() <= 1
+
+    assert np.mean(codes != expected) < 0.01
+
+    assert not codes[qa == 1].any()
+
+
+def test_gray_colormap_matches_grayscale(scene):
+    bands, qa = scene
+
+    img = index_render.render_index(("test", "gray"), plot_functions.ndvi, bands, qa, "LC08", cmap="gray")
+
+    argb = img.ndarray
+
+    rgb = np.dstack([(argb >> shift) & 0xFF for shift in (16, 8, 0)])
+
+    expected = np.repeat(legacy_codes(bands, qa)[:, :, np.newaxis], 3, axis=2)
+
+    assert (argb >> 24 == 0xFF).all()
+
+    assert np.abs(rgb.astype(np.int32) - expected).max() <= 1
+
+
+@pytest.mark.parametrize("cmap", ["gray", "RdYlGn", "viridis"])
+def test_colormap_lut(cmap):
+    import matplotlib
+
+    rgba = (matplotlib.colormaps[cmap](np.arange(256)) * 255 + 0.5).astype(np.uint32)
+
+    lut = index_render.colormap_lut(cmap)
+
+    np.testing.assert_array_equal(np.stack([(lut >> shift) & 0xFF for shift in (16, 8, 0, 24)], axis=1), rgba)
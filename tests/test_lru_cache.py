@@ -0,0 +1,102 @@
+"""Budget and eviction order of the byte-budgeted LRUCache"""
+
+import numpy as np
+
+from lcmap_tap.Auxiliary.lru_cache import LRUCache, estimate_nbytes
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(max_bytes=300)
+
+    for key in "abc":
+        cache.put(key, key, nbytes=100)
+
+    # "a" becomes the most recently used
+    assert cache.get("a") == "a"
+
+    cache.put("d", "d", nbytes=100)
+
+    assert "b" not in cache
+
+    assert [key in cache for key in "acd"] == [True, True, True]
+
+    assert cache.nbytes == 300
+
+
+def test_value_larger_than_budget_is_not_cached():
+    cache = LRUCache(max_bytes=100)
+
+    cache.put("a", "a", nbytes=50)
+
+    cache.put("b", "b", nbytes=101)
+
+    assert "b" not in cache
+
+    assert cache.get("a") == "a"
+
+    assert cache.nbytes == 50
+
+
+def test_put_replaces_value():
+    cache = LRUCache(max_bytes=100)
+
+    cache.put("a", 1, nbytes=60)
+
+    cache.put("a", 2, nbytes=30)
+
+    assert cache.get("a") == 2
+
+    assert (len(cache), cache.nbytes) == (1, 30)
+
+
+def test_update_resizes_and_evicts():
+    cache = LRUCache(max_bytes=300)
+
+    for key in "abc":
+        cache.put(key, key, nbytes=100)
+
+    # Growing an item keeps its place in the order and evicts the older ones
+    cache.update("c", nbytes=250)
+
+    assert "c" in cache
+
+    assert "a" not in cache and "b" not in cache
+
+    assert cache.nbytes == 250
+
+    cache.update("missing", nbytes=1000)
+
+    assert cache.nbytes == 250
+
+
+def test_hits_and_misses():
+    cache = LRUCache(max_bytes=100)
+
+    cache.put("a", 1, nbytes=1)
+
+    cache.get("a")
+
+    cache.get("b")
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.clear()
+
+    assert (len(cache), cache.nbytes, cache.hits, cache.misses) == (0, 0, 0, 0)
+
+
+def test_estimate_nbytes():
+    array = np.zeros(1000, dtype=np.float64)
+
+    assert estimate_nbytes(array) == 8000
+
+    # A shared array is counted once
+    assert 16000 > estimate_nbytes({"a": array, "b": [array, array]}) > 8000
+
+    class Holder:
+        def __init__(self):
+            self.array = array
+
+            self.holder = self
+
+    assert estimate_nbytes(Holder()) > 8000
@@ -0,0 +1,95 @@
+"""Round trip of the YATSM cache rows through the pixel-major MmapCache files"""
+
+import os
+
+import numpy as np
+
+from lcmap_tap.RetrieveData import mmap_cache
+from lcmap_tap.RetrieveData.mmap_cache import MmapCache, get_row
+
+IMAGE_IDS = ["LC08_CU_005002_2013{:04d}_20181024_C01_V01".format(101 + day) for day in range(10)]
+
+
+def write_row(cache_dir, row, seed=0):
+    """
+    Write a YATSM row file of (bands, observations, columns) values
+
+    """
+    values = np.random.RandomState(seed).randint(-100, 10000, size=(8, len(IMAGE_IDS), 20)).astype(np.int16)
+
+    file = os.path.join(str(cache_dir), "yatsm_r{}_n{}_b8.npy.npz".format(row, len(IMAGE_IDS)))
+
+    np.savez(file, Y=values, image_IDs=np.array(IMAGE_IDS))
+
+    return file, values
+
+
+def wait_for_conversions():
+    # The converter runs one task at a time in submission order
+    mmap_cache._converter.submit(lambda: None).result()
+
+
+def test_get_row():
+    assert get_row("/data/yatsm_r123_n2049_b8.npy.npz") == 123
+
+    assert get_row("image_IDs.txt") is None
+
+
+def test_round_trip(tmp_path):
+    file, values = write_row(tmp_path, 5)
+
+    cache = MmapCache(str(tmp_path), out_dir=str(tmp_path / "out"))
+
+    os.makedirs(cache.out_dir)
+
+    cache.convert()
+
+    for column in (0, 7, 19):
+        pixel, ids = cache.load_pixel(5, column)
+
+        assert pixel.dtype == values.dtype
+
+        np.testing.assert_array_equal(pixel, values[:, :, column])
+
+        assert list(ids) == IMAGE_IDS
+
+
+def test_stale_row_is_converted_again(tmp_path):
+    file, _ = write_row(tmp_path, 5)
+
+    cache = MmapCache(str(tmp_path))
+
+    cache.convert_file(file)
+
+    assert cache.is_current(5, file)
+
+    file, values = write_row(tmp_path, 5, seed=1)
+
+    # The converted row predates the new YATSM file
+    mtime = os.path.getmtime(file) - 10
+
+    os.utime(cache.data_file(5), (mtime, mtime))
+
+    assert not cache.is_current(5, file)
+
+    cache.convert_file(file)
+
+    assert cache.is_current(5, file)
+
+    np.testing.assert_array_equal(cache.load_pixel(5, 3)[0], values[:, :, 3])
+
+
+def test_convert_later(tmp_path):
+    file, values = write_row(tmp_path, 7)
+
+    cache = MmapCache(str(tmp_path))
+
+    cache.convert_later(file)
+
+    wait_for_conversions()
+
+    assert cache.is_current(7, file)
+
+    np.testing.assert_array_equal(cache.load_pixel(7, 0)[0], values[:, :, 0])
+
+    assert not [f for f in os.listdir(cache.out_dir) if ".tmp" in f]
@@ -0,0 +1,71 @@
+"""The PIXELQA lookup tables against bit by bit decoding and the value lists they replaced"""
+
+import numpy as np
+import pytest
+
+from lcmap_tap.RetrieveData import pixel_qa
+
+ALL_VALUES = np.arange(pixel_qa.NUM_VALUES)
+
+
+def reference_flags(value: int, sensor) -> int:
+    """
+    Decode one PIXELQA value with plain bit tests
+
+    """
+    def bit(num):
+        return (value >> num) & 1
+
+    flags = 0
+
+    for num, flag in ((0, pixel_qa.FILL), (2, pixel_qa.WATER), (3, pixel_qa.SHADOW), (4, pixel_qa.SNOW),
+                      (5, pixel_qa.CLOUD)):
+        if bit(num):
+            flags |= flag
+
+    # Low cirrus confidence and no terrain occlusion, or unused upper bits
+    oli = value >> 8 == 1
+
+    tm = value >> 8 == 0
+
+    layout = {"LC08": oli, "LE07": tm, None: oli or tm}[sensor]
+
+    if bit(1) != bit(2) and (value >> 6) & 3 == 1 and value & 0b111001 == 0 and layout:
+        flags |= pixel_qa.CLEAR
+
+    return flags
+
+
+@pytest.mark.parametrize("sensor", ["LC08", "LE07", None])
+def test_lut_matches_bit_tests(sensor):
+    expected = np.array([reference_flags(value, sensor) for value in range(pixel_qa.NUM_VALUES)], dtype=np.uint8)
+
+    np.testing.assert_array_equal(pixel_qa.get_lut(sensor), expected)
+
+
+@pytest.mark.parametrize("sensor, clear", [("LC08", [322, 324]), ("LT05", [66, 68]), ("LE07", [66, 68]),
+                                           (None, [66, 68, 322, 324])])
+def test_clear_values(sensor, clear):
+    # The clear values that were previously compared against
+    assert list(np.flatnonzero(pixel_qa.get_mask(ALL_VALUES, pixel_qa.CLEAR, sensor=sensor))) == clear
+
+
+def test_fill_value():
+    fill = pixel_qa.get_mask(ALL_VALUES, pixel_qa.FILL)
+
+    np.testing.assert_array_equal(fill, ALL_VALUES & 1 == 1)
+
+    # ARD marks fill with the value 1, which was previously compared against
+    assert fill[1] and not fill[[0, 66, 68, 322, 324]].any()
+
+
+def test_masks_of_signed_arrays():
+    qa = np.array([[1, 66], [322, -1]], dtype=np.int16)
+
+    np.testing.assert_array_equal(pixel_qa.get_mask(qa, pixel_qa.CLEAR, sensor="LT05"), [[False, True],
+                                                                                         [False, False]])
+
+    np.testing.assert_array_equal(pixel_qa.get_mask(qa, pixel_qa.FILL, invert=True), [[False, True], [True, False]])
+
+    np.testing.assert_array_equal(pixel_qa.get_flags(qa, sensor="LC08"),
+                                  pixel_qa.get_lut("LC08")[qa.view(np.uint16)])
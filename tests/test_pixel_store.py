@@ -0,0 +1,134 @@
+"""Round trip of the PyCCD results through the PixelStore chip data files"""
+
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from lcmap_tap.RetrieveData import pixel_store
+from lcmap_tap.RetrieveData.pixel_store import PixelStore
+
+Affine = namedtuple("Affine", ["ul_x", "x_res", "rot_1", "ul_y", "rot_2", "y_res"])
+
+RowColumn = namedtuple("RowColumn", ["row", "column"])
+
+AFFINE = Affine(ul_x=-2115585.0, x_res=30.0, rot_1=0.0, ul_y=2414805.0, rot_2=0.0, y_res=-30.0)
+
+# <list> Pixels of the chip at chip row 1, chip column 2, including its corners
+PIXELS = [(100, 200), (100, 299), (199, 200), (199, 299), (150, 250)]
+
+
+def result(row, col, version=1):
+    return {"change_models": [{"start_day": 724000 + row, "end_day": 730000 + col}],
+            "processing_mask": [version, row, col]}
+
+
+def write_chip_file(json_dir, pixels, version=1):
+    """
+    Write a chip JSON file the way PyCCD does, one record per pixel with the results as a JSON string
+
+    """
+    records = [{"x": AFFINE.ul_x + col * AFFINE.x_res,
+                "y": AFFINE.ul_y + row * AFFINE.y_res,
+                "result": json.dumps(result(row, col, version))} for row, col in pixels]
+
+    chip_file = os.path.join(str(json_dir), "H05V02_-2109585_2411805.json")
+
+    with open(chip_file, "w") as f:
+        json.dump(records, f)
+
+    return chip_file
+
+
+def test_round_trip(tmp_path):
+    chip_file = write_chip_file(tmp_path, PIXELS)
+
+    store = PixelStore(json_dir=str(tmp_path), tile="H05V02", affine=AFFINE)
+
+    store.build([chip_file])
+
+    for row, col in PIXELS:
+        assert store.get(RowColumn(row, col)) == result(row, col)
+
+    # A pixel of the chip without results, and a pixel of a chip that wasn't ingested
+    assert store.get(RowColumn(101, 201)) is None
+
+    assert store.get(RowColumn(0, 0)) is None
+
+
+def test_data_file_layout(tmp_path):
+    chip_file = write_chip_file(tmp_path, PIXELS)
+
+    store = PixelStore(json_dir=str(tmp_path), tile="H05V02", affine=AFFINE)
+
+    store.add_chip(chip_file)
+
+    with open(store.chip_file(1, 2), "rb") as f:
+        data = f.read()
+
+    assert data.startswith(pixel_store.MAGIC)
+
+    size = pixel_store.CHIP_SIZE
+
+    offsets = np.frombuffer(data, dtype="<i4", count=size * size, offset=len(pixel_store.MAGIC)).reshape(size, size)
+
+    assert np.count_nonzero(offsets) == len(PIXELS)
+
+    for row, col in PIXELS:
+        offset = int(offsets[row % size, col % size])
+
+        length, = pixel_store.RECORD_HEADER.unpack_from(data, offset)
+
+        start = offset + pixel_store.RECORD_HEADER.size
+
+        assert json.loads(data[start:start + length].decode("utf-8")) == result(row, col)
+
+
+def test_reingest_replaces_chip(tmp_path):
+    chip_file = write_chip_file(tmp_path, PIXELS)
+
+    store = PixelStore(json_dir=str(tmp_path), tile="H05V02", affine=AFFINE)
+
+    store.build([chip_file])
+
+    write_chip_file(tmp_path, PIXELS[1:], version=2)
+
+    mtime = os.path.getmtime(chip_file) + 10
+
+    os.utime(chip_file, (mtime, mtime))
+
+    assert not store.is_current(chip_file)
+
+    store.build([chip_file])
+
+    assert store.is_current(chip_file)
+
+    assert store.get(RowColumn(*PIXELS[0])) is None
+
+    for row, col in PIXELS[1:]:
+        assert store.get(RowColumn(row, col)) == result(row, col, version=2)
+
+    assert not [f for f in os.listdir(store.tile_dir) if f.endswith(".tmp")]
+
+
+def test_manifest_persists(tmp_path):
+    chip_file = write_chip_file(tmp_path, PIXELS)
+
+    PixelStore(json_dir=str(tmp_path), tile="H05V02", affine=AFFINE).build([chip_file])
+
+    store = PixelStore(json_dir=str(tmp_path), tile="H05V02", affine=AFFINE)
+
+    assert store.is_current(chip_file)
+
+    assert store.get(RowColumn(*PIXELS[-1])) == result(*PIXELS[-1])
+
+
+def test_get_store_is_shared(tmp_path, monkeypatch):
+    monkeypatch.setattr(pixel_store, "_stores", dict())
+
+    store = PixelStore.get_store(str(tmp_path), "H05V02", AFFINE)
+
+    assert PixelStore.get_store(str(tmp_path) + os.sep, "H05V02", AFFINE) is store
+
+    assert PixelStore.get_store(str(tmp_path), "H05V03", AFFINE) is not store
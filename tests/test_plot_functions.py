@@ -0,0 +1,57 @@
+"""Memoization of the LazyLookup behind CCDReader's band and index series"""
+
+from lcmap_tap.Plotting.plot_functions import LazyLookup
+
+
+def counting_lookup(keys, calls):
+    def func(key):
+        def calc():
+            calls.append(key)
+
+            return key * 2
+
+        return calc
+
+    return LazyLookup((key, func(key)) for key in keys)
+
+
+def test_values_are_calculated_once():
+    calls = list()
+
+    lookup = counting_lookup("ab", calls)
+
+    assert "a" in lookup and list(lookup) == ["a", "b"] and len(lookup) == 2
+
+    assert calls == list()
+
+    assert lookup["a"] == "aa" and lookup["a"] == "aa"
+
+    assert calls == ["a"]
+
+
+def test_on_memoize():
+    memoized = list()
+
+    lookup = counting_lookup("ab", list())
+
+    lookup.on_memoize = lambda key, value: memoized.append((key, value))
+
+    lookup["b"]
+
+    lookup["b"]
+
+    assert memoized == [("b", "bb")]
+
+
+def test_chain_memoizes_in_the_originals():
+    calls = list()
+
+    first, second = counting_lookup("a", calls), counting_lookup("b", calls)
+
+    chained = LazyLookup.chain(first, second)
+
+    assert list(chained) == ["a", "b"]
+
+    assert chained["b"] == "bb" and second["b"] == "bb"
+
+    assert calls == ["b"]
@@ -0,0 +1,80 @@
+"""Round trip of the saved ProductCatalog and its year lookups"""
+
+import os
+
+import pytest
+
+from lcmap_tap.RetrieveData import product_catalog
+from lcmap_tap.RetrieveData.product_catalog import ProductCatalog, get_years
+
+VERSIONS = ["v2017.8.18", "v2017.6.20-a"]
+
+
+@pytest.fixture
+def root_dir(tmp_path):
+    root = tmp_path / "eval"
+
+    for category in ("ChangeMaps", "CoverMaps"):
+        (root / VERSIONS[1] / category / "ChangeMap_color").mkdir(parents=True)
+
+    for year in (1999, 2000):
+        (root / VERSIONS[1] / "ChangeMaps" / "ChangeMap_color" / "H05V02_ChangeMap_color_{}.tif".format(year)).touch()
+
+    return str(root)
+
+
+def test_get_years():
+    assert get_years("/eval/H05V02_ChangeMap_color_1999.tif") == [1999]
+
+    assert get_years("H05V02_PrimaryLandCover_19992000.tif") == list()
+
+
+def test_lookups(root_dir):
+    catalog = ProductCatalog(root_dir, VERSIONS)
+
+    assert catalog.get_version() == VERSIONS[1]
+
+    directory = os.path.join(root_dir, VERSIONS[1], "ChangeMaps", "ChangeMap_color")
+
+    assert catalog.get_file(VERSIONS[1], "ChangeMaps", "ChangeMap_color", "1999") == \
+        os.path.join(directory, "H05V02_ChangeMap_color_1999.tif")
+
+    assert catalog.get_file(VERSIONS[1], "ChangeMaps", "ChangeMap_color", 2001) is None
+
+    assert catalog.get_files(VERSIONS[1], "CoverMaps", "Missing") == dict()
+
+
+def test_saved_catalog(root_dir, monkeypatch):
+    catalog = ProductCatalog(root_dir, VERSIONS)
+
+    files = catalog.get_files(VERSIONS[1], "ChangeMaps", "ChangeMap_color")
+
+    def fail(directory):
+        raise AssertionError("listed {} again".format(directory))
+
+    monkeypatch.setattr(product_catalog.os, "listdir", fail)
+
+    loaded = ProductCatalog(root_dir, VERSIONS)
+
+    assert loaded.catalog == catalog.catalog
+
+    assert loaded.get_files(VERSIONS[1], "ChangeMaps", "ChangeMap_color") == files
+
+    # A catalog saved for other versions isn't used
+    assert ProductCatalog(root_dir, VERSIONS[1:]).catalog["products"] == dict()
+
+
+def test_changed_directory_is_listed_again(root_dir):
+    catalog = ProductCatalog(root_dir, VERSIONS)
+
+    catalog.get_files(VERSIONS[1], "ChangeMaps", "ChangeMap_color")
+
+    directory = os.path.join(root_dir, VERSIONS[1], "ChangeMaps", "ChangeMap_color")
+
+    open(os.path.join(directory, "H05V02_ChangeMap_color_2001.tif"), "w").close()
+
+    mtime = os.path.getmtime(directory) + 10
+
+    os.utime(directory, (mtime, mtime))
+
+    assert 2001 in catalog.get_files(VERSIONS[1], "ChangeMaps", "ChangeMap_color")
@@ -0,0 +1,103 @@
+"""The histogram and lookup table stretch of Rescale against the percentile, clip and rescale steps it replaced"""
+
+import numpy as np
+import pytest
+
+from lcmap_tap.Visualization.rescale import Rescale, code_values, hist_percentile
+
+QA_VALUES = {"LC08": [1, 322, 324, 328, 352, 386, 480, 834, 898],
+             "LE07": [1, 66, 68, 72, 96, 130, 224]}
+
+
+def legacy_rescale(sensor, array, qa, lower_percentile=1, upper_percentile=99):
+    """
+    The stretch as Rescale made it before the histogram path, with masks from the PIXELQA value lists
+
+    """
+    mask_clear = np.isin(qa, [322, 324] if sensor == "LC08" else [66, 68])
+
+    mask_fill = qa != 1
+
+    mask = mask_clear if mask_clear.any() else mask_fill
+
+    limits = [np.percentile(array[mask], lower_percentile), np.percentile(array[mask], upper_percentile)]
+
+    # Clipping into an array of the input type truncates the limits toward zero
+    clipped = np.clip(array, limits[0], limits[1]).astype(array.dtype)
+
+    valid = clipped[mask_fill]
+
+    out_data = np.zeros_like(clipped, dtype=np.int32)
+
+    out_data[mask_fill] = (valid - np.min(valid)) * (255.0 - 1.0) / (np.max(valid) - np.min(valid))
+
+    return out_data
+
+
+def make_scene(sensor, dtype, seed=0, shape=(120, 90), clear=True):
+    rng = np.random.RandomState(seed)
+
+    values = QA_VALUES[sensor] if clear else [v for v in QA_VALUES[sensor] if v not in (66, 68, 322, 324)]
+
+    qa = rng.choice(values, size=shape).astype(np.uint16)
+
+    array = rng.normal(1500, 900, size=shape).clip(-500, 16000).astype(dtype)
+
+    array[qa == 1] = -9999 if np.dtype(dtype).kind == "i" else 0
+
+    return array, qa
+
+
+@pytest.mark.parametrize("sensor", ["LC08", "LE07"])
+@pytest.mark.parametrize("dtype", [np.int16, np.uint16])
+@pytest.mark.parametrize("clear", [True, False])
+def test_hist_stretch_matches_legacy(sensor, dtype, clear):
+    array, qa = make_scene(sensor, dtype, clear=clear)
+
+    rescaled = Rescale(sensor=sensor, array=array, qa=qa).rescaled
+
+    assert rescaled.dtype == np.uint8
+
+    np.testing.assert_array_equal(rescaled, legacy_rescale(sensor, array, qa))
+
+
+@pytest.mark.parametrize("percentiles", [(0, 100), (2.5, 97.5), (10, 90)])
+def test_hist_stretch_percentiles(percentiles):
+    array, qa = make_scene("LC08", np.int16, seed=1)
+
+    rescale = Rescale(sensor="LC08", array=array, qa=qa, lower_percentile=percentiles[0],
+                      upper_percentile=percentiles[1])
+
+    np.testing.assert_array_equal(rescale.rescaled, legacy_rescale("LC08", array, qa, *percentiles))
+
+
+def test_given_hist_matches_own():
+    array, qa = make_scene("LE07", np.int16, seed=2)
+
+    rescale = Rescale(sensor="LE07", array=array, qa=qa)
+
+    # A window stretched with the histogram of its whole scene
+    window = Rescale(sensor="LE07", array=array[10:50, 20:60], qa=qa[10:50, 20:60], hist=rescale.hist)
+
+    np.testing.assert_array_equal(window.rescaled, rescale.rescaled[10:50, 20:60])
+
+
+def test_float_stretch_matches_legacy():
+    array, qa = make_scene("LE07", np.float32, seed=3)
+
+    array /= 10000
+
+    np.testing.assert_array_equal(Rescale(sensor="LE07", array=array, qa=qa).rescaled,
+                                  legacy_rescale("LE07", array, qa))
+
+
+@pytest.mark.parametrize("dtype", [np.int16, np.uint16])
+def test_hist_percentile(dtype):
+    data = np.random.RandomState(4).randint(0, 3000, size=5001).astype(dtype)
+
+    values, order = code_values(dtype)
+
+    cumulative = np.cumsum(np.bincount(data.view(np.uint16), minlength=2 ** 16)[order])
+
+    for q in (0, 1, 2.5, 33.3, 50, 99, 100):
+        assert hist_percentile(values[order], cumulative, q) == pytest.approx(np.percentile(data, q), abs=1e-9)
@@ -0,0 +1,68 @@
+"""Round trip of the per-scene StretchStats sidecar files"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("osgeo")
+
+from lcmap_tap.Visualization.stretch_stats import StretchStats  # noqa: E402
+
+SCENE = "LC08_CU_005002_20130412_20181024_C01_V01"
+
+
+@pytest.fixture
+def ard_info(tmp_path):
+    tarballs = {prod: str(tmp_path / "{}_{}.tar".format(SCENE, prod)) for prod in ("SR", "BT", "QA")}
+
+    for tar in tarballs.values():
+        open(tar, "w").close()
+
+    return SimpleNamespace(root=str(tmp_path), lookup={SCENE: tarballs})
+
+
+def test_round_trip(ard_info, tmp_path):
+    stats = StretchStats(ard_info, cache_dir=str(tmp_path))
+
+    saved = {"hist_3": np.random.RandomState(0).randint(0, 50, size=(3, 2 ** 16)),
+             "limits_NDVI": np.array([-0.1, 0.8, -0.05, 0.75])}
+
+    stats.stats[SCENE] = dict(saved)
+
+    stats.save(SCENE)
+
+    loaded = StretchStats(ard_info, cache_dir=str(tmp_path)).load(SCENE)
+
+    assert sorted(loaded) == sorted(saved)
+
+    for key, value in saved.items():
+        np.testing.assert_array_equal(loaded[key], value)
+
+    assert not [f for f in os.listdir(str(tmp_path)) if ".tmp" in f]
+
+
+def test_changed_scene_is_recomputed(ard_info, tmp_path):
+    stats = StretchStats(ard_info, cache_dir=str(tmp_path))
+
+    stats.stats[SCENE] = {"hist_3": np.ones((3, 2 ** 16), dtype=np.int64)}
+
+    stats.save(SCENE)
+
+    tar = ard_info.lookup[SCENE]["SR"]
+
+    mtime = os.path.getmtime(tar) + 10
+
+    os.utime(tar, (mtime, mtime))
+
+    assert StretchStats(ard_info, cache_dir=str(tmp_path)).load(SCENE) == dict()
+
+
+def test_unreadable_sidecar(ard_info, tmp_path):
+    stats = StretchStats(ard_info, cache_dir=str(tmp_path))
+
+    with open(stats.stats_file(SCENE), "wb") as f:
+        f.write(b"not a sidecar")
+
+    assert stats.load(SCENE) == dict()
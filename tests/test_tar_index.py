@@ -0,0 +1,86 @@
+"""Round trip of the ARD tarball member offsets through the TarIndex"""
+
+import io
+import os
+import tarfile
+
+import pytest
+
+from lcmap_tap.RetrieveData.tar_index import TarIndex
+
+MEMBERS = {"LC08_CU_005002_20130412_20181024_C01_V01_PIXELQA.tif": b"qa" * 700,
+           "LC08_CU_005002_20130412_20181024_C01_V01_SRB4.tif": b"red" * 1000}
+
+
+def write_tar(path, members, mode="w"):
+    with tarfile.open(path, mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+
+            info.size = len(data)
+
+            tar.addfile(info, io.BytesIO(data))
+
+    return path
+
+
+@pytest.fixture
+def ard_dir(tmp_path):
+    ard_dir = tmp_path / "ard"
+
+    ard_dir.mkdir()
+
+    write_tar(str(ard_dir / "LC08_CU_005002_20130412_20181024_C01_V01_SR.tar"), MEMBERS)
+
+    return str(ard_dir)
+
+
+def test_member_offsets(ard_dir):
+    tar_path = os.path.join(ard_dir, "LC08_CU_005002_20130412_20181024_C01_V01_SR.tar")
+
+    index = TarIndex(ard_dir)
+
+    with open(tar_path, "rb") as f:
+        for name, data in MEMBERS.items():
+            offset, size = index.member(tar_path, name)
+
+            f.seek(offset)
+
+            assert f.read(size) == data
+
+            assert index.vsipath(tar_path, name) == "/vsisubfile/{}_{},{}".format(offset, size, tar_path)
+
+    assert index.member(tar_path, "missing.tif") is None
+
+
+def test_saved_index(ard_dir):
+    tar_path = os.path.join(ard_dir, "LC08_CU_005002_20130412_20181024_C01_V01_SR.tar")
+
+    index = TarIndex(ard_dir)
+
+    index.build([tar_path])
+
+    loaded = TarIndex(ard_dir)
+
+    assert loaded.is_current(tar_path)
+
+    assert loaded.tars == index.tars
+
+    write_tar(tar_path, dict(MEMBERS, extra=b"x" * 600))
+
+    assert not loaded.is_current(tar_path)
+
+    assert loaded.member(tar_path, "extra") is not None
+
+
+def test_compressed_tarball_falls_back_to_vsitar(ard_dir):
+    tar_path = write_tar(os.path.join(ard_dir, "LC08_CU_005002_20130412_20181024_C01_V01_BT.tar.gz"), MEMBERS,
+                         mode="w:gz")
+
+    index = TarIndex(ard_dir)
+
+    name = sorted(MEMBERS)[0]
+
+    assert index.member(tar_path, name) is None
+
+    assert index.vsipath(tar_path, name) == "/vsitar/{}".format(tar_path) + os.sep + name
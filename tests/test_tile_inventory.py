@@ -0,0 +1,101 @@
+"""Round trip of the saved directory listings of the TileInventory"""
+
+import os
+
+import pytest
+
+from lcmap_tap.RetrieveData import tile_inventory
+from lcmap_tap.RetrieveData.tile_inventory import TileInventory, get_chip
+
+
+@pytest.fixture
+def tile(tmp_path, monkeypatch):
+    monkeypatch.setattr(tile_inventory, "_loaded", dict())
+
+    cache_dir, json_dir = tmp_path / "cache_dir", tmp_path / "json_dir"
+
+    cache_dir.mkdir()
+
+    json_dir.mkdir()
+
+    for name in ("yatsm_r0_n10_b8.npy.npz", "yatsm_r12_n10_b8.npy.npz", "image_IDs.txt"):
+        (cache_dir / name).write_text("")
+
+    for name in ("H05V02_-2115585_2414805.json", "H05V02_-2112585_2414805.json", "notes.txt"):
+        (json_dir / name).write_text("")
+
+    return str(cache_dir), str(json_dir)
+
+
+def touch_dir(directory):
+    mtime = os.path.getmtime(directory) + 10
+
+    os.utime(directory, (mtime, mtime))
+
+
+def test_get_chip():
+    assert get_chip("/data/H05V02_-2115585_2414805.json") == (-2115585, 2414805)
+
+    assert get_chip("H05V02_-2115585.5_2414805.0.json") == (-2115585, 2414805)
+
+    assert get_chip("H05V02_-2115585_2414805.txt") is None
+
+
+def test_lookups(tile):
+    cache_dir, json_dir = tile
+
+    inventory = TileInventory(cache_dir, json_dir)
+
+    assert inventory.cache_file(12) == os.path.join(cache_dir, "yatsm_r12_n10_b8.npy.npz")
+
+    assert inventory.cache_file(1) is None
+
+    assert inventory.json_file(-2112585.0, 2414805.0) == os.path.join(json_dir, "H05V02_-2112585_2414805.json")
+
+    assert inventory.json_file(0, 0) is None
+
+
+def test_saved_listing_is_reused(tile, monkeypatch):
+    cache_dir, _ = tile
+
+    listing = TileInventory.load_listing(cache_dir, "cache", tile_inventory.get_row)
+
+    def fail(directory):
+        raise AssertionError("listed {} again".format(directory))
+
+    monkeypatch.setattr(tile_inventory.os, "listdir", fail)
+
+    mtime, files = TileInventory.load_listing(cache_dir, "cache", tile_inventory.get_row)
+
+    assert mtime == listing[0]
+
+    assert [tuple(f) for f in files] == [tuple(f) for f in listing[1]]
+
+
+def test_changed_directory_is_listed_again(tile):
+    cache_dir, json_dir = tile
+
+    inventory = TileInventory.get(cache_dir, json_dir)
+
+    open(os.path.join(cache_dir, "yatsm_r40_n10_b8.npy.npz"), "w").close()
+
+    touch_dir(cache_dir)
+
+    assert TileInventory.get(cache_dir, json_dir) is inventory
+
+    assert inventory.cache_file(40) == os.path.join(cache_dir, "yatsm_r40_n10_b8.npy.npz")
+
+    assert inventory.cache_file(12) is not None
+
+
+def test_unreadable_listing_is_rebuilt(tile):
+    cache_dir, json_dir = tile
+
+    TileInventory(cache_dir, json_dir)
+
+    with open(TileInventory.inventory_file(json_dir, "json"), "w") as f:
+        f.write("{\"mtime\": ")
+
+    inventory = TileInventory(cache_dir, json_dir)
+
+    assert inventory.json_file(-2115585, 2414805) == os.path.join(json_dir, "H05V02_-2115585_2414805.json")
@@ -0,0 +1,89 @@
+"""Playback order of the ChipCube ring buffer, including runs of skipped scenes longer than the buffer"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("osgeo")
+
+from lcmap_tap.RetrieveData.date_index import SceneDateIndex  # noqa: E402
+from lcmap_tap.Visualization import time_lapse  # noqa: E402
+from lcmap_tap.Visualization.time_lapse import ChipCube  # noqa: E402
+
+# <list> Fraction of clear pixels of each scene, in date order
+CLEAR = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.5, 0.1]
+
+SCENES = ["LE07_CU_013005_200401{:02d}_20181024_C01_V01".format(day + 1) for day in range(len(CLEAR))]
+
+
+@pytest.fixture
+def cube(monkeypatch):
+    monkeypatch.setattr(time_lapse.raster_window, "raster_size", lambda path: (50, 40))
+
+    def read_chip(self, scene):
+        num = SCENES.index(scene)
+
+        if CLEAR[num] is None:
+            raise RuntimeError("unreadable")
+
+        return np.full((8, 8, 3), num, dtype=np.uint8), CLEAR[num]
+
+    monkeypatch.setattr(ChipCube, "read_chip", read_chip)
+
+    # Shuffled, the cube orders the scenes by date
+    ard_info = SimpleNamespace(date_index=SceneDateIndex(SCENES[::-1]),
+                               vsipaths={scene: ["band"] * 8 for scene in SCENES})
+
+    cube = ChipCube(ard_info, row=2, col=48, nums=(3, 2, 1), size=8, capacity=3, workers=2, min_clear=0.4)
+
+    yield cube
+
+    cube.stop()
+
+
+def play(cube, frames: int):
+    """
+    Return the scenes of the next frames, waiting for their reads like a playback timer would
+
+    """
+    shown = list()
+
+    for _ in range(10 * frames):
+        for future in list(cube.pending.values()):
+            future.result()
+
+        frame = cube.next_frame()
+
+        if frame is not None:
+            scene, rgb = frame
+
+            assert (rgb == SCENES.index(scene)).all()
+
+            shown.append(scene)
+
+            if len(shown) == frames:
+                break
+
+    return shown
+
+
+def test_window(cube):
+    # Shifted inside the raster near its edges
+    assert (cube.window.xoff, cube.window.yoff, cube.window.xsize, cube.window.ysize) == (42, 0, 8, 8)
+
+
+def test_skips_cloudy_scenes(cube):
+    assert play(cube, 6) == [SCENES[i] for i in (0, 5, 6, 0, 5, 6)]
+
+
+def test_seek(cube):
+    cube.seek(SCENES[6])
+
+    assert play(cube, 2) == [SCENES[6], SCENES[0]]
+
+
+def test_unreadable_scene_is_skipped(cube, monkeypatch):
+    monkeypatch.setitem(globals(), "CLEAR", CLEAR[:6] + [None] + CLEAR[7:])
+
+    assert play(cube, 3) == [SCENES[i] for i in (0, 5, 0)]